@@ -0,0 +1,201 @@
+"""
+Offline IP-to-location lookup.
+
+Ranges are loaded once into sorted arrays per IP version, so a lookup is one
+``bisect`` and never touches the network. Two layouts are read:
+
+* ``start_ip,end_ip,country,city,isp`` with that header row, IPv4 or IPv6
+  (the bundled ``ip_ranges.csv``);
+* the header-less DB-IP "IP to Country Lite" (``start,end,country``) and
+  "IP to City Lite" (``start,end,continent,country,region,city,lat,lon``)
+  downloads from https://db-ip.com/db/lite.php, optionally still gzipped.
+
+The bundled file covers private and reserved space only, so public
+addresses resolve to ``UNKNOWN_LOCATION`` until ``GEOIP_CSV`` points at a
+full dataset. A configured file that is missing or invalid is reported and
+the bundled ranges are used instead. Ranges must be sorted by start address
+with no overlaps (per IP version); files that are not are rejected.
+
+Lookups and hostname resolution are memoised in LRU caches, since the same
+few addresses log in over and over.
+"""
+
+import csv
+import gzip
+import ipaddress
+import os
+import socket
+import threading
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, Optional, Tuple
+
+
+class GeoIPConfig:
+    BUNDLED_PATH = os.path.join(os.path.dirname(__file__), "ip_ranges.csv")
+    DATA_PATH = os.environ.get("GEOIP_CSV") or BUNDLED_PATH
+
+    # Distinct IPs / hostnames remembered by the lookup caches
+    CACHE_SIZE = 4096
+
+
+UNKNOWN_LOCATION = {"country": "Unknown", "city": "Unknown", "isp": "Unknown"}
+
+
+class GeoIPTable:
+    """
+    Non-overlapping IP ranges for bisect lookups, given in ascending order
+    of start address per IP version (``ValueError`` otherwise).
+    """
+
+    def __init__(self, ranges: Iterable[Tuple[str, str, Dict[str, str]]] = ()):
+        self._starts = {4: [], 6: []}
+        self._ends = {4: [], 6: []}
+        self._locations = {4: [], 6: []}
+        for start, end, location in ranges:
+            first, last = ipaddress.ip_address(start), ipaddress.ip_address(end)
+            if first.version != last.version or int(first) > int(last):
+                raise ValueError(f"invalid range {start} - {end}")
+            ends = self._ends[first.version]
+            if ends and int(first) <= ends[-1]:
+                previous = type(first)(ends[-1])
+                raise ValueError(f"range {start} - {end} is out of order or overlaps one ending at {previous}")
+            self._starts[first.version].append(int(first))
+            ends.append(int(last))
+            self._locations[first.version].append(location)
+
+    def __len__(self):
+        return len(self._starts[4]) + len(self._starts[6])
+
+    def lookup(self, ip: str) -> Optional[Dict[str, str]]:
+        """Location for ``ip``, or None if it is invalid or not in any range."""
+        try:
+            address = ipaddress.ip_address(ip.strip())
+        except (AttributeError, ValueError):
+            return None
+        if address.version == 6 and address.ipv4_mapped:
+            address = address.ipv4_mapped
+
+        value = int(address)
+        starts = self._starts[address.version]
+        i = bisect_right(starts, value) - 1
+        if i >= 0 and value <= self._ends[address.version][i]:
+            return self._locations[address.version][i]
+        return None
+
+
+def _open_text(path: str):
+    """Open ``path`` for CSV reading, decompressing ``.gz`` files."""
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", newline="", encoding="utf-8")
+    return open(path, newline="", encoding="utf-8")
+
+
+def _row_fields(row, columns) -> Tuple[str, str, str, str, str]:
+    """``(start, end, country, city, isp)`` from one CSV row in either layout."""
+    if columns is not None:
+        row = dict(zip(columns, row))
+        return row.get("start_ip"), row.get("end_ip"), row.get("country"), row.get("city"), row.get("isp")
+    if len(row) == 3:
+        return row[0], row[1], row[2], None, None
+    if len(row) == 8:
+        return row[0], row[1], row[3], row[5], None
+    raise ValueError(f"expected a start_ip,end_ip,... header or a DB-IP lite row, got {len(row)} columns")
+
+
+def load_geoip_csv(path: str) -> GeoIPTable:
+    """
+    Build a table from a range file in one of the layouts above.
+
+    Raises ``ValueError`` naming the line for unreadable rows and unsorted or
+    overlapping ranges, and for files with no ranges at all.
+    """
+    # Many ranges share a location; keep one dict per distinct location.
+    locations: Dict[Tuple[str, str, str], Dict[str, str]] = {}
+    line_no = 0
+
+    def ranges():
+        nonlocal line_no
+        with _open_text(path) as f:
+            reader = csv.reader(f)
+            columns = None
+            for line_no, row in enumerate(reader, 1):
+                if not row:
+                    continue
+                if line_no == 1 and row[0].strip().lower() == "start_ip":
+                    columns = [name.strip().lower() for name in row]
+                    if "end_ip" not in columns:
+                        raise ValueError("expected start_ip and end_ip columns")
+                    continue
+                start, end, *names = _row_fields(row, columns)
+                if not start or not end:
+                    raise ValueError("missing start_ip/end_ip")
+                key = tuple(name or "Unknown" for name in names)
+                location = locations.setdefault(key, dict(zip(("country", "city", "isp"), key)))
+                yield start, end, location
+
+    try:
+        table = GeoIPTable(ranges())
+    except ValueError as e:
+        raise ValueError(f"{path} line {line_no}: {e}") from None
+    if not len(table):
+        raise ValueError(f"{path}: no IP ranges")
+    return table
+
+
+_table: Optional[GeoIPTable] = None
+_table_lock = threading.Lock()
+
+
+def _fallback_table(error: Exception) -> GeoIPTable:
+    """The bundled private ranges, used when the configured file cannot be loaded."""
+    if GeoIPConfig.DATA_PATH != GeoIPConfig.BUNDLED_PATH:
+        print(f"IP location data unavailable ({error}); using the bundled private ranges")
+        try:
+            return load_geoip_csv(GeoIPConfig.BUNDLED_PATH)
+        except (OSError, ValueError) as e:
+            error = e
+    print(f"IP location data unavailable ({error}); locations will be Unknown")
+    return GeoIPTable()
+
+
+def get_geoip_table() -> GeoIPTable:
+    """The process-wide table, loaded from ``GeoIPConfig.DATA_PATH`` on first use."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                try:
+                    _table = load_geoip_csv(GeoIPConfig.DATA_PATH)
+                except (OSError, ValueError) as e:
+                    _table = _fallback_table(e)
+    return _table
+
+
+def reload_geoip_table(path: Optional[str] = None) -> GeoIPTable:
+    """
+    Load a new table (e.g. after updating the CSV) and drop cached lookups.
+
+    A bad file raises and leaves the current table in place.
+    """
+    global _table
+    table = load_geoip_csv(path or GeoIPConfig.DATA_PATH)
+    with _table_lock:
+        _table = table
+    lookup_location.cache_clear()
+    return table
+
+
+@lru_cache(maxsize=GeoIPConfig.CACHE_SIZE)
+def lookup_location(ip: str) -> Dict[str, str]:
+    """Location for ``ip`` (``UNKNOWN_LOCATION`` when not covered); treat the result as read-only."""
+    return get_geoip_table().lookup(ip) or UNKNOWN_LOCATION
+
+
+@lru_cache(maxsize=GeoIPConfig.CACHE_SIZE)
+def resolve_hostname(hostname: str) -> str:
+    """IPv4 address for ``hostname``, resolved once per process (``127.0.0.1`` if it fails)."""
+    try:
+        return socket.gethostbyname(hostname)
+    except OSError:
+        return "127.0.0.1"
@@ -0,0 +1,222 @@
+"""
+Sliding-window brute-force limiter for password logins.
+
+Failures are counted per email and per client IP in memory, so ``check()``
+can turn a locked-out caller away before any password hashing happens.
+Counters are seeded from ``failed_login_attempts`` the first time a key is
+seen, so a restart does not reset an attack in progress. Email lockouts are
+written to ``user_login_stats.account_locked`` / ``lock_until``; IP blocks
+are kept in memory only.
+"""
+
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from typing import Optional
+
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+
+_TS_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+class LimiterConfig:
+    # Failures counted over this many seconds
+    WINDOW = 15 * 60
+
+    # Failures within WINDOW that trigger a lockout
+    MAX_FAILURES_PER_EMAIL = 5
+    MAX_FAILURES_PER_IP = 20
+
+    # Lockout length (seconds)
+    LOCKOUT = 15 * 60
+
+    # Emails / IPs tracked in memory; least recently seen keys are dropped first
+    MAX_TRACKED = 50_000
+
+
+def _to_db_time(ts: float) -> str:
+    return datetime.fromtimestamp(ts, timezone.utc).strftime(_TS_FORMAT)
+
+
+def _from_db_time(value) -> Optional[float]:
+    if not value:
+        return None
+    try:
+        return datetime.strptime(str(value)[:19], _TS_FORMAT).replace(tzinfo=timezone.utc).timestamp()
+    except ValueError:
+        return None
+
+
+class _Tracker:
+    """Recent failure times and block expiry for one kind of key (email or IP)."""
+
+    def __init__(self, max_failures: int):
+        self.max_failures = max_failures
+        # key -> [deque of failure times, blocked-until or None]
+        self.entries: "OrderedDict[str, list]" = OrderedDict()
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is not None:
+            self.entries.move_to_end(key)
+        return entry
+
+    def put(self, key, failures, blocked_until=None):
+        entry = [deque(failures, maxlen=self.max_failures), blocked_until]
+        self.entries[key] = entry
+        while len(self.entries) > LimiterConfig.MAX_TRACKED:
+            self.entries.popitem(last=False)
+        return entry
+
+
+class LoginLimiter:
+    """
+    Per-email and per-IP lockouts for password logins.
+
+    Call ``check()`` before verifying a password, then ``record_failure()``
+    or ``record_success()`` with the outcome.
+    """
+
+    def __init__(self, db_path="app_database.db", clock=time.time):
+        self.db_path = db_path
+        self._pool = get_pool(db_path)
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._emails = _Tracker(LimiterConfig.MAX_FAILURES_PER_EMAIL)
+        self._ips = _Tracker(LimiterConfig.MAX_FAILURES_PER_IP)
+        ensure_schema(db_path)
+
+    @staticmethod
+    def _normalize(email):
+        return (email or "").strip()
+
+    def check(self, email, ip_address=None) -> Optional[int]:
+        """Seconds until ``email`` / ``ip_address`` may try again, or None if allowed."""
+        now = self._clock()
+        email = self._normalize(email)
+        email_entry = self._email_entry(email) if email else None
+        ip_entry = self._ip_entry(ip_address) if ip_address else None
+        with self._lock:
+            waits = [self._blocked_for(entry, now) for entry in (email_entry, ip_entry) if entry is not None]
+        remaining = max((w for w in waits if w), default=0)
+        if email and remaining == 0:
+            self._clear_expired_lock(email, now)
+        return int(remaining + 0.999) if remaining else None
+
+    def record_failure(self, email, ip_address=None) -> Optional[int]:
+        """
+        Count a failed password attempt; returns the lockout length in seconds
+        if this failure locked the email or IP, else None.
+
+        The attempt itself is stored by ``ActivityMonitor.log_login_attempt``.
+        """
+        now = self._clock()
+        email = self._normalize(email)
+        locked_email = locked_ip = False
+        email_entry = self._email_entry(email) if email else None
+        ip_entry = self._ip_entry(ip_address) if ip_address else None
+        with self._lock:
+            if email_entry is not None:
+                locked_email = self._count(email_entry, now)
+            if ip_entry is not None:
+                locked_ip = self._count(ip_entry, now)
+        if locked_email:
+            self._store_lock(email, now + LimiterConfig.LOCKOUT)
+        return LimiterConfig.LOCKOUT if locked_email or locked_ip else None
+
+    def record_success(self, email, ip_address=None):
+        """Forget an email's failures after a successful login."""
+        email = self._normalize(email)
+        with self._lock:
+            entry = self._emails.entries.pop(email, None)
+        if entry is not None and entry[1] is not None:
+            self._store_lock(email, None)
+
+    # ── internals ────────────────────────────────────────────────────
+
+    @staticmethod
+    def _blocked_for(entry, now):
+        if entry[1] is not None and entry[1] > now:
+            return entry[1] - now
+        return 0
+
+    @staticmethod
+    def _count(entry, now) -> bool:
+        """Add a failure; True if it starts a new block."""
+        failures = entry[0]
+        failures.append(now)
+        if entry[1] is not None and entry[1] > now:
+            return False
+        # deque maxlen is the threshold: full and all inside the window means too many.
+        if len(failures) == failures.maxlen and now - failures[0] <= LimiterConfig.WINDOW:
+            entry[1] = now + LimiterConfig.LOCKOUT
+            failures.clear()
+            return True
+        return False
+
+    def _email_entry(self, email):
+        with self._lock:
+            entry = self._emails.get(email)
+        if entry is None:
+            # Read without the lock so a miss never stalls other logins behind the database.
+            failures, locked_until = self._load_email(email, self._clock())
+            with self._lock:
+                # Keep whichever entry a concurrent caller stored first.
+                entry = self._emails.get(email) or self._emails.put(email, failures, locked_until)
+        return entry
+
+    def _ip_entry(self, ip_address):
+        with self._lock:
+            entry = self._ips.get(ip_address)
+        if entry is None:
+            failures = self._load_failures('ip_address', ip_address, self._clock())
+            with self._lock:
+                entry = self._ips.get(ip_address) or self._ips.put(ip_address, failures)
+        return entry
+
+    def _load_failures(self, column, value, now):
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f'SELECT timestamp FROM failed_login_attempts WHERE {column} = ? AND timestamp >= ? '
+                f'ORDER BY timestamp DESC LIMIT ?',
+                (value, _to_db_time(now - LimiterConfig.WINDOW),
+                 max(LimiterConfig.MAX_FAILURES_PER_EMAIL, LimiterConfig.MAX_FAILURES_PER_IP)),
+            ).fetchall()
+        return sorted(t for t in (_from_db_time(r[0]) for r in rows) if t is not None)
+
+    def _load_email(self, email, now):
+        failures = self._load_failures('email', email, now)
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                'SELECT account_locked, lock_until FROM user_login_stats WHERE user_email = ?', (email,)
+            ).fetchone()
+        locked_until = _from_db_time(row[1]) if row and row[0] else None
+        return failures, locked_until
+
+    def _store_lock(self, email, locked_until):
+        with self._pool.connection() as conn:
+            if locked_until is None:
+                conn.execute(
+                    'UPDATE user_login_stats SET account_locked = 0, lock_until = NULL WHERE user_email = ?',
+                    (email,),
+                )
+                return
+            conn.execute('''
+                INSERT INTO user_login_stats (user_email, account_locked, lock_until)
+                VALUES (?, 1, ?)
+                ON CONFLICT(user_email) DO UPDATE SET account_locked = 1, lock_until = excluded.lock_until
+            ''', (email, _to_db_time(locked_until)))
+
+    def _clear_expired_lock(self, email, now):
+        with self._lock:
+            entry = self._emails.get(email)
+            expired = entry is not None and entry[1] is not None and entry[1] <= now
+            if expired:
+                entry[1] = None
+        if expired:
+            self._store_lock(email, None)
+
+
+login_limiter = LoginLimiter()
@@ -0,0 +1,236 @@
+"""
+Audit log retention: monthly cold-storage archives.
+
+Rows older than ``ArchiveConfig.RETENTION_DAYS`` are moved out of the hot
+``audit_logs`` table into one SQLite file per calendar month
+(``audit_archive/audit_YYYY_MM.db`` next to the database), with ``details``
+stored zlib-compressed. ``AuditLogger`` reads the archives back
+transparently when a page reaches past the hot table: only archived months
+inside the query's date range are opened, newest first, and only until the
+page is full. Archive counts are cached per file until the file changes.
+
+Each batch is committed to its archive file before it is deleted from the
+hot table, and archive inserts ignore ids already present, so an
+interrupted run can simply be repeated.
+"""
+
+import os
+import re
+import sqlite3
+import threading
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+from app.services.database.connection_pool import get_pool
+
+
+class ArchiveConfig:
+    # Audit rows older than this many days leave the hot table
+    RETENTION_DAYS = 180
+
+    # Rows moved per hot-table transaction
+    BATCH_SIZE = 5000
+
+    # Directory (next to the database file) holding the monthly archives
+    DIRNAME = "audit_archive"
+
+    # How often the background retention worker runs (seconds)
+    INTERVAL = 24 * 60 * 60
+
+    ZLIB_LEVEL = 9
+
+    # Per-archive counts remembered by filter (an archive only changes when appended to)
+    COUNT_CACHE_SIZE = 1024
+
+
+_MONTH_FILE = re.compile(r'^audit_(\d{4})_(\d{2})\.db$')
+
+# Same columns as the hot table; details is a zlib-compressed BLOB
+_ARCHIVE_SCHEMA = (
+    '''CREATE TABLE IF NOT EXISTS audit_logs (
+        id INTEGER PRIMARY KEY,
+        actor_email TEXT NOT NULL,
+        actor_name TEXT,
+        action_type TEXT NOT NULL,
+        resource_type TEXT,
+        resource_id INTEGER,
+        details BLOB,
+        timestamp TIMESTAMP,
+        status TEXT
+    )''',
+    'CREATE INDEX IF NOT EXISTS idx_archive_ts ON audit_logs (timestamp DESC, id DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_archive_actor_ts ON audit_logs (actor_email, timestamp DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_archive_action_ts ON audit_logs (action_type, timestamp DESC)',
+    'CREATE INDEX IF NOT EXISTS idx_archive_resource_ts ON audit_logs (resource_type, timestamp DESC)',
+)
+
+AUDIT_COLUMNS = 'id, actor_email, actor_name, action_type, resource_type, resource_id, details, timestamp, status'
+
+
+def archive_dir(db_path: str) -> str:
+    return os.path.join(os.path.dirname(os.path.abspath(db_path)), ArchiveConfig.DIRNAME)
+
+
+def archive_path(db_path: str, month: str) -> str:
+    """Archive file for ``month`` (``'YYYY-MM'``)."""
+    return os.path.join(archive_dir(db_path), f"audit_{month.replace('-', '_')}.db")
+
+
+def archived_months(db_path: str, start_date: Optional[str] = None, end_date: Optional[str] = None) -> List[str]:
+    """Archived months (``'YYYY-MM'``, newest first) overlapping the given date range."""
+    try:
+        names = os.listdir(archive_dir(db_path))
+    except FileNotFoundError:
+        return []
+    months = []
+    for name in names:
+        match = _MONTH_FILE.match(name)
+        if not match:
+            continue
+        month = f"{match.group(1)}-{match.group(2)}"
+        if start_date and month < start_date[:7]:
+            continue
+        if end_date and month > end_date[:7]:
+            continue
+        months.append(month)
+    return sorted(months, reverse=True)
+
+
+def compress_details(details: Optional[str]) -> Optional[bytes]:
+    return zlib.compress(details.encode('utf-8'), ArchiveConfig.ZLIB_LEVEL) if details is not None else None
+
+
+def decompress_details(blob) -> Optional[str]:
+    return zlib.decompress(blob).decode('utf-8') if blob is not None else None
+
+
+def _open_archive(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path)
+    # Archives are the only copy once rows leave the hot table.
+    conn.execute('PRAGMA synchronous = FULL')
+    for statement in _ARCHIVE_SCHEMA:
+        conn.execute(statement)
+    return conn
+
+
+def _append_to_archive(path: str, rows) -> None:
+    conn = _open_archive(path)
+    try:
+        with conn:
+            conn.executemany(
+                f'INSERT OR IGNORE INTO audit_logs ({AUDIT_COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [row[:6] + (compress_details(row[6]),) + row[7:] for row in rows],
+            )
+    finally:
+        conn.close()
+
+
+def archive_audit_logs(db_path: str, older_than_days: Optional[int] = None, now: Optional[datetime] = None) -> int:
+    """Move audit rows older than the retention window into monthly archives; returns rows moved."""
+    days = ArchiveConfig.RETENTION_DAYS if older_than_days is None else older_than_days
+    cutoff = ((now or datetime.now(timezone.utc)) - timedelta(days=days)).strftime('%Y-%m-%d %H:%M:%S')
+    pool = get_pool(db_path)
+
+    moved = 0
+    while True:
+        with pool.connection() as conn:
+            rows = conn.execute(
+                f'SELECT {AUDIT_COLUMNS} FROM audit_logs WHERE timestamp < ? ORDER BY timestamp LIMIT ?',
+                (cutoff, ArchiveConfig.BATCH_SIZE),
+            ).fetchall()
+        if not rows:
+            return moved
+
+        by_month: Dict[str, list] = {}
+        for row in rows:
+            by_month.setdefault(str(row[7])[:7], []).append(row)
+        for month, month_rows in by_month.items():
+            _append_to_archive(archive_path(db_path, month), month_rows)
+
+        with pool.connection() as conn:
+            conn.executemany('DELETE FROM audit_logs WHERE id = ?', [(row[0],) for row in rows])
+        moved += len(rows)
+
+
+def query_archives(db_path: str, where: str, params, start_date: Optional[str], end_date: Optional[str],
+                   limit: int) -> List[tuple]:
+    """
+    Newest ``limit`` rows matching ``where`` across the overlapping archives,
+    newest first, with ``details`` decompressed.
+
+    Months hold disjoint time ranges, so they are read newest first and the
+    older ones are not opened once ``limit`` rows have been found.
+    """
+    rows = []
+    for month in archived_months(db_path, start_date, end_date):
+        if len(rows) >= limit:
+            break
+        conn = sqlite3.connect(f"file:{archive_path(db_path, month)}?mode=ro", uri=True)
+        try:
+            rows.extend(conn.execute(
+                f'SELECT {AUDIT_COLUMNS} FROM audit_logs WHERE 1=1{where} '
+                f'ORDER BY timestamp DESC, id DESC LIMIT ?',
+                list(params) + [limit - len(rows)],
+            ))
+        finally:
+            conn.close()
+    rows.sort(key=lambda r: (r[7], r[0]), reverse=True)
+    return [r[:6] + (decompress_details(r[6]),) + r[7:] for r in rows[:limit]]
+
+
+_count_cache: "OrderedDict[tuple, int]" = OrderedDict()
+_count_cache_lock = threading.Lock()
+
+
+def count_archives(db_path: str, where: str, params, start_date: Optional[str], end_date: Optional[str]) -> int:
+    """
+    Rows matching ``where`` across the archives overlapping the date range.
+
+    Each archive's count is cached against its size and modification time,
+    so only archives appended to since the last count are read again.
+    """
+    total = 0
+    for month in archived_months(db_path, start_date, end_date):
+        path = archive_path(db_path, month)
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            continue
+        key = (path, stat.st_mtime_ns, stat.st_size, where, tuple(params))
+        with _count_cache_lock:
+            count = _count_cache.get(key)
+            if count is not None:
+                _count_cache.move_to_end(key)
+        if count is None:
+            conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True)
+            try:
+                count = conn.execute(f'SELECT COUNT(*) FROM audit_logs WHERE 1=1{where}', list(params)).fetchone()[0]
+            finally:
+                conn.close()
+            with _count_cache_lock:
+                _count_cache[key] = count
+                while len(_count_cache) > ArchiveConfig.COUNT_CACHE_SIZE:
+                    _count_cache.popitem(last=False)
+        total += count
+    return total
+
+
+def start_retention_worker(db_path: str = "app_database.db", interval: float = ArchiveConfig.INTERVAL) -> threading.Event:
+    """Archive old audit rows now and then every ``interval`` seconds; set the returned event to stop."""
+    stop = threading.Event()
+
+    def run():
+        while not stop.is_set():
+            try:
+                moved = archive_audit_logs(db_path)
+                if moved:
+                    print(f"Archived {moved} audit log entries")
+            except Exception as e:
+                print(f"Audit log archiving failed: {e}")
+            stop.wait(interval)
+
+    threading.Thread(target=run, name="audit-retention", daemon=True).start()
+    return stop
@@ -0,0 +1,177 @@
+"""
+Streaming audit log export to gzip-compressed CSV.
+
+Rows come from ``AuditLogger.iter_audit_logs`` one batch at a time and are
+compressed as they are written, so an export of millions of entries runs in
+constant memory and is never cut off at a row limit. The same stream can be
+written to a file or served as a download from the exported ASGI app.
+
+The download route cannot see the Flet session, so the admin view first
+calls ``issue_export_token`` with its filters and opens the returned URL;
+each token is single-use and expires after ``ExportConfig.TOKEN_TTL``.
+Tokens are kept (hashed) in the ``export_tokens`` table, so whichever
+worker process serves the download can redeem them.
+"""
+
+import csv
+import hashlib
+import io
+import json
+import os
+import secrets
+import time
+import zlib
+from datetime import datetime
+from typing import Dict, Iterator, Optional
+
+from app.services.audit.audit_archive import AUDIT_COLUMNS
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+
+
+class ExportConfig:
+    # Entries fetched (and compressed) per round trip
+    BATCH_SIZE = 1000
+
+    # Where exports are saved when no HTTP download route is mounted
+    EXPORT_DIR = os.path.join("storage", "exports")
+
+    DOWNLOAD_ROUTE = "/api/audit/export"
+
+    # Seconds a download token stays valid
+    TOKEN_TTL = 120
+
+    ZLIB_LEVEL = 6
+
+
+EXPORT_FIELDS = tuple(column.strip() for column in AUDIT_COLUMNS.split(","))
+
+# Filters accepted by the export (``get_audit_logs`` keyword arguments)
+FILTER_KEYS = ("actor_email", "action_type", "resource_type", "start_date", "end_date")
+
+
+def export_filename(now: Optional[datetime] = None) -> str:
+    return f"audit_logs_{(now or datetime.now()).strftime('%Y%m%d_%H%M%S')}.csv.gz"
+
+
+def _clean_filters(filters: Optional[Dict[str, object]]) -> Dict[str, object]:
+    return {k: v for k, v in (filters or {}).items() if k in FILTER_KEYS and v}
+
+
+def iter_csv_gzip(logs, level: int = ExportConfig.ZLIB_LEVEL) -> Iterator[bytes]:
+    """Encode ``logs`` as CSV and yield gzip-compressed chunks, one per batch of rows."""
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 31)  # wbits 31: gzip container
+
+    writer.writeheader()
+    pending = 0
+    for log in logs:
+        writer.writerow(log)
+        pending += 1
+        if pending >= ExportConfig.BATCH_SIZE:
+            chunk = compressor.compress(buffer.getvalue().encode("utf-8"))
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+            if chunk:
+                yield chunk
+    yield compressor.compress(buffer.getvalue().encode("utf-8")) + compressor.flush()
+
+
+def export_audit_logs(audit, path: str, filters: Optional[Dict[str, object]] = None) -> int:
+    """Write every entry matching ``filters`` to a gzip CSV at ``path``; returns the row count."""
+    count = 0
+
+    def counted(logs):
+        nonlocal count
+        for log in logs:
+            count += 1
+            yield log
+
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    logs = audit.iter_audit_logs(_clean_filters(filters), ExportConfig.BATCH_SIZE)
+    with open(path, "wb") as f:
+        for chunk in iter_csv_gzip(counted(logs)):
+            f.write(chunk)
+    return count
+
+
+# ── Download tokens ──────────────────────────────────────────────────
+
+# Set by register_audit_export_route(); without the route views export to a file.
+_downloads_enabled = False
+
+
+def enable_export_downloads(enabled: bool = True):
+    """Toggle whether views offer HTTP downloads (requires the route to be mounted)."""
+    global _downloads_enabled
+    _downloads_enabled = enabled
+
+
+def export_downloads_enabled() -> bool:
+    return _downloads_enabled
+
+
+def _token_hash(token: str) -> str:
+    return hashlib.sha256(token.encode("utf-8")).hexdigest()
+
+
+def issue_export_token(filters: Optional[Dict[str, object]] = None, db_path: str = "app_database.db") -> str:
+    """Single-use token authorising one download of the filtered export."""
+    token = secrets.token_urlsafe(24)
+    now = time.time()
+    ensure_schema(db_path)
+    with get_pool(db_path).connection() as conn:
+        conn.execute('DELETE FROM export_tokens WHERE expires_at <= ?', (now,))
+        conn.execute(
+            'INSERT INTO export_tokens (token_hash, filters, expires_at) VALUES (?, ?, ?)',
+            (_token_hash(token), json.dumps(_clean_filters(filters)), now + ExportConfig.TOKEN_TTL),
+        )
+    return token
+
+
+def redeem_export_token(token: str, db_path: str = "app_database.db") -> Optional[Dict[str, object]]:
+    """Filters for a valid token (consuming it), or None."""
+    if not token:
+        return None
+    ensure_schema(db_path)
+    with get_pool(db_path).connection() as conn:
+        # DELETE ... RETURNING claims the token atomically across processes.
+        row = conn.execute(
+            'DELETE FROM export_tokens WHERE token_hash = ? RETURNING filters, expires_at', (_token_hash(token),)
+        ).fetchone()
+    if row is None or row[1] <= time.time():
+        return None
+    return json.loads(row[0])
+
+
+def export_download_url(token: str) -> str:
+    return f"{ExportConfig.DOWNLOAD_ROUTE}?token={token}"
+
+
+def register_audit_export_route(app, audit=None):
+    """Add the audit export download route to a FastAPI app."""
+    from fastapi import HTTPException
+    from fastapi.responses import StreamingResponse
+    from starlette.concurrency import run_in_threadpool
+
+    if audit is None:
+        from app.services.audit.audit_logger import audit_logger as audit
+
+    @app.get(ExportConfig.DOWNLOAD_ROUTE)
+    async def audit_export(token: str = ""):
+        filters = await run_in_threadpool(redeem_export_token, token, audit.db_path)
+        if filters is None:
+            raise HTTPException(status_code=403, detail="Export link expired; start the export again")
+        # A plain generator: Starlette pulls it from a worker thread, so SQLite reads never block the loop.
+        body = iter_csv_gzip(audit.iter_audit_logs(filters, ExportConfig.BATCH_SIZE))
+        return StreamingResponse(
+            body,
+            media_type="application/gzip",
+            headers={"Content-Disposition": f'attachment; filename="{export_filename()}"'},
+        )
+
+    enable_export_downloads()
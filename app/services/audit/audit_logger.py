@@ -1,80 +1,282 @@
+import atexit
+import json
+import os
 import sqlite3
-from datetime import datetime
+import threading
+import time
+from collections import OrderedDict, deque
+from datetime import datetime, timezone
+from app.services.audit.audit_archive import (
+    AUDIT_COLUMNS, archive_audit_logs, archived_months, count_archives, query_archives,
+)
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+
+
+class AuditConfig:
+    # Write-behind: pending entries are committed together every FLUSH_INTERVAL
+    # seconds, or as soon as BATCH_SIZE of them are waiting.
+    FLUSH_INTERVAL = 0.05
+    BATCH_SIZE = 200
+
+    # Past this many pending entries log_action flushes on the caller's thread
+    MAX_PENDING = 10_000
+
+    # Row ids reserved from sqlite_sequence at a time (see _next_id)
+    ID_BLOCK = 256
+
+    # Entries that could not be written at shutdown are kept here and replayed on start
+    SPILL_SUFFIX = "-audit-pending.jsonl"
+
+    # Exact counts remembered per filter combination until the next write
+    COUNT_CACHE_SIZE = 256
+    # Upper bound on how stale a cached count can be (covers writes from other processes)
+    COUNT_CACHE_TTL = 30.0
+
+    # Unfiltered ranges estimated at or above this many rows are not counted exactly
+    ESTIMATE_MIN_ROWS = 100_000
+
+_INSERT_QUEUED_SQL = '''
+    INSERT INTO audit_logs
+        (id, actor_email, actor_name, action_type, resource_type, resource_id, details, status, timestamp)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+'''
+
+# Spill replay only: a row already written by an earlier replay is skipped
+_REPLAY_QUEUED_SQL = _INSERT_QUEUED_SQL.replace('INSERT INTO', 'INSERT OR IGNORE INTO')
+
+_INSERT_AUDIT_SQL = '''
+    INSERT INTO audit_logs (actor_email, actor_name, action_type, resource_type, resource_id, details, status)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+'''
+
+
+def write_audit_rows(cursor, rows):
+    """Insert ``(actor_email, actor_name, action_type, resource_type, resource_id, details, status)`` rows on an open cursor."""
+    cursor.executemany(_INSERT_AUDIT_SQL, rows)
+
 
 class AuditLogger:
+    """
+    Audit trail writer and reader.
+
+    ``log_action`` only queues the entry; a background thread commits queued
+    entries in batches (group commit), so user actions never wait on an
+    fsync. Row ids are reserved up front, so ``log_action`` still returns
+    the entry's final id. Reads flush first, and ``flush()`` forces a write.
+    Anything still queued at interpreter exit is written synchronously, or
+    spilled to a file next to the database and replayed on the next start.
+    """
+
     def __init__(self, db_path="app_database.db"):
         self.db_path = db_path
+        self._pool = get_pool(db_path)
         self._init_audit_table()
+
+        self._pending = deque()
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._id_lock = threading.Lock()
+        self._id_conn = None
+        self._next_free_id = self._id_limit = 0
+        self._writer = None
+        self._closed = False
+
+        # Counts cached under an older audit_log_version are stale.
+        self._count_cache = OrderedDict()
+        self._count_lock = threading.Lock()
+
+        self._replay_spill()
+        atexit.register(self.close)
     
     def _init_audit_table(self):
-        """Initialize audit_logs table if not exists."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS audit_logs (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                actor_email TEXT NOT NULL,
-                actor_name TEXT,
-                action_type TEXT NOT NULL,
-                resource_type TEXT,
-                resource_id INTEGER,
-                details TEXT,
-                timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                status TEXT DEFAULT 'success'
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
+        """Make sure the audit_logs table exists (managed by migrations)."""
+        ensure_schema(self.db_path)
     
     def log_action(self, actor_email, actor_name, action_type, resource_type=None, resource_id=None, details=None, status="success"):
-        """Log an audit entry."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO audit_logs (actor_email, actor_name, action_type, resource_type, resource_id, details, status)
-            VALUES (?, ?, ?, ?, ?, ?, ?)
-        ''', (actor_email, actor_name, action_type, resource_type, resource_id, details, status))
-        
-        conn.commit()
-        log_id = cursor.lastrowid
-        conn.close()
+        """Queue an audit entry and return its row id (written by the background writer)."""
+        log_id = self._next_id()
+        timestamp = datetime.now(timezone.utc).strftime("%Y-%m-%d %H:%M:%S")
+        row = (log_id, actor_email, actor_name, action_type, resource_type, resource_id, details, status, timestamp)
+
+        if self._closed:
+            self._write([row])
+            return log_id
+
+        with self._cond:
+            self._pending.append(row)
+            backlog = len(self._pending)
+            if backlog == 1 or backlog >= AuditConfig.BATCH_SIZE:
+                self._cond.notify()
+        self._ensure_writer()
+
+        if backlog >= AuditConfig.MAX_PENDING:
+            # The writer is falling behind; apply back-pressure to the caller.
+            self.flush()
         return log_id
+
+    def _next_id(self):
+        """
+        Hand out the next reserved row id, reserving a new block when needed.
+
+        Blocks are claimed by advancing ``sqlite_sequence`` for audit_logs, so
+        other processes and plain AUTOINCREMENT inserts never reuse them.
+        Unused ids in a block are skipped when the process exits.
+
+        The claim is committed on a dedicated connection, never inside a
+        caller's pooled transaction, so a later rollback there cannot undo a
+        reservation that has already been handed out. Do not call this while
+        the same thread holds a write transaction on the database.
+        """
+        with self._id_lock:
+            if self._next_free_id >= self._id_limit:
+                if self._id_conn is None:
+                    self._id_conn = self._pool.connect()
+                conn = self._id_conn
+                conn.execute('BEGIN IMMEDIATE')
+                try:
+                    row = conn.execute(
+                        "SELECT seq FROM sqlite_sequence WHERE name = 'audit_logs'"
+                    ).fetchone()
+                    max_id = conn.execute('SELECT MAX(id) FROM audit_logs').fetchone()[0] or 0
+                    start = max(row[0] if row else 0, max_id) + 1
+                    limit = start + AuditConfig.ID_BLOCK
+                    if row:
+                        conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'audit_logs'", (limit - 1,))
+                    else:
+                        conn.execute("INSERT INTO sqlite_sequence (name, seq) VALUES ('audit_logs', ?)", (limit - 1,))
+                    conn.commit()
+                except BaseException:
+                    conn.rollback()
+                    raise
+                self._next_free_id, self._id_limit = start, limit
+            log_id = self._next_free_id
+            self._next_free_id += 1
+            return log_id
+
+    def _ensure_writer(self):
+        if self._writer is None or not self._writer.is_alive():
+            with self._cond:
+                if self._writer is None or not self._writer.is_alive():
+                    self._writer = threading.Thread(target=self._run_writer, name="audit-writer", daemon=True)
+                    self._writer.start()
+
+    def _run_writer(self):
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._closed or self._pending)
+                if self._closed:
+                    return
+                # Give concurrent actions a moment to join this commit.
+                self._cond.wait_for(
+                    lambda: self._closed or len(self._pending) >= AuditConfig.BATCH_SIZE,
+                    timeout=AuditConfig.FLUSH_INTERVAL,
+                )
+            try:
+                self.flush()
+            except Exception as e:
+                # Entries stay queued and are retried on the next cycle.
+                print(f"Audit log write failed, will retry: {e}")
+                with self._cond:
+                    self._cond.wait(AuditConfig.FLUSH_INTERVAL)
+
+    def flush(self):
+        """Write every queued entry now; returns how many were written."""
+        with self._write_lock:
+            with self._cond:
+                batch = list(self._pending)
+                self._pending.clear()
+            if not batch:
+                return 0
+            try:
+                self._write(batch)
+            except Exception:
+                with self._cond:
+                    self._pending.extendleft(reversed(batch))
+                raise
+            return len(batch)
+
+    def _write(self, rows):
+        try:
+            with self._pool.connection() as conn:
+                conn.executemany(_INSERT_QUEUED_SQL, rows)
+        except sqlite3.IntegrityError as e:
+            # A reserved id is already taken, so a reservation was lost. Report it and
+            # keep every entry: rows whose id collides are written under a fresh one.
+            print(f"Audit log id conflict ({e}); writing colliding entries under new ids")
+            with self._pool.connection() as conn:
+                for row in rows:
+                    try:
+                        conn.execute(_INSERT_QUEUED_SQL, row)
+                    except sqlite3.IntegrityError:
+                        conn.execute(_INSERT_QUEUED_SQL, (None,) + tuple(row[1:]))
+
+    def _data_version(self):
+        """Changes on every audit insert or delete by any writer (maintained by triggers)."""
+        with self._pool.connection() as conn:
+            return conn.execute('SELECT version FROM audit_log_version WHERE id = 1').fetchone()[0]
+
+    def close(self):
+        """Stop the writer and write what is left, spilling to disk if the database is unavailable."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        if self._writer is not None:
+            self._writer.join(timeout=5)
+        with self._id_lock:
+            if self._id_conn is not None:
+                self._id_conn.close()
+                self._id_conn = None
+        try:
+            self.flush()
+        except Exception as e:
+            with self._cond:
+                rows = list(self._pending)
+                self._pending.clear()
+            with open(self.db_path + AuditConfig.SPILL_SUFFIX, "a", encoding="utf-8") as f:
+                for row in rows:
+                    f.write(json.dumps(row) + "\n")
+                f.flush()
+                os.fsync(f.fileno())
+            print(f"Audit log write failed at shutdown ({e}); {len(rows)} entries saved for replay")
+
+    def _replay_spill(self):
+        """Write entries spilled by a previous shutdown, then remove the spill file."""
+        path = self.db_path + AuditConfig.SPILL_SUFFIX
+        if not os.path.exists(path):
+            return
+        with open(path, encoding="utf-8") as f:
+            rows = [tuple(json.loads(line)) for line in f if line.strip()]
+        # Ids are kept, so INSERT OR IGNORE makes a repeated replay harmless.
+        with self._pool.connection() as conn:
+            conn.executemany(_REPLAY_QUEUED_SQL, rows)
+        os.remove(path)
     
-    def get_audit_logs(self, actor_email=None, action_type=None, resource_type=None, start_date=None, end_date=None, limit=100, offset=0):
-        """Retrieve audit logs with optional filters."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = "SELECT id, actor_email, actor_name, action_type, resource_type, resource_id, details, timestamp, status FROM audit_logs WHERE 1=1"
+    @staticmethod
+    def _filter_sql(actor_email=None, action_type=None, resource_type=None, start_date=None, end_date=None):
+        """``AND`` clauses and params for the audit filters (shared with the archives)."""
+        where = ""
         params = []
-        
         if actor_email:
-            query += " AND actor_email = ?"
+            where += " AND actor_email = ?"
             params.append(actor_email)
         if action_type:
-            query += " AND action_type = ?"
+            where += " AND action_type = ?"
             params.append(action_type)
         if resource_type:
-            query += " AND resource_type = ?"
+            where += " AND resource_type = ?"
             params.append(resource_type)
         if start_date:
-            query += " AND timestamp >= ?"
+            where += " AND timestamp >= ?"
             params.append(start_date)
         if end_date:
-            query += " AND timestamp <= ?"
+            where += " AND timestamp <= ?"
             params.append(end_date)
-        
-        query += " ORDER BY timestamp DESC LIMIT ? OFFSET ?"
-        params.extend([limit, offset])
-        
-        cursor.execute(query, params)
-        logs = cursor.fetchall()
-        conn.close()
-        
-        return [{
+        return where, params
+
+    @staticmethod
+    def _row_to_log(log):
+        return {
             'id': log[0],
             'actor_email': log[1],
             'actor_name': log[2],
@@ -84,36 +286,159 @@ class AuditLogger:
             'details': log[6],
             'timestamp': log[7],
             'status': log[8]
-        } for log in logs]
-    
+        }
+
+    def get_audit_logs(self, actor_email=None, action_type=None, resource_type=None, start_date=None, end_date=None, limit=100, offset=0, before=None):
+        """
+        Retrieve audit logs with optional filters, newest first.
+
+        ``before`` is a ``(timestamp, id)`` keyset cursor, normally the last
+        entry of the previous page: only older entries are returned, so deep
+        pages cost the same as the first one. Archived months inside the
+        date range are searched only when the hot table cannot fill the page
+        with entries newer than the newest archived month (see
+        ``audit_archive``).
+        """
+        self.flush()
+        where, params = self._filter_sql(actor_email, action_type, resource_type, start_date, end_date)
+        # Archives newer than the cursor cannot contribute to this page.
+        months_end = end_date
+        if before is not None:
+            where += " AND (timestamp, id) < (?, ?)"
+            params += list(before)
+            if not end_date or str(before[0]) < end_date:
+                months_end = str(before[0])
+        months = archived_months(self.db_path, start_date, months_end)
+
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            query = f"SELECT {AUDIT_COLUMNS} FROM audit_logs WHERE 1=1{where} ORDER BY timestamp DESC, id DESC"
+            if months:
+                # Each source contributes its newest offset + limit rows; merge, then page.
+                cursor.execute(query + " LIMIT ?", params + [offset + limit])
+            else:
+                cursor.execute(query + " LIMIT ? OFFSET ?", params + [limit, offset])
+            logs = cursor.fetchall()
+
+        # Archived rows are older than the hot ones, so a full page that ends after
+        # the newest archived month needs nothing from the archives.
+        if months and len(logs) == offset + limit and str(logs[-1][7])[:7] > months[0]:
+            months = []
+            logs = logs[offset:]
+
+        if months:
+            # Hot rows from after the newest archived month already precede every archived row.
+            newer = sum(1 for log in logs if str(log[7])[:7] > months[0])
+            logs.extend(query_archives(self.db_path, where, params, start_date, months_end, offset + limit - newer))
+            logs.sort(key=lambda log: (log[7], log[0]), reverse=True)
+            logs = logs[offset:offset + limit]
+
+        return [self._row_to_log(log) for log in logs]
+
+    def iter_audit_logs(self, filters=None, batch_size=1000):
+        """
+        Yield every entry matching ``filters`` (``get_audit_logs`` keyword
+        arguments), newest first, fetching ``batch_size`` rows at a time by
+        keyset so memory stays flat however many rows match.
+        """
+        filters = dict(filters or {})
+        before = None
+        while True:
+            batch = self.get_audit_logs(**filters, limit=batch_size, before=before)
+            yield from batch
+            if len(batch) < batch_size:
+                return
+            before = (batch[-1]['timestamp'], batch[-1]['id'])
+
     def get_audit_logs_count(self, actor_email=None, action_type=None, resource_type=None, start_date=None, end_date=None):
-        """Get total count of audit logs matching filters."""
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        
-        query = "SELECT COUNT(*) FROM audit_logs WHERE 1=1"
-        params = []
-        
-        if actor_email:
-            query += " AND actor_email = ?"
-            params.append(actor_email)
-        if action_type:
-            query += " AND action_type = ?"
-            params.append(action_type)
-        if resource_type:
-            query += " AND resource_type = ?"
-            params.append(resource_type)
-        if start_date:
-            query += " AND timestamp >= ?"
-            params.append(start_date)
-        if end_date:
-            query += " AND timestamp <= ?"
-            params.append(end_date)
-        
-        cursor.execute(query, params)
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        """Get total count of audit logs matching filters (including archived months in the date range)."""
+        return self.get_audit_logs_total(actor_email, action_type, resource_type, start_date, end_date, estimate=False)['count']
+
+    def get_audit_logs_total(self, actor_email=None, action_type=None, resource_type=None, start_date=None, end_date=None, estimate=True):
+        """
+        Count for the pagination footer: ``{'count': int, 'estimated': bool}``.
+
+        Exact counts are cached per filter combination until audit_logs next
+        changes, whichever process or code path writes it. A count with no
+        filters at all is read from the trigger-maintained row count. With
+        ``estimate`` a date-range-only count that would cover at least
+        ``AuditConfig.ESTIMATE_MIN_ROWS`` rows is estimated (see
+        ``_estimate_count``) instead of running a ``COUNT(*)``.
+        """
+        self.flush()
+        key = (actor_email, action_type, resource_type, start_date, end_date)
+        version = self._data_version()
+        with self._count_lock:
+            cached = self._count_cache.get(key)
+            if cached and cached[0] == version and time.monotonic() - cached[1] < AuditConfig.COUNT_CACHE_TTL:
+                self._count_cache.move_to_end(key)
+                return {'count': cached[2], 'estimated': False}
+
+        where, params = self._filter_sql(actor_email, action_type, resource_type, start_date, end_date)
+        archived = count_archives(self.db_path, where, params, start_date, end_date)
+
+        count = None
+        if not (actor_email or action_type or resource_type):
+            if not (start_date or end_date):
+                count = self._row_count() + archived
+            elif estimate:
+                approx = self._estimate_count(start_date, end_date) + archived
+                if approx >= AuditConfig.ESTIMATE_MIN_ROWS:
+                    return {'count': approx, 'estimated': True}
+
+        if count is None:
+            with self._pool.connection() as conn:
+                count = conn.execute(f"SELECT COUNT(*) FROM audit_logs WHERE 1=1{where}", params).fetchone()[0] + archived
+
+        with self._count_lock:
+            self._count_cache[key] = (version, time.monotonic(), count)
+            self._count_cache.move_to_end(key)
+            while len(self._count_cache) > AuditConfig.COUNT_CACHE_SIZE:
+                self._count_cache.popitem(last=False)
+        return {'count': count, 'estimated': False}
+
+    def _row_count(self):
+        """Exact number of rows in the hot table (maintained by triggers)."""
+        with self._pool.connection() as conn:
+            return conn.execute('SELECT row_count FROM audit_log_version WHERE id = 1').fetchone()[0]
+
+    def _estimate_count(self, start_date=None, end_date=None):
+        """
+        Rows in the hot table within the date range: the exact row count
+        scaled by the share of the id span the range covers (a few index
+        seeks).
+
+        Ids are reserved in blocks per process, so the span has gaps
+        (unused ids skipped at each restart) and is only roughly in time
+        order. Scaling by the real row count cancels out gaps spread across
+        the table. Each end of the range may still be off by about
+        ``AuditConfig.ID_BLOCK`` rows per concurrent writer, which is why
+        the result is only reported as an estimate.
+        """
+        with self._pool.connection() as conn:
+            total = conn.execute('SELECT row_count FROM audit_log_version WHERE id = 1').fetchone()[0]
+            lowest, highest = conn.execute('SELECT MIN(id), MAX(id) FROM audit_logs').fetchone()
+            if lowest is None:
+                return 0
+            first = last = None
+            if start_date:
+                first = conn.execute(
+                    "SELECT id FROM audit_logs WHERE timestamp >= ? ORDER BY timestamp, id LIMIT 1", (start_date,)
+                ).fetchone()
+            if end_date:
+                last = conn.execute(
+                    "SELECT id FROM audit_logs WHERE timestamp <= ? ORDER BY timestamp DESC, id DESC LIMIT 1", (end_date,)
+                ).fetchone()
+        if (start_date and not first) or (end_date and not last):
+            return 0
+        first = first[0] if first else lowest
+        last = last[0] if last else highest
+        share = max(0, last - first + 1) / (highest - lowest + 1)
+        return min(total, round(total * share))
 
+    def archive_old_logs(self, older_than_days=None):
+        """Move entries past the retention window into the monthly archives; returns rows moved."""
+        self.flush()
+        return archive_audit_logs(self.db_path, older_than_days)
 
 audit_logger = AuditLogger()
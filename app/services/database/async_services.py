@@ -0,0 +1,232 @@
+"""
+Awaitable access to the database, audit and activity services.
+
+Flet runs async event handlers on its event loop, so a blocking SQLite call
+inside one stalls every update for that session. ``AsyncServices`` sends
+those calls to a small dedicated worker pool instead:
+
+    services = get_async_services()
+    report_id = await services.db.add_report(...)
+    await services.audit.log_action(...)
+
+The pool has a bounded queue. When it is full new calls fail fast with
+``ServicesBusyError`` rather than piling up behind a slow query, and
+``stats()`` exposes queue depth and latency for monitoring.
+"""
+
+import asyncio
+import atexit
+import functools
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Callable, Dict, Optional
+
+
+class ExecutorConfig:
+    # Worker threads; keep below PoolConfig.MAX_CONNECTIONS so UI calls never starve the pool
+    MAX_WORKERS = 4
+
+    # Calls allowed to wait for a worker before new ones are rejected
+    MAX_QUEUE = 64
+
+    # Recent calls kept for the latency percentiles in stats()
+    LATENCY_WINDOW = 512
+
+
+class ServicesBusyError(RuntimeError):
+    """Raised when the service executor queue is full."""
+
+
+def _percentile(values, fraction):
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+class ServiceExecutor:
+    """Fixed pool of worker threads fed from a bounded queue, with metrics."""
+
+    def __init__(self, max_workers: int = ExecutorConfig.MAX_WORKERS,
+                 max_queue: int = ExecutorConfig.MAX_QUEUE, name: str = "services"):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max_queue)
+        self._lock = threading.Lock()
+        self._closed = False
+
+        # Metrics
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._running = 0
+        self._waits: deque = deque(maxlen=ExecutorConfig.LATENCY_WINDOW)
+        self._runs: deque = deque(maxlen=ExecutorConfig.LATENCY_WINDOW)
+
+        self._workers = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True)
+            for i in range(max_workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+
+    def submit(self, fn: Callable, *args, **kwargs) -> Future:
+        """Queue ``fn(*args, **kwargs)``; raises ServicesBusyError if the queue is full."""
+        if self._closed:
+            raise RuntimeError("ServiceExecutor is closed")
+        future: Future = Future()
+        try:
+            self._queue.put_nowait((fn, args, kwargs, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self._rejected += 1
+            raise ServicesBusyError(
+                f"{self._queue.qsize()} database calls already queued; try again shortly"
+            ) from None
+        with self._lock:
+            self._submitted += 1
+        return future
+
+    def _work(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                return
+            fn, args, kwargs, future, queued_at = item
+            if not future.set_running_or_notify_cancel():
+                continue
+            started = time.perf_counter()
+            with self._lock:
+                self._running += 1
+            result = error = None
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException as e:
+                error = e
+            finished = time.perf_counter()
+            # Record metrics before waking the caller so stats() never lags a finished call.
+            with self._lock:
+                self._running -= 1
+                self._completed += 1
+                self._failed += error is not None
+                self._waits.append(started - queued_at)
+                self._runs.append(finished - started)
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, object]:
+        """Snapshot of executor metrics for monitoring."""
+        with self._lock:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            return {
+                'workers': self.max_workers,
+                'max_queue': self.max_queue,
+                'queued': self._queue.qsize(),
+                'running': self._running,
+                'submitted': self._submitted,
+                'completed': self._completed,
+                'failed': self._failed,
+                'rejected': self._rejected,
+                'wait_ms_p50': round(_percentile(waits, 0.50) * 1000, 3),
+                'wait_ms_p95': round(_percentile(waits, 0.95) * 1000, 3),
+                'run_ms_p50': round(_percentile(runs, 0.50) * 1000, 3),
+                'run_ms_p95': round(_percentile(runs, 0.95) * 1000, 3),
+                'run_ms_max': round(max(runs, default=0.0) * 1000, 3),
+            }
+
+    def close(self, wait: bool = True):
+        """Stop accepting calls; queued calls still run before the workers exit."""
+        if self._closed:
+            return
+        self._closed = True
+        for _ in self._workers:
+            self._queue.put(None)
+        if wait:
+            for worker in self._workers:
+                worker.join()
+
+
+class _AsyncProxy:
+    """Exposes every method of ``target`` as a coroutine function run on the executor."""
+
+    def __init__(self, services: "AsyncServices", target):
+        self._services = services
+        self._target = target
+
+    def __getattr__(self, name):
+        method = getattr(self._target, name)
+        if not callable(method):
+            return method
+
+        @functools.wraps(method)
+        async def call(*args, **kwargs):
+            return await self._services.call(method, *args, **kwargs)
+
+        # Cache so repeated lookups skip __getattr__.
+        setattr(self, name, call)
+        return call
+
+
+class AsyncServices:
+    """
+    Async facade over Database, AuditLogger and ActivityMonitor.
+
+    ``db``, ``audit`` and ``activity`` mirror the wrapped objects' methods
+    as coroutines; ``call()`` runs any other blocking callable the same way.
+    """
+
+    def __init__(self, db, audit, activity, executor: Optional[ServiceExecutor] = None):
+        self.executor = executor or ServiceExecutor()
+        self.db = _AsyncProxy(self, db)
+        self.audit = _AsyncProxy(self, audit)
+        self.activity = _AsyncProxy(self, activity)
+
+    async def call(self, fn: Callable, *args, **kwargs):
+        """Run a blocking ``fn(*args, **kwargs)`` on the executor and await its result."""
+        return await asyncio.wrap_future(self.executor.submit(fn, *args, **kwargs))
+
+    def stats(self) -> Dict[str, object]:
+        return self.executor.stats()
+
+    def close(self, wait: bool = True):
+        self.executor.close(wait=wait)
+
+
+_services: Optional[AsyncServices] = None
+_services_lock = threading.Lock()
+
+
+def get_async_services() -> AsyncServices:
+    """Get or create the process-wide facade over the default service instances."""
+    global _services
+    with _services_lock:
+        if _services is None:
+            from app.services.database.database import db
+            from app.services.audit.audit_logger import audit_logger
+            from app.services.activity.activity_monitor import activity_monitor
+            _services = AsyncServices(db, audit_logger, activity_monitor)
+        return _services
+
+
+def get_async_services_stats() -> Dict[str, object]:
+    """Executor metrics for the shared facade (empty if it was never used)."""
+    return _services.stats() if _services is not None else {}
+
+
+def close_async_services():
+    """Drain and stop the shared executor (registered to run at interpreter exit)."""
+    global _services
+    with _services_lock:
+        services, _services = _services, None
+    if services is not None:
+        services.close()
+
+
+atexit.register(close_async_services)
@@ -0,0 +1,116 @@
+"""
+Content-addressed storage for report photos.
+
+Photo bytes live once in the ``report_blobs`` table, keyed by their SHA-256
+digest; ``reports.image_key`` only references that key. Reference counts are
+maintained by triggers on ``reports`` (see migration 0004), so a blob is
+removed as soon as the last report pointing at it is deleted.
+"""
+
+import base64
+import binascii
+import hashlib
+from typing import Dict, Optional, Tuple
+
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+
+
+def blob_key(data: bytes) -> str:
+    """Content address of ``data`` (hex SHA-256)."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def parse_data_uri(uri: str) -> Optional[Tuple[str, bytes]]:
+    """Split a base64 ``data:`` URI into ``(mime_type, bytes)``, or None."""
+    if not isinstance(uri, str) or not uri.startswith("data:") or "," not in uri:
+        return None
+    header, payload = uri[5:].split(",", 1)
+    if not header.endswith(";base64"):
+        return None
+    try:
+        data = base64.b64decode(payload, validate=True)
+    except (binascii.Error, ValueError):
+        return None
+    return header[:-len(";base64")] or "application/octet-stream", data
+
+
+def to_data_uri(mime_type: str, data: bytes) -> str:
+    """Encode blob bytes back into a ``data:`` URI for inline rendering."""
+    return f"data:{mime_type};base64,{base64.b64encode(data).decode('ascii')}"
+
+
+def put_blob(cursor, data: bytes, mime_type: str) -> str:
+    """Store ``data`` on an open cursor and return its key (deduplicated)."""
+    key = blob_key(data)
+    cursor.execute('''
+        INSERT OR IGNORE INTO report_blobs (key, mime_type, data, size)
+        VALUES (?, ?, ?, ?)
+    ''', (key, mime_type, data, len(data)))
+    return key
+
+
+class BlobStore:
+    """Read/write access to ``report_blobs`` for one database file."""
+
+    def __init__(self, db_path="app_database.db"):
+        self.db_path = db_path
+        self._pool = get_pool(db_path)
+        ensure_schema(db_path)
+
+    def put(self, data: bytes, mime_type: str) -> str:
+        """
+        Store photo bytes and return their key.
+
+        The blob starts with a reference count of zero; it is claimed by
+        writing the key to ``reports.image_key`` in the same transaction.
+        """
+        with self._pool.connection() as conn:
+            return put_blob(conn.cursor(), data, mime_type)
+
+    def put_data_uri(self, uri: str) -> Optional[str]:
+        """Store a base64 ``data:`` URI; returns None if it is not one."""
+        parsed = parse_data_uri(uri)
+        if parsed is None:
+            return None
+        mime_type, data = parsed
+        return self.put(data, mime_type)
+
+    def get(self, key: str) -> Optional[Dict[str, object]]:
+        """Return ``{'key', 'mime_type', 'data', 'size', 'refcount', 'created_at'}`` or None."""
+        with self._pool.connection() as conn:
+            row = conn.execute('''
+                SELECT key, mime_type, data, size, refcount, created_at
+                FROM report_blobs WHERE key = ?
+            ''', (key,)).fetchone()
+        if not row:
+            return None
+        return {
+            'key': row[0],
+            'mime_type': row[1],
+            'data': row[2],
+            'size': row[3],
+            'refcount': row[4],
+            'created_at': row[5],
+        }
+
+    def get_data_uri(self, key: str) -> Optional[str]:
+        """Return the blob as a ``data:`` URI, or None if it does not exist."""
+        blob = self.get(key)
+        if blob is None:
+            return None
+        return to_data_uri(blob['mime_type'], blob['data'])
+
+    def collect_garbage(self) -> int:
+        """Delete blobs no report references (e.g. from an aborted submit)."""
+        with self._pool.connection() as conn:
+            cursor = conn.execute('DELETE FROM report_blobs WHERE refcount <= 0')
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, int]:
+        """Blob count and total stored bytes."""
+        with self._pool.connection() as conn:
+            count, total = conn.execute(
+                'SELECT COUNT(*), COALESCE(SUM(size), 0) FROM report_blobs'
+            ).fetchone()
+        return {'blobs': count, 'bytes': total}
@@ -0,0 +1,125 @@
+"""
+Maintenance commands for the application database.
+
+    python -m app.services.database.cli [--db app_database.db] rebuild-rollups
+    python -m app.services.database.cli [--db app_database.db] check-rollups
+    python -m app.services.database.cli [--db app_database.db] import-reports reports.csv
+    python -m app.services.database.cli [--db app_database.db] export-reports out.jsonl [--status resolved]
+    python -m app.services.database.cli [--db app_database.db] archive-audit [--days 180]
+
+Report files are CSV (with a header row) or JSON Lines, picked from the file
+extension unless ``--format`` is given; ``-`` means stdin/stdout.
+"""
+
+import argparse
+import contextlib
+import sys
+import time
+
+from app.services.audit.audit_archive import ArchiveConfig, archive_audit_logs
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+from app.services.database.report_io import FORMATS, detect_format, read_reports
+from app.services.database.rollups import rebuild_rollups, rollup_drift
+
+
+def _rebuild_rollups(args):
+    ensure_schema(args.db)
+    with get_pool(args.db).connection() as conn:
+        rebuild_rollups(conn.cursor())
+    print(f"{args.db}: analytics rollups rebuilt")
+    return 0
+
+
+def _check_rollups(args):
+    ensure_schema(args.db)
+    with get_pool(args.db).connection() as conn:
+        drifted = rollup_drift(conn.cursor())
+    if drifted:
+        print(f"{args.db}: out of date: {', '.join(drifted)} (run rebuild-rollups)")
+        return 1
+    print(f"{args.db}: analytics rollups are consistent")
+    return 0
+
+
+def _open_text(path, mode):
+    """Open ``path`` for CSV/JSONL text I/O; ``-`` maps to stdin/stdout."""
+    if path == "-":
+        return contextlib.nullcontext(sys.stdin if mode == "r" else sys.stdout)
+    return open(path, mode, newline="", encoding="utf-8")
+
+
+def _database(path):
+    from app.services.database.database import Database
+    return Database(db_name=path)
+
+
+def _import_reports(args):
+    fmt = args.format or detect_format(args.file)
+    started = time.perf_counter()
+    with _open_text(args.file, "r") as fp:
+        try:
+            count = _database(args.db).bulk_import_reports(read_reports(fp, fmt), chunk_size=args.chunk_size)
+        except ValueError as e:
+            print(f"{args.file}: {e}", file=sys.stderr)
+            return 1
+    print(f"{args.db}: imported {count} reports in {time.perf_counter() - started:.1f}s", file=sys.stderr)
+    return 0
+
+
+def _export_reports(args):
+    fmt = args.format or detect_format(args.file)
+    filters = {"category": args.category, "status": args.status, "user_email": args.user_email}
+    with _open_text(args.file, "w") as fp:
+        count = _database(args.db).export_reports(fp, fmt, filters=filters, include_images=args.include_images)
+    print(f"{args.db}: exported {count} reports", file=sys.stderr)
+    return 0
+
+
+def _archive_audit(args):
+    ensure_schema(args.db)
+    moved = archive_audit_logs(args.db, args.days)
+    print(f"{args.db}: archived {moved} audit log entries older than {args.days} days")
+    return 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog="python -m app.services.database.cli",
+                                     description="Database maintenance commands")
+    parser.add_argument("--db", default="app_database.db", help="database file (default: app_database.db)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    commands.add_parser("rebuild-rollups", help="recompute the analytics rollup tables"
+                        ).set_defaults(handler=_rebuild_rollups)
+    commands.add_parser("check-rollups", help="verify the rollup tables match the reports table"
+                        ).set_defaults(handler=_check_rollups)
+
+    importer = commands.add_parser("import-reports", help="bulk load reports from a CSV or JSONL file")
+    importer.add_argument("file", help="input file, or - for stdin")
+    importer.add_argument("--format", choices=FORMATS, help="input format (default: from extension, else csv)")
+    importer.add_argument("--chunk-size", type=int, default=None, help="reports per transaction")
+    importer.set_defaults(handler=_import_reports)
+
+    exporter = commands.add_parser("export-reports", help="stream reports to a CSV or JSONL file")
+    exporter.add_argument("file", help="output file, or - for stdout")
+    exporter.add_argument("--format", choices=FORMATS, help="output format (default: from extension, else csv)")
+    exporter.add_argument("--category", help="only reports in this category")
+    exporter.add_argument("--status", help="only reports with this status")
+    exporter.add_argument("--user-email", help="only reports by this user")
+    exporter.add_argument("--include-images", action="store_true", help="embed stored photos as data: URIs")
+    exporter.set_defaults(handler=_export_reports)
+
+    archiver = commands.add_parser("archive-audit", help="move old audit log entries into monthly archives")
+    archiver.add_argument("--days", type=int, default=ArchiveConfig.RETENTION_DAYS,
+                          help=f"keep this many days in the live table (default: {ArchiveConfig.RETENTION_DAYS})")
+    archiver.set_defaults(handler=_archive_audit)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    return args.handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
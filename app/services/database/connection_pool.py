@@ -0,0 +1,269 @@
+"""
+SQLite connection pooling shared by the database, audit and activity services.
+
+Connections are opened once, tuned for a concurrent web workload (WAL journal,
+relaxed fsync, busy timeout, memory-mapped reads, statement cache) and then
+reused across requests instead of being reopened for every statement.
+"""
+
+import atexit
+import os
+import queue
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Optional
+
+
+class PoolConfig:
+    # Upper bound on open connections per database file
+    MAX_CONNECTIONS = 8
+
+    # How long a caller waits for a free connection before giving up (seconds)
+    ACQUIRE_TIMEOUT = 10
+
+    # Connection profile applied when a connection is opened
+    BUSY_TIMEOUT_MS = 5000
+    MMAP_SIZE = 64 * 1024 * 1024  # 64 MB
+    CACHED_STATEMENTS = 256
+    JOURNAL_MODE = "WAL"
+    SYNCHRONOUS = "NORMAL"
+
+
+class PoolTimeoutError(sqlite3.OperationalError):
+    """Raised when no pooled connection becomes free within the timeout."""
+
+
+class ConnectionPool:
+    """
+    Bounded pool of long-lived SQLite connections for one database file.
+
+    Use ``connection()`` as a context manager: the transaction is committed
+    on success, rolled back on error, and the connection goes back to the
+    pool either way. Nested ``connection()`` calls on the same thread reuse
+    the outer connection so that they share its transaction.
+    """
+
+    def __init__(self, db_path: str, max_size: int = PoolConfig.MAX_CONNECTIONS):
+        self.db_path = db_path
+        self.max_size = max_size
+
+        # Idle connections, plus None wake-ups queued by _discard for blocked acquirers
+        self._idle: "queue.LifoQueue[Optional[sqlite3.Connection]]" = queue.LifoQueue()
+        self._waiting = 0
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+
+        # Metrics
+        self._created = 0
+        self._in_use = 0
+        self._checkouts = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._wait_seconds = 0.0
+
+    def connect(self) -> sqlite3.Connection:
+        """Open a new, unpooled connection with the tuned profile applied."""
+        conn = sqlite3.connect(
+            self.db_path,
+            timeout=PoolConfig.BUSY_TIMEOUT_MS / 1000,
+            check_same_thread=False,
+            cached_statements=PoolConfig.CACHED_STATEMENTS,
+        )
+        try:
+            self._configure(conn)
+        except sqlite3.Error:
+            conn.close()
+            raise
+        return conn
+
+    @staticmethod
+    def _configure(conn: sqlite3.Connection):
+        """Apply the connection profile (pragmas are per connection)."""
+        cursor = conn.cursor()
+        cursor.execute(f"PRAGMA journal_mode = {PoolConfig.JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous = {PoolConfig.SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA busy_timeout = {int(PoolConfig.BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA mmap_size = {int(PoolConfig.MMAP_SIZE)}")
+        cursor.close()
+
+    def acquire(self, timeout: Optional[float] = None) -> sqlite3.Connection:
+        """Check a connection out of the pool, opening one if below the limit."""
+        if self._closed:
+            raise sqlite3.ProgrammingError(f"Connection pool for {self.db_path} is closed")
+
+        timeout = PoolConfig.ACQUIRE_TIMEOUT if timeout is None else timeout
+        started = None
+
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                conn = None
+            if conn is not None:
+                break
+
+            # Nothing idle (or a wake-up left by _discard): open one if there is room,
+            # otherwise register as waiting under the same lock so no discard is missed.
+            with self._lock:
+                can_open = self._created < self.max_size
+                if can_open:
+                    self._created += 1
+                else:
+                    self._waiting += 1
+            if can_open:
+                try:
+                    conn = self.connect()
+                except Exception:
+                    with self._lock:
+                        self._created -= 1
+                    raise
+                break
+
+            if started is None:
+                started = time.monotonic()
+            remaining = timeout - (time.monotonic() - started)
+            try:
+                if remaining <= 0:
+                    raise queue.Empty
+                conn = self._idle.get(timeout=remaining)
+            except queue.Empty:
+                with self._lock:
+                    self._timeouts += 1
+                raise PoolTimeoutError(
+                    f"No free connection for {self.db_path} after {timeout}s"
+                )
+            finally:
+                with self._lock:
+                    self._waiting -= 1
+            if conn is not None:
+                break
+
+        if started is not None:
+            with self._lock:
+                self._waits += 1
+                self._wait_seconds += time.monotonic() - started
+
+        with self._lock:
+            self._in_use += 1
+            self._checkouts += 1
+        return conn
+
+    def release(self, conn: sqlite3.Connection, discard: bool = False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        with self._lock:
+            self._in_use -= 1
+
+        if not discard:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+
+        if discard or self._closed:
+            self._discard(conn)
+        else:
+            self._idle.put(conn)
+
+    def _discard(self, conn: sqlite3.Connection):
+        with self._lock:
+            self._created -= 1
+            # Wake a caller blocked in acquire() so it opens a connection in the freed slot.
+            wake = self._waiting > 0 and not self._closed
+        if wake:
+            self._idle.put(None)
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+
+    @contextmanager
+    def connection(self):
+        """Yield a pooled connection wrapped in a transaction."""
+        held = getattr(self._local, "conn", None)
+        if held is not None:
+            # Re-entrant use on the same thread joins the outer transaction.
+            yield held
+            return
+
+        conn = self.acquire()
+        self._local.conn = conn
+        discard = False
+        try:
+            yield conn
+            if conn.in_transaction:
+                conn.commit()
+        except BaseException:
+            try:
+                if conn.in_transaction:
+                    conn.rollback()
+            except sqlite3.Error:
+                discard = True
+            raise
+        finally:
+            self._local.conn = None
+            self.release(conn, discard=discard)
+
+    def stats(self) -> Dict[str, object]:
+        """Snapshot of pool metrics for monitoring."""
+        with self._lock:
+            return {
+                'db_path': self.db_path,
+                'max_size': self.max_size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'idle': self._idle.qsize(),
+                'checkouts': self._checkouts,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_wait_ms': round(self._wait_seconds / self._waits * 1000, 3) if self._waits else 0.0,
+            }
+
+    def close(self):
+        """Close idle connections; checked-out ones are closed on release."""
+        self._closed = True
+        while True:
+            try:
+                conn = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            if conn is not None:
+                self._discard(conn)
+
+
+# Registry of pools keyed by absolute database path
+_pools: Dict[str, ConnectionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(db_path: str) -> ConnectionPool:
+    """Get or create the shared pool for a database file."""
+    key = os.path.abspath(db_path)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None or pool._closed:
+            pool = ConnectionPool(db_path)
+            _pools[key] = pool
+        return pool
+
+
+def get_pool_stats() -> Dict[str, Dict[str, object]]:
+    """Metrics for every open pool, keyed by database path."""
+    with _pools_lock:
+        pools = list(_pools.items())
+    return {path: pool.stats() for path, pool in pools}
+
+
+def close_all_pools():
+    """Close every pool (registered to run at interpreter exit)."""
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+atexit.register(close_all_pools)
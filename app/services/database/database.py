@@ -1,105 +1,241 @@
-import sqlite3
 import hashlib
+import json
+import re
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List
+from app.services.audit.audit_logger import write_audit_rows
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+from app.services.database.rollups import add_to_rollups, rebuild_rollups
+from app.services.database.report_status import (
+    STATUS_LABELS, ReportStatus, parse_status, status_code_sql, status_key_sql,
+)
+from app.services.database.blob_store import BlobStore, blob_key, parse_data_uri, put_blob, to_data_uri
+from app.services.database.report_io import EXPORT_FIELDS, REQUIRED_FIELDS, write_reports
+
+
+@dataclass(frozen=True)
+class DashboardSnapshot:
+    """Admin dashboard analytics read from one consistent database snapshot."""
+    total_reports: int
+    total_users: int
+    resolution_rate: Dict[str, float]
+    status_counts: Dict[str, int]
+    reports_per_day: List[Dict[str, object]] = field(default_factory=list)
+    reports_per_category: List[Dict[str, object]] = field(default_factory=list)
+    reports_per_location: List[Dict[str, object]] = field(default_factory=list)
+    top_reporters: List[Dict[str, object]] = field(default_factory=list)
+
+
+@contextmanager
+def _suspended_triggers(cursor, names):
+    """
+    Drop triggers for the duration of the block and recreate them from their
+    stored definitions. Run inside a write transaction so other connections
+    never observe the table without them.
+    """
+    placeholders = ', '.join('?' for _ in names)
+    definitions = cursor.execute(
+        f"SELECT name, sql FROM sqlite_master WHERE type = 'trigger' AND name IN ({placeholders})",
+        list(names),
+    ).fetchall()
+    for name, _ in definitions:
+        cursor.execute(f'DROP TRIGGER {name}')
+    try:
+        yield
+    finally:
+        for _, sql in definitions:
+            cursor.execute(sql)
+
+
+# Markers wrapped around matched terms in search snippets
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+_SEARCH_TERM = re.compile(r'\w+', re.UNICODE)
+
 
 class Database:
     def __init__(self, db_name="app_database.db"):
         self.db_name = db_name
+        self._pool = get_pool(db_name)
         self.init_database()
+        self.blobs = BlobStore(db_name)
     
     def get_connection(self):
-        return sqlite3.connect(self.db_name)
+        """Open a standalone tuned connection; the caller must close it."""
+        return self._pool.connect()
+
+    def pool_stats(self):
+        """Connection pool metrics for this database."""
+        return self._pool.stats()
     
     def init_database(self):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Reports table
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS reports (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                user_email TEXT NOT NULL,
-                user_name TEXT NOT NULL,
-                user_type TEXT NOT NULL,
-                issue_description TEXT NOT NULL,
-                location TEXT NOT NULL,
-                category TEXT DEFAULT 'Uncategorized',
-                status TEXT DEFAULT 'pending'
-            )
-        ''')
-        
-        cursor.execute("PRAGMA table_info(reports)")
-        columns = [column[1] for column in cursor.fetchall()]
-        if 'category' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN category TEXT DEFAULT "Uncategorized"')
-        if 'created_at' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN created_at TIMESTAMP')
-        if 'admin_remarks' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN admin_remarks TEXT')
-        if 'status_updated_at' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN status_updated_at TIMESTAMP')
-        if 'status_updated_by' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN status_updated_by TEXT')
-        if 'report_image' not in columns:
-            cursor.execute('ALTER TABLE reports ADD COLUMN report_image TEXT')
-
-        # Older rows may have NULL timestamps after migrations; keep analytics usable.
-        cursor.execute('''
-            UPDATE reports
-            SET created_at = COALESCE(created_at, status_updated_at, CURRENT_TIMESTAMP)
-            WHERE created_at IS NULL
-        ''')
-        
-        cursor.execute('''
-            CREATE TABLE IF NOT EXISTS users (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                email TEXT UNIQUE NOT NULL,
-                name TEXT NOT NULL,
-                role TEXT NOT NULL,
-                profile_picture TEXT,
-                password_hash TEXT,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
-            )
-        ''')
-        
-        conn.commit()
-        conn.close()
-
+        """Apply any pending schema migrations (a version check once current)."""
+        ensure_schema(self.db_name)
     
-    def add_report(self, user_email, user_name, user_type, issue_description, location, category="Uncategorized", report_image=None):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute('''
-            INSERT INTO reports (
-                user_email, user_name, user_type, issue_description, location,
-                category, status, report_image, created_at
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
-        ''', (user_email, user_name, user_type, issue_description, location, category, 'pending', report_image))
+    def add_report(self, user_email, user_name, user_type, issue_description, location, category="Uncategorized",
+                   report_image=None, with_image_key=False):
+        """
+        Insert a report. A ``data:`` URI photo is stored in the blob store and
+        only its key is kept on the report; other values (external URLs) are
+        stored as given.
+
+        Returns the new report id, or ``(report_id, image_key)`` when
+        ``with_image_key`` is set (``image_key`` is None without a stored photo).
+        """
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+        
+            image_key = None
+            parsed = parse_data_uri(report_image) if report_image else None
+            if parsed is not None:
+                mime_type, data = parsed
+                image_key = put_blob(cursor, data, mime_type)
+                report_image = None
         
-        conn.commit()
-        report_id = cursor.lastrowid
-        conn.close()
-        return report_id
+            cursor.execute('''
+                INSERT INTO reports (
+                    user_email, user_name, user_type, issue_description, location,
+                    category, status, status_code, report_image, image_key, created_at
+                )
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, CURRENT_TIMESTAMP)
+            ''', (user_email, user_name, user_type, issue_description, location, category,
+                  ReportStatus.PENDING.key, ReportStatus.PENDING.value, report_image, image_key))
+        
+            report_id = cursor.lastrowid
+            if with_image_key:
+                return report_id, image_key
+            return report_id
     
-    @staticmethod
-    def _canon(s):
-        if not s:
-            return 'Pending'
-        s = s.strip().lower()
-        if 'pending' in s:
-            return 'Pending'
-        if 'on going' in s or 'ongoing' in s or 'in progress' in s:
-            return 'In Progress'
-        if 'fixed' in s or 'resolved' in s:
-            return 'Resolved'
-        if 'reject' in s or 'rejected' in s:
-            return 'Rejected'
-        return str(s).title()
+    # Reports written per transaction by bulk_import_reports
+    IMPORT_CHUNK_SIZE = 1000
+
+    # Per-row insert triggers replaced by set-based statements during bulk import
+    _BULK_SUSPENDED_TRIGGERS = (
+        'trg_reports_fts_insert',
+        'trg_reports_rollup_insert',
+        'trg_reports_status_code_insert',
+    )
+
+    def bulk_import_reports(self, reports, chunk_size=None):
+        """
+        Insert reports from an iterable of dicts, e.g. ``report_io.read_reports()``.
+
+        Records use the ``report_io.EXPORT_FIELDS`` keys; ``id`` is ignored and
+        new ids are assigned. Status spellings are canonicalised, a missing
+        ``created_at`` defaults to now and ``data:`` URI photos go to the blob
+        store. The iterable is consumed lazily and written with ``executemany``
+        in transactions of ``chunk_size`` rows, so memory use stays flat.
+
+        A record missing a required field raises ValueError; chunks committed
+        before it remain imported. Returns the number of reports inserted.
+        """
+        chunk_size = chunk_size or self.IMPORT_CHUNK_SIZE
+        imported = 0
+        chunk = []
+        for n, record in enumerate(reports, 1):
+            missing = [f for f in REQUIRED_FIELDS if not record.get(f)]
+            if missing:
+                raise ValueError(f"record {n}: missing {', '.join(missing)}")
+            chunk.append(record)
+            if len(chunk) >= chunk_size:
+                imported += self._import_chunk(chunk)
+                chunk = []
+        if chunk:
+            imported += self._import_chunk(chunk)
+        return imported
+
+    def _import_chunk(self, records):
+        """Insert one chunk of validated records in a single transaction."""
+        with self._pool.connection() as conn:
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            cursor = conn.cursor()
+            rows = []
+            for record in records:
+                status = parse_status(record.get('status'))
+                report_image, image_key = record.get('report_image'), None
+                parsed = parse_data_uri(report_image) if report_image else None
+                if parsed is not None:
+                    image_key = put_blob(cursor, parsed[1], parsed[0])
+                    report_image = None
+                rows.append((
+                    record['user_email'], record['user_name'], record['user_type'],
+                    record['issue_description'], record['location'],
+                    record.get('category') or 'Uncategorized', status.key, status.value,
+                    record.get('admin_remarks'), report_image, image_key, record.get('created_at'),
+                    record.get('status_updated_at'), record.get('status_updated_by'),
+                ))
+
+            # Holding the write lock, every id above the current maximum is ours.
+            last_id = cursor.execute('SELECT COALESCE(MAX(id), 0) FROM reports').fetchone()[0]
+            with _suspended_triggers(cursor, self._BULK_SUSPENDED_TRIGGERS):
+                cursor.executemany('''
+                    INSERT INTO reports (
+                        user_email, user_name, user_type, issue_description, location,
+                        category, status, status_code, admin_remarks, report_image, image_key,
+                        created_at, status_updated_at, status_updated_by
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, COALESCE(?, CURRENT_TIMESTAMP), ?, ?)
+                ''', rows)
+                # Status codes were written above; index and count the chunk in bulk.
+                cursor.execute('''
+                    INSERT INTO reports_fts (rowid, issue_description, location, admin_remarks)
+                    SELECT id, issue_description, location, admin_remarks FROM reports WHERE id > ?
+                ''', (last_id,))
+                add_to_rollups(cursor, 'id > ?', (last_id,))
+            return len(rows)
+
+    def iter_reports(self, filters=None, include_images=False, batch_size=500):
+        """
+        Yield reports oldest first as ``EXPORT_FIELDS`` dicts, ``batch_size`` rows at a time.
+
+        ``filters`` accepts the same keys as ``get_reports_page``. With
+        ``include_images`` stored photos are returned as ``data:`` URIs in
+        ``report_image``; otherwise only external image URLs are included.
+        The pooled connection is held until the generator is exhausted or closed.
+        """
+        where, params = self._report_filters(filters, alias='r.')
+        cols = ', '.join(f'r.{c}' for c in EXPORT_FIELDS)
+        if include_images:
+            query = f'''
+                SELECT {cols}, b.mime_type, b.data FROM reports r
+                LEFT JOIN report_blobs b ON b.key = r.image_key
+            '''
+        else:
+            query = f'SELECT {cols}, NULL, NULL FROM reports r'
+        query += f' WHERE 1=1{where} ORDER BY r.id'
+
+        with self._pool.connection() as conn:
+            cursor = conn.execute(query, params)
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    report = dict(zip(EXPORT_FIELDS, row))
+                    if row[-1] is not None and not report['report_image']:
+                        report['report_image'] = to_data_uri(row[-2], row[-1])
+                    yield report
+
+    def export_reports(self, fp, format='csv', filters=None, include_images=False):
+        """
+        Stream reports to the text stream ``fp`` as CSV or JSON Lines (``'jsonl'``).
+
+        Rows go from the cursor to ``fp`` as they are fetched (see
+        ``iter_reports``); the output can be re-imported with
+        ``bulk_import_reports``. Returns the number of reports written.
+        """
+        reports = self.iter_reports(filters=filters, include_images=include_images)
+        try:
+            return write_reports(fp, reports, format)
+        finally:
+            reports.close()
 
     def _row_to_report(self, row):
-        """Convert a DB row tuple to report dict."""
+        """Convert a row selected with ``_REPORT_COLS`` to a report dict."""
         return {
             'id': row[0],
             'user_email': row[1],
@@ -107,399 +243,573 @@ class Database:
             'user_type': row[3],
             'issue_description': row[4],
             'location': row[5],
-            'report_image': row[6] if len(row) > 6 else None,
-            'category': row[7] if len(row) > 7 else 'Uncategorized',
-            'status': self._canon(row[8] if len(row) > 8 else 'pending'),
-            'admin_remarks': row[9] if len(row) > 9 else None,
-            'status_updated_at': row[10] if len(row) > 10 else None,
-            'status_updated_by': row[11] if len(row) > 11 else None,
+            'report_image': row[6],
+            'category': row[7],
+            'status': STATUS_LABELS[row[13]],
+            'admin_remarks': row[9],
+            'status_updated_at': row[10],
+            'status_updated_by': row[11],
+            'image_key': row[12],
         }
 
     _REPORT_COLS = '''id, user_email, user_name, user_type, issue_description,
                       location, report_image, category, status, admin_remarks,
-                      status_updated_at, status_updated_by'''
+                      status_updated_at, status_updated_by, image_key, status_code'''
 
     def get_all_reports(self):
         """Get all reports"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports ORDER BY id DESC')
-        reports = cursor.fetchall()
-        conn.close()
-        return [self._row_to_report(r) for r in reports]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports ORDER BY id DESC')
+            reports = cursor.fetchall()
+            return [self._row_to_report(r) for r in reports]
     
     def get_reports_by_user(self, user_email):
         """Get all reports by a specific user"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE user_email = ? ORDER BY id DESC',
-                       (user_email,))
-        reports = cursor.fetchall()
-        conn.close()
-        return [self._row_to_report(r) for r in reports]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE user_email = ? ORDER BY id DESC',
+                           (user_email,))
+            reports = cursor.fetchall()
+            return [self._row_to_report(r) for r in reports]
     
     def get_reports_by_category(self, category):
         """Get all reports by category"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE category = ? ORDER BY id DESC',
-                       (category,))
-        reports = cursor.fetchall()
-        conn.close()
-        return [self._row_to_report(r) for r in reports]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE category = ? ORDER BY id DESC',
+                           (category,))
+            reports = cursor.fetchall()
+            return [self._row_to_report(r) for r in reports]
 
     def get_report_by_id(self, report_id):
         """Return a single report dict by id or None if not found."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE id = ? LIMIT 1',
-                       (report_id,))
-        r = cursor.fetchone()
-        conn.close()
-        return self._row_to_report(r) if r else None
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'SELECT {self._REPORT_COLS} FROM reports WHERE id = ? LIMIT 1',
+                           (report_id,))
+            r = cursor.fetchone()
+            return self._row_to_report(r) if r else None
     
+    def get_reports_page(self, cursor=None, limit=20, filters=None):
+        """
+        Get one page of reports, newest first, using keyset pagination on id.
+
+        Pass the previous page's ``next_cursor`` as ``cursor`` (None for the
+        first page). ``filters`` may hold ``user_email``, ``category`` and
+        ``status``. Returns ``{'reports': [...], 'next_cursor': id or None}``.
+        """
+        where, params = self._report_filters(filters)
+        query = f'SELECT {self._REPORT_COLS} FROM reports WHERE 1=1{where}'
+
+        if cursor is not None:
+            query += ' AND id < ?'
+            params.append(cursor)
+
+        # Fetch one extra row to know whether another page exists.
+        query += ' ORDER BY id DESC LIMIT ?'
+        params.append(limit + 1)
+
+        with self._pool.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        return {
+            'reports': [self._row_to_report(r) for r in rows],
+            'next_cursor': rows[-1][0] if has_more and rows else None,
+        }
+
     @staticmethod
-    def _normalize_status(new_status):
-        ns = (new_status or '').strip().lower()
-        if 'pending' in ns:
-            return 'pending'
-        if 'on going' in ns or 'ongoing' in ns or 'in progress' in ns:
-            return 'in progress'
-        if 'fixed' in ns or 'resolved' in ns:
-            return 'resolved'
-        if 'reject' in ns or 'rejected' in ns:
-            return 'rejected'
-        return ns
+    def _report_filters(filters, alias=''):
+        """SQL ``AND`` clauses and params for ``user_email``/``category``/``status`` filters."""
+        filters = filters or {}
+        sql = ''
+        params = []
+        if filters.get('user_email'):
+            sql += f' AND {alias}user_email = ?'
+            params.append(filters['user_email'])
+        if filters.get('category'):
+            sql += f' AND {alias}category = ?'
+            params.append(filters['category'])
+        if filters.get('status'):
+            sql += f' AND {alias}status_code = ?'
+            params.append(parse_status(filters['status']).value)
+        return sql, params
 
-    def update_report_status(self, report_id, new_status, remarks=None, updated_by=None):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        ns = self._normalize_status(new_status)
+    # bm25 weights for issue_description, location, admin_remarks
+    _SEARCH_WEIGHTS = (3.0, 2.0, 1.0)
 
-        if remarks is not None:
-            cursor.execute('''
-                UPDATE reports
-                SET status = ?, admin_remarks = ?, status_updated_at = CURRENT_TIMESTAMP,
-                    status_updated_by = ?
-                WHERE id = ?
-            ''', (ns, remarks, updated_by, report_id))
+    @staticmethod
+    def _fts_query(text):
+        """Turn free text into an FTS5 query: every word must match, the last as a prefix."""
+        terms = _SEARCH_TERM.findall(text or '')
+        if not terms:
+            return None
+        quoted = [f'"{term}"' for term in terms]
+        quoted[-1] += '*'
+        return ' '.join(quoted)
+
+    def search_reports(self, query, filters=None, limit=20, cursor=None):
+        """
+        Full-text search over description, location and admin remarks.
+
+        Results are ranked by bm25 (best first) and carry a ``snippet`` with
+        matched terms wrapped in ``SNIPPET_START``/``SNIPPET_END``. ``filters``
+        accepts the same keys as ``get_reports_page``. Pass the previous
+        page's ``next_cursor`` to continue. Returns
+        ``{'reports': [...], 'next_cursor': (score, id) or None}``.
+        """
+        match = self._fts_query(query)
+        if match is None:
+            return {'reports': [], 'next_cursor': None}
+
+        weights = ', '.join(str(w) for w in self._SEARCH_WEIGHTS)
+        cols = ', '.join(f'r.{c.strip()}' for c in self._REPORT_COLS.split(','))
+        inner = f'''
+            SELECT {cols},
+                   bm25(reports_fts, {weights}) AS score,
+                   snippet(reports_fts, -1, '{SNIPPET_START}', '{SNIPPET_END}', '…', 16) AS snippet
+            FROM reports_fts
+            JOIN reports r ON r.id = reports_fts.rowid
+            WHERE reports_fts MATCH ?
+        '''
+        where, filter_params = self._report_filters(filters, alias='r.')
+        inner += where
+        params = [match] + filter_params
+
+        sql = f'SELECT * FROM ({inner})'
+        if cursor is not None:
+            sql += ' WHERE (score, id) > (?, ?)'
+            params.extend(cursor)
+        sql += ' ORDER BY score, id LIMIT ?'
+        params.append(limit + 1)
+
+        with self._pool.connection() as conn:
+            rows = conn.execute(sql, params).fetchall()
+
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        reports = []
+        for row in rows:
+            report = self._row_to_report(row[:-2])
+            report['score'] = row[-2]
+            report['snippet'] = row[-1]
+            reports.append(report)
+        return {
+            'reports': reports,
+            'next_cursor': (rows[-1][-2], rows[-1][0]) if has_more and rows else None,
+        }
+
+    def get_status_counts(self, category=None):
+        """Get report counts per canonical status, optionally within a category."""
+        counts = {'pending': 0, 'in progress': 0, 'resolved': 0, 'rejected': 0}
+        if category:
+            query = 'SELECT status, count FROM report_counts_by_category WHERE category = ?'
+            params = [category]
         else:
-            cursor.execute('''
+            query = 'SELECT status, count FROM report_counts_by_status'
+            params = []
+
+        with self._pool.connection() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        # Rollup rows are keyed by canonical status already.
+        counts.update(rows)
+        return counts
+
+    def update_report_status(self, report_id, new_status, remarks=None, updated_by=None):
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            status = parse_status(new_status)
+
+            if remarks is not None:
+                cursor.execute('''
+                    UPDATE reports
+                    SET status = ?, status_code = ?, admin_remarks = ?,
+                        status_updated_at = CURRENT_TIMESTAMP, status_updated_by = ?
+                    WHERE id = ?
+                ''', (status.key, status.value, remarks, updated_by, report_id))
+            else:
+                cursor.execute('''
+                    UPDATE reports
+                    SET status = ?, status_code = ?, status_updated_at = CURRENT_TIMESTAMP,
+                        status_updated_by = ?
+                    WHERE id = ?
+                ''', (status.key, status.value, updated_by, report_id))
+
+    def update_statuses_bulk(self, changes, actor):
+        """
+        Apply many status changes and their audit entries in one transaction.
+
+        ``changes`` is an iterable of ``(report_id, new_status)`` or
+        ``(report_id, new_status, remarks)``; ``actor`` is the admin's user
+        dict (``email`` and ``name``); ValueError is raised without one, so
+        changes are never audited anonymously. Unknown report ids are
+        skipped. Either every update and audit row is committed or none is.
+        Returns the ids that were updated.
+        """
+        if not actor or not actor.get('email'):
+            raise ValueError("update_statuses_bulk requires an actor with an email")
+        parsed = []
+        for change in changes:
+            remarks = change[2] if len(change) > 2 and change[2] else None
+            parsed.append((change[0], parse_status(change[1]), remarks))
+        if not parsed:
+            return []
+
+        actor_email = actor['email']
+        actor_name = actor.get('name') or 'Unknown Admin'
+
+        with self._pool.connection() as conn:
+            if not conn.in_transaction:
+                conn.execute('BEGIN IMMEDIATE')
+            existing = {row[0] for row in conn.execute(
+                'SELECT id FROM reports WHERE id IN (SELECT value FROM json_each(?))',
+                (json.dumps([report_id for report_id, _, _ in parsed]),),
+            )}
+            parsed = [change for change in parsed if change[0] in existing]
+
+            cursor = conn.cursor()
+            cursor.executemany('''
                 UPDATE reports
-                SET status = ?, status_updated_at = CURRENT_TIMESTAMP,
-                    status_updated_by = ?
+                SET status = ?, status_code = ?, admin_remarks = COALESCE(?, admin_remarks),
+                    status_updated_at = CURRENT_TIMESTAMP, status_updated_by = ?
                 WHERE id = ?
-            ''', (ns, updated_by, report_id))
+            ''', [(status.key, status.value, remarks, actor_email, report_id)
+                  for report_id, status, remarks in parsed])
+            write_audit_rows(cursor, [
+                (actor_email, actor_name, 'report_status_change', 'report', report_id,
+                 f"Changed report status to {status.label}" + (f" | Remarks: {remarks}" if remarks else ""),
+                 'success')
+                for report_id, status, remarks in parsed
+            ])
+        return [report_id for report_id, _, _ in parsed]
 
-        conn.commit()
-        conn.close()
-    
     def migrate_statuses_to_canonical(self):
-        """Normalize existing status values in DB to canonical lowercase values."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, status FROM reports')
-        rows = cursor.fetchall()
-
-        def _canon_val(s):
-            if not s:
-                return 'pending'
-            s0 = s.strip().lower()
-            if 'pending' in s0:
-                return 'pending'
-            if 'on going' in s0 or 'ongoing' in s0 or 'in progress' in s0:
-                return 'in progress'
-            if 'fixed' in s0 or 'resolved' in s0:
-                return 'resolved'
-            if 'reject' in s0 or 'rejected' in s0:
-                return 'rejected'
-            return s0
-
-        for r in rows:
-            rid, val = r
-            canon = _canon_val(val)
-            if canon != (val or '').strip().lower():
-                cursor.execute('UPDATE reports SET status = ? WHERE id = ?', (canon, rid))
-
-        conn.commit()
-        conn.close()
-    
+        """Rewrite legacy status spellings to canonical keys in one set-based UPDATE."""
+        key_sql = status_key_sql('status')
+        code_sql = status_code_sql('status')
+        with self._pool.connection() as conn:
+            cursor = conn.execute(f'''
+                UPDATE reports
+                SET status = {key_sql}, status_code = {code_sql}
+                WHERE status IS NOT {key_sql} OR status_code IS NOT {code_sql}
+            ''')
+            return cursor.rowcount
+
     def update_report(self, report_id, issue_description, location):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            UPDATE reports
-            SET issue_description = ?, location = ?
-            WHERE id = ?
-        ''', (issue_description, location, report_id))
+            cursor.execute('''
+                UPDATE reports
+                SET issue_description = ?, location = ?
+                WHERE id = ?
+            ''', (issue_description, location, report_id))
         
-        conn.commit()
-        conn.close()
-    
     def delete_report(self, report_id):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('DELETE FROM reports WHERE id = ?', (report_id,))
+            cursor.execute('DELETE FROM reports WHERE id = ?', (report_id,))
         
-        conn.commit()
-        conn.close()
-    
+    def get_report_image(self, image_key):
+        """Return a report photo from the blob store as a ``data:`` URI."""
+        if not image_key:
+            return None
+        return self.blobs.get_data_uri(image_key)
+
     def user_exists(self, user_email):
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT 1 FROM reports WHERE user_email = ? LIMIT 1', (user_email,))
-        exists = cursor.fetchone() is not None
-        conn.close()
-        return exists
-    
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT 1 FROM reports WHERE user_email = ? LIMIT 1', (user_email,))
+            exists = cursor.fetchone() is not None
+            return exists
     
+    @staticmethod
+    def _avatar_key(picture):
+        """Content key for a data URI avatar (None for URLs or no picture)."""
+        parsed = parse_data_uri(picture) if picture else None
+        return blob_key(parsed[1]) if parsed else None
+
     def get_or_create_user(self, email, name, role, picture=None):
         """Get user from database or create if doesn't exist"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+        
+            cursor.execute('SELECT email, name, role, profile_picture FROM users WHERE email = ?', (email,))
+            user = cursor.fetchone()
         
-        cursor.execute('SELECT email, name, role, profile_picture FROM users WHERE email = ?', (email,))
-        user = cursor.fetchone()
+            if not user:
+                # A concurrent callback may create the user first; theirs wins.
+                cursor.execute('''
+                    INSERT INTO users (email, name, role, profile_picture, avatar_key)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(email) DO NOTHING
+                    RETURNING email, name, role, profile_picture
+                ''', (email, name, role, picture, self._avatar_key(picture)))
+                user = cursor.fetchone()
+                if not user:
+                    cursor.execute('SELECT email, name, role, profile_picture FROM users WHERE email = ?', (email,))
+                    user = cursor.fetchone()
         
-        if user:
-            # User exists, return their data
-            conn.close()
             return {
                 'email': user[0],
                 'name': user[1],
                 'role': user[2],
                 'picture': user[3]
             }
-        else:
-            # Create new user
-            cursor.execute('''
-                INSERT INTO users (email, name, role, profile_picture)
-                VALUES (?, ?, ?, ?)
-            ''', (email, name, role, picture))
-            conn.commit()
-            conn.close()
-            
-            return {
-                'email': email,
-                'name': name,
-                'role': role,
-                'picture': picture
-            }
     
     def create_or_update_user(self, email, name, role, picture=None):
         """Create new user or update existing user (upsert operation)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        
-        # Check if user exists
-        cursor.execute('SELECT id FROM users WHERE email = ?', (email,))
-        exists = cursor.fetchone()
-        
-        if exists:
-            # Update existing user
+        picture = picture or None
+        avatar_key = self._avatar_key(picture)
+        with self._pool.connection() as conn:
+            # Existing users (every login after the first) take a single UPDATE.
+            # Without a picture the avatar columns (and their index) are left alone.
             if picture:
-                cursor.execute('''
+                cursor = conn.execute('''
                     UPDATE users
-                    SET name = ?, role = ?, profile_picture = ?, updated_at = CURRENT_TIMESTAMP
+                    SET name = ?, role = ?, profile_picture = ?, avatar_key = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE email = ?
-                ''', (name, role, picture, email))
+                ''', (name, role, picture, avatar_key, email))
             else:
-                cursor.execute('''
+                cursor = conn.execute('''
                     UPDATE users
                     SET name = ?, role = ?, updated_at = CURRENT_TIMESTAMP
                     WHERE email = ?
                 ''', (name, role, email))
-        else:
-            # Create new user
-            cursor.execute('''
-                INSERT INTO users (email, name, role, profile_picture)
-                VALUES (?, ?, ?, ?)
-            ''', (email, name, role, picture))
-        
-        conn.commit()
-        conn.close()
-        
-        return {
-            'email': email,
-            'name': name,
-            'role': role,
-            'picture': picture
-        }
+            if cursor.rowcount == 0:
+                # New user. The upsert turns a concurrent callback's insert into an
+                # update instead of a duplicate-key error. (Upserting every time is
+                # slower: AUTOINCREMENT rewrites sqlite_sequence on each attempted insert.)
+                conn.execute('''
+                    INSERT INTO users (email, name, role, profile_picture, avatar_key)
+                    VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT(email) DO UPDATE SET
+                        name = excluded.name,
+                        role = excluded.role,
+                        profile_picture = COALESCE(excluded.profile_picture, profile_picture),
+                        avatar_key = CASE WHEN excluded.profile_picture IS NULL THEN avatar_key ELSE excluded.avatar_key END,
+                        updated_at = CURRENT_TIMESTAMP
+                ''', (email, name, role, picture, avatar_key))
+
+            return {
+                'email': email,
+                'name': name,
+                'role': role,
+                'picture': picture
+            }
     
     def update_user_profile(self, email, name=None, profile_picture=None):
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        updates = []
-        params = []
+            updates = []
+            params = []
         
-        if name is not None:
-            updates.append("name = ?")
-            params.append(name)
+            if name is not None:
+                updates.append("name = ?")
+                params.append(name)
         
-        if profile_picture is not None:
-            updates.append("profile_picture = ?")
-            params.append(profile_picture)
+            if profile_picture is not None:
+                updates.append("profile_picture = ?")
+                params.append(profile_picture)
+                updates.append("avatar_key = ?")
+                params.append(self._avatar_key(profile_picture))
         
-        if not updates:
-            conn.close()
-            return False
+            if not updates:
+                return False
         
-        updates.append("updated_at = CURRENT_TIMESTAMP")
-        params.append(email)
+            updates.append("updated_at = CURRENT_TIMESTAMP")
+            params.append(email)
         
-        query = f"UPDATE users SET {', '.join(updates)} WHERE email = ?"
-        cursor.execute(query, params)
+            query = f"UPDATE users SET {', '.join(updates)} WHERE email = ?"
+            cursor.execute(query, params)
         
-        conn.commit()
-        rows_affected = cursor.rowcount
-        conn.close()
-        return rows_affected > 0
+            rows_affected = cursor.rowcount
+            return rows_affected > 0
     
     def get_user_by_email(self, email):
         """Get user profile by email"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('''
-            SELECT email, name, role, profile_picture, created_at, updated_at
-            FROM users
-            WHERE email = ?
-        ''', (email,))
+            cursor.execute('''
+                SELECT email, name, role, profile_picture, created_at, updated_at
+                FROM users
+                WHERE email = ?
+            ''', (email,))
         
-        user = cursor.fetchone()
-        conn.close()
+            user = cursor.fetchone()
         
-        if not user:
-            return None
+            if not user:
+                return None
         
-        return {
-            'email': user[0],
-            'name': user[1],
-            'role': user[2],
-            'picture': user[3],
-            'created_at': user[4],
-            'updated_at': user[5]
-        }
+            return {
+                'email': user[0],
+                'name': user[1],
+                'role': user[2],
+                'picture': user[3],
+                'created_at': user[4],
+                'updated_at': user[5]
+            }
     
+    def get_avatar(self, avatar_key):
+        """Return ``(mime_type, bytes, updated_at)`` for an avatar key, or None."""
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                'SELECT profile_picture, updated_at FROM users WHERE avatar_key = ? LIMIT 1',
+                (avatar_key,)
+            ).fetchone()
+        parsed = parse_data_uri(row[0]) if row else None
+        if parsed is None:
+            return None
+        return parsed[0], parsed[1], row[1]
+
     def update_user_password(self, email, password):
         """Update user's password (hashed)"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        # Hash the password
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
+            # Hash the password
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
         
-        cursor.execute('''
-            UPDATE users
-            SET password_hash = ?, updated_at = CURRENT_TIMESTAMP
-            WHERE email = ?
-        ''', (password_hash, email))
+            cursor.execute('''
+                UPDATE users
+                SET password_hash = ?, updated_at = CURRENT_TIMESTAMP
+                WHERE email = ?
+            ''', (password_hash, email))
         
-        conn.commit()
-        rows_affected = cursor.rowcount
-        conn.close()
-        return rows_affected > 0
+            rows_affected = cursor.rowcount
+            return rows_affected > 0
     
     def verify_user_password(self, email, password):
         """Verify user's password"""
-        conn = self.get_connection()
-        cursor = conn.cursor()
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
         
-        cursor.execute('SELECT password_hash FROM users WHERE email = ?', (email,))
-        result = cursor.fetchone()
-        conn.close()
+            cursor.execute('SELECT password_hash FROM users WHERE email = ?', (email,))
+            result = cursor.fetchone()
         
-        if not result or not result[0]:
-            return False
+            if not result or not result[0]:
+                return False
         
-        password_hash = hashlib.sha256(password.encode()).hexdigest()
-        return password_hash == result[0]
+            password_hash = hashlib.sha256(password.encode()).hexdigest()
+            return password_hash == result[0]
 
     # ── Analytics queries ──
 
     def get_reports_per_day(self, days=7):
         """Get report counts per day for the last N days."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        # Include today in a true N-day window (e.g., 7 days => today + previous 6 days).
-        window_days = max(int(days) - 1, 0)
-        cursor.execute('''
-            SELECT DATE(COALESCE(created_at, status_updated_at)) as day, COUNT(*) as cnt
-            FROM reports
-            WHERE DATE(COALESCE(created_at, status_updated_at)) >= DATE('now', ?)
-            GROUP BY DATE(COALESCE(created_at, status_updated_at))
-            ORDER BY day ASC
-        ''', (f'-{window_days} days',))
-        rows = cursor.fetchall()
-        conn.close()
-        return [{'day': r[0], 'count': r[1]} for r in rows if r[0]]
-
-    def get_reports_per_category(self):
-        """Get report count grouped by category."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COALESCE(category, 'Uncategorized') as cat, COUNT(*) as cnt
-            FROM reports
-            GROUP BY cat
-            ORDER BY cnt DESC
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        return [{'category': r[0], 'count': r[1]} for r in rows]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            # Include today in a true N-day window (e.g., 7 days => today + previous 6 days).
+            window_days = max(int(days) - 1, 0)
+            cursor.execute('''
+                SELECT day, count
+                FROM report_counts_by_day
+                WHERE day >= DATE('now', ?)
+                ORDER BY day ASC
+            ''', (f'-{window_days} days',))
+            rows = cursor.fetchall()
+            return [{'day': r[0], 'count': r[1]} for r in rows if r[0]]
+
+    def get_reports_per_category(self, status=None):
+        """Get report count grouped by category, optionally for one status."""
+        where = ''
+        params = []
+        if status:
+            where = 'WHERE status = ?'
+            params.append(parse_status(status).key)
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f'''
+                SELECT category, SUM(count) as cnt
+                FROM report_counts_by_category
+                {where}
+                GROUP BY category
+                ORDER BY cnt DESC
+            ''', params)
+            rows = cursor.fetchall()
+            return [{'category': r[0], 'count': r[1]} for r in rows]
 
     def get_reports_per_location(self):
         """Get report count grouped by location."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT COALESCE(location, 'Unknown') as loc, COUNT(*) as cnt
-            FROM reports
-            GROUP BY loc
-            ORDER BY cnt DESC
-            LIMIT 10
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        return [{'location': r[0], 'count': r[1]} for r in rows]
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT location, count
+                FROM report_counts_by_location
+                ORDER BY count DESC
+                LIMIT 10
+            ''')
+            rows = cursor.fetchall()
+            return [{'location': r[0], 'count': r[1]} for r in rows]
 
     def get_resolution_rate(self):
         """Get overall resolution rate (resolved / total)."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM reports')
-        total = cursor.fetchone()[0]
-        cursor.execute("SELECT COUNT(*) FROM reports WHERE LOWER(status) IN ('resolved', 'fixed')")
-        resolved = cursor.fetchone()[0]
-        conn.close()
-        return {'total': total, 'resolved': resolved,
-                'rate': round(resolved / total * 100, 1) if total > 0 else 0}
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT COALESCE(SUM(count), 0),
+                       COALESCE(SUM(CASE WHEN status = ? THEN count END), 0)
+                FROM report_counts_by_status
+            ''', (ReportStatus.RESOLVED.key,))
+            total, resolved = cursor.fetchone()
+            return {'total': total, 'resolved': resolved,
+                    'rate': round(resolved / total * 100, 1) if total > 0 else 0}
 
     def get_total_users_count(self):
         """Get count of registered users."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('SELECT COUNT(*) FROM users')
-        count = cursor.fetchone()[0]
-        conn.close()
-        return count
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('SELECT COUNT(*) FROM users')
+            count = cursor.fetchone()[0]
+            return count
 
     def get_top_reporters(self, limit=5):
-        """Get the users who filed the most reports."""
-        conn = self.get_connection()
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT user_name, user_email, COUNT(*) as cnt
-            FROM reports
-            GROUP BY user_email
-            ORDER BY cnt DESC
-            LIMIT ?
-        ''', (limit,))
-        rows = cursor.fetchall()
-        conn.close()
-        return [{'name': r[0], 'email': r[1], 'count': r[2]} for r in rows]
+        """Get the users who filed the most reports (name as on their latest report)."""
+        with self._pool.connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute('''
+                SELECT (SELECT user_name FROM reports r
+                        WHERE r.user_email = c.user_email ORDER BY r.id DESC LIMIT 1),
+                       c.user_email, c.count
+                FROM report_counts_by_user c
+                ORDER BY c.count DESC, c.user_email
+                LIMIT ?
+            ''', (limit,))
+            rows = cursor.fetchall()
+            return [{'name': r[0], 'email': r[1], 'count': r[2]} for r in rows]
+
+    def rebuild_report_rollups(self):
+        """Recompute the analytics rollup tables from the reports table."""
+        with self._pool.connection() as conn:
+            rebuild_rollups(conn.cursor())
+
+    def get_dashboard_snapshot(self, days=7, top_reporters=5):
+        """
+        Get every admin dashboard aggregate in one read transaction.
+
+        The individual ``get_*`` queries run on the same pooled connection
+        (the pool is re-entrant per thread), so all figures come from a
+        single consistent snapshot of the database.
+        """
+        with self._pool.connection() as conn:
+            if not conn.in_transaction:
+                conn.execute('BEGIN')
+            resolution_rate = self.get_resolution_rate()
+            return DashboardSnapshot(
+                total_reports=resolution_rate['total'],
+                total_users=self.get_total_users_count(),
+                resolution_rate=resolution_rate,
+                status_counts=self.get_status_counts(),
+                reports_per_day=self.get_reports_per_day(days=days),
+                reports_per_category=self.get_reports_per_category(),
+                reports_per_location=self.get_reports_per_location(),
+                top_reporters=self.get_top_reporters(limit=top_reporters),
+            )
 
 db = Database()
\ No newline at end of file
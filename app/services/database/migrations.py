@@ -0,0 +1,759 @@
+"""
+Versioned schema migrations for the application database.
+
+Each migration is applied exactly once per database file and recorded in the
+``schema_version`` table. Services call ``ensure_schema()`` on start-up; once a
+database is current this is a single ``SELECT MAX(version)`` per process.
+
+Run ``python -m app.services.database.migrations [db_path]`` to bootstrap a
+deployment ahead of starting the web workers.
+"""
+
+import os
+import sqlite3
+import sys
+import threading
+from typing import Callable, List, Tuple
+
+from app.services.database.connection_pool import get_pool
+
+
+def _m0001_initial_schema(cursor):
+    """Core tables for reports, users, audit logs and user activity."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS reports (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            user_type TEXT NOT NULL,
+            issue_description TEXT NOT NULL,
+            location TEXT NOT NULL,
+            category TEXT DEFAULT 'Uncategorized',
+            status TEXT DEFAULT 'pending'
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT UNIQUE NOT NULL,
+            name TEXT NOT NULL,
+            role TEXT NOT NULL,
+            profile_picture TEXT,
+            password_hash TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_logs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            actor_email TEXT NOT NULL,
+            actor_name TEXT,
+            action_type TEXT NOT NULL,
+            resource_type TEXT,
+            resource_id INTEGER,
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            status TEXT DEFAULT 'success'
+        )
+    ''')
+
+    # Main activity log table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_activity (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT NOT NULL,
+            user_name TEXT,
+            activity_type TEXT NOT NULL,
+            ip_address TEXT,
+            location_country TEXT,
+            location_city TEXT,
+            location_isp TEXT,
+            device_info TEXT,
+            status TEXT DEFAULT 'success',
+            details TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(user_email) REFERENCES users(email)
+        )
+    ''')
+
+    # User login statistics table
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS user_login_stats (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_email TEXT UNIQUE NOT NULL,
+            last_login TIMESTAMP,
+            last_login_ip TEXT,
+            last_login_location TEXT,
+            total_logins INTEGER DEFAULT 0,
+            total_failed_attempts INTEGER DEFAULT 0,
+            last_failed_attempt TIMESTAMP,
+            account_locked INTEGER DEFAULT 0,
+            lock_until TIMESTAMP,
+            FOREIGN KEY(user_email) REFERENCES users(email)
+        )
+    ''')
+
+    # Failed login attempts table (for security)
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS failed_login_attempts (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            email TEXT NOT NULL,
+            ip_address TEXT,
+            location TEXT,
+            reason TEXT,
+            timestamp TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+
+
+def _m0002_report_tracking_columns(cursor):
+    """Columns added to reports after the first release."""
+    cursor.execute("PRAGMA table_info(reports)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'category' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN category TEXT DEFAULT "Uncategorized"')
+    if 'created_at' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN created_at TIMESTAMP')
+    if 'admin_remarks' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN admin_remarks TEXT')
+    if 'status_updated_at' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN status_updated_at TIMESTAMP')
+    if 'status_updated_by' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN status_updated_by TEXT')
+    if 'report_image' not in columns:
+        cursor.execute('ALTER TABLE reports ADD COLUMN report_image TEXT')
+
+    # Older rows may have NULL timestamps after migrations; keep analytics usable.
+    cursor.execute('''
+        UPDATE reports
+        SET created_at = COALESCE(created_at, status_updated_at, CURRENT_TIMESTAMP)
+        WHERE created_at IS NULL
+    ''')
+
+
+def _m0003_query_indexes(cursor):
+    """Secondary indexes for the hot report, audit and activity filters."""
+    # Reports: per-user/per-category listings newest first, status and date filters
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_user_email_id ON reports (user_email, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_category_id ON reports (category, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_status_id ON reports (status, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_created_at ON reports (created_at)')
+
+    # Audit logs: each viewer filter, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_actor_ts ON audit_logs (actor_email, timestamp DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_action_ts ON audit_logs (action_type, timestamp DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_resource_ts ON audit_logs (resource_type, timestamp DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_ts ON audit_logs (timestamp DESC)')
+
+    # Activity monitoring: per-user history, newest first
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_user_activity_email_ts ON user_activity (user_email, timestamp DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_failed_login_email_ts ON failed_login_attempts (email, timestamp DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_login_stats_last_login ON user_login_stats (last_login DESC)')
+
+
+def _m0004_report_blobs(cursor):
+    """Move inline base64 report photos into the content-addressed blob table."""
+    # Imported here: blob_store depends on this module for ensure_schema().
+    from app.services.database.blob_store import parse_data_uri, put_blob
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_blobs (
+            key TEXT PRIMARY KEY,
+            mime_type TEXT NOT NULL,
+            data BLOB NOT NULL,
+            size INTEGER NOT NULL,
+            refcount INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+    ''')
+    cursor.execute('ALTER TABLE reports ADD COLUMN image_key TEXT REFERENCES report_blobs(key)')
+
+    # Reference counts follow reports.image_key; unreferenced blobs are dropped.
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_blob_insert
+        AFTER INSERT ON reports WHEN NEW.image_key IS NOT NULL
+        BEGIN
+            UPDATE report_blobs SET refcount = refcount + 1 WHERE key = NEW.image_key;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_blob_update
+        AFTER UPDATE OF image_key ON reports WHEN OLD.image_key IS NOT NEW.image_key
+        BEGIN
+            UPDATE report_blobs SET refcount = refcount + 1 WHERE key = NEW.image_key;
+            UPDATE report_blobs SET refcount = refcount - 1 WHERE key = OLD.image_key;
+            DELETE FROM report_blobs WHERE key = OLD.image_key AND refcount <= 0;
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_blob_delete
+        AFTER DELETE ON reports WHEN OLD.image_key IS NOT NULL
+        BEGIN
+            UPDATE report_blobs SET refcount = refcount - 1 WHERE key = OLD.image_key;
+            DELETE FROM report_blobs WHERE key = OLD.image_key AND refcount <= 0;
+        END
+    ''')
+
+    # Backfill: existing data URIs become blobs; report_image keeps only external URLs.
+    rows = cursor.execute(
+        "SELECT id, report_image FROM reports WHERE report_image LIKE 'data:%'"
+    ).fetchall()
+    for report_id, uri in rows:
+        parsed = parse_data_uri(uri)
+        if parsed is None:
+            continue
+        mime_type, data = parsed
+        key = put_blob(cursor, data, mime_type)
+        cursor.execute(
+            'UPDATE reports SET image_key = ?, report_image = NULL WHERE id = ?',
+            (key, report_id)
+        )
+
+
+def _m0005_image_thumbnails(cursor):
+    """Thumbnail cache for report photos and content keys for avatars."""
+    from app.services.database.blob_store import blob_key, parse_data_uri
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS image_thumbnails (
+            source_key TEXT NOT NULL,
+            size TEXT NOT NULL,
+            mime_type TEXT NOT NULL,
+            data BLOB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (source_key, size)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_report_blobs_thumbnails_delete
+        AFTER DELETE ON report_blobs
+        BEGIN
+            DELETE FROM image_thumbnails WHERE source_key = OLD.key;
+        END
+    ''')
+
+    # Avatars stay on the users row; avatar_key lets the media routes find them by content.
+    cursor.execute('ALTER TABLE users ADD COLUMN avatar_key TEXT')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_avatar_key ON users (avatar_key)')
+    rows = cursor.execute(
+        "SELECT id, profile_picture FROM users WHERE profile_picture LIKE 'data:%'"
+    ).fetchall()
+    for user_id, uri in rows:
+        parsed = parse_data_uri(uri)
+        if parsed is not None:
+            cursor.execute('UPDATE users SET avatar_key = ? WHERE id = ?', (blob_key(parsed[1]), user_id))
+
+
+def _m0006_report_rollups(cursor):
+    """Aggregate tables for dashboard analytics, maintained by triggers on reports."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_counts_by_status (
+            status TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_counts_by_category (
+            category TEXT NOT NULL,
+            status TEXT NOT NULL,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (category, status)
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_counts_by_location (
+            location TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_counts_by_day (
+            day TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+
+    # Keys use the same COALESCE defaults as the analytics queries they replace.
+    add_new = '''
+            INSERT INTO report_counts_by_status (status, count)
+            VALUES (COALESCE(NEW.status, ''), 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_category (category, status, count)
+            VALUES (COALESCE(NEW.category, 'Uncategorized'), COALESCE(NEW.status, ''), 1)
+            ON CONFLICT(category, status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_location (location, count)
+            VALUES (COALESCE(NEW.location, 'Unknown'), 1)
+            ON CONFLICT(location) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_day (day, count)
+            SELECT DATE(COALESCE(NEW.created_at, NEW.status_updated_at)), 1
+            WHERE DATE(COALESCE(NEW.created_at, NEW.status_updated_at)) IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    '''
+    remove_old = '''
+            UPDATE report_counts_by_status SET count = count - 1
+            WHERE status = COALESCE(OLD.status, '');
+            UPDATE report_counts_by_category SET count = count - 1
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = COALESCE(OLD.status, '');
+            UPDATE report_counts_by_location SET count = count - 1
+            WHERE location = COALESCE(OLD.location, 'Unknown');
+            UPDATE report_counts_by_day SET count = count - 1
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at));
+            DELETE FROM report_counts_by_status WHERE status = COALESCE(OLD.status, '') AND count <= 0;
+            DELETE FROM report_counts_by_category
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = COALESCE(OLD.status, '') AND count <= 0;
+            DELETE FROM report_counts_by_location WHERE location = COALESCE(OLD.location, 'Unknown') AND count <= 0;
+            DELETE FROM report_counts_by_day
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at)) AND count <= 0;
+    '''
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_rollup_insert
+        AFTER INSERT ON reports
+        BEGIN
+            {add_new}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_rollup_delete
+        AFTER DELETE ON reports
+        BEGIN
+            {remove_old}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_rollup_update
+        AFTER UPDATE OF status, category, location, created_at, status_updated_at ON reports
+        BEGIN
+            {remove_old}
+            {add_new}
+        END
+    ''')
+
+    # Backfill from the existing reports.
+    cursor.execute('''
+        INSERT INTO report_counts_by_status (status, count)
+        SELECT COALESCE(status, ''), COUNT(*) FROM reports
+        GROUP BY COALESCE(status, '')
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_category (category, status, count)
+        SELECT COALESCE(category, 'Uncategorized'), COALESCE(status, ''), COUNT(*) FROM reports
+        GROUP BY COALESCE(category, 'Uncategorized'), COALESCE(status, '')
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_location (location, count)
+        SELECT COALESCE(location, 'Unknown'), COUNT(*) FROM reports
+        GROUP BY COALESCE(location, 'Unknown')
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_day (day, count)
+        SELECT DATE(COALESCE(created_at, status_updated_at)) AS day, COUNT(*) FROM reports
+        WHERE DATE(COALESCE(created_at, status_updated_at)) IS NOT NULL
+        GROUP BY day
+    ''')
+
+
+def _m0007_report_search(cursor):
+    """FTS5 index over report text, kept in sync with reports by triggers."""
+    cursor.execute('''
+        CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+            issue_description, location, admin_remarks,
+            content='reports', content_rowid='id',
+            tokenize='porter unicode61'
+        )
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_fts_insert
+        AFTER INSERT ON reports
+        BEGIN
+            INSERT INTO reports_fts (rowid, issue_description, location, admin_remarks)
+            VALUES (NEW.id, NEW.issue_description, NEW.location, NEW.admin_remarks);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_fts_delete
+        AFTER DELETE ON reports
+        BEGIN
+            INSERT INTO reports_fts (reports_fts, rowid, issue_description, location, admin_remarks)
+            VALUES ('delete', OLD.id, OLD.issue_description, OLD.location, OLD.admin_remarks);
+        END
+    ''')
+    cursor.execute('''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_fts_update
+        AFTER UPDATE OF issue_description, location, admin_remarks ON reports
+        BEGIN
+            INSERT INTO reports_fts (reports_fts, rowid, issue_description, location, admin_remarks)
+            VALUES ('delete', OLD.id, OLD.issue_description, OLD.location, OLD.admin_remarks);
+            INSERT INTO reports_fts (rowid, issue_description, location, admin_remarks)
+            VALUES (NEW.id, NEW.issue_description, NEW.location, NEW.admin_remarks);
+        END
+    ''')
+    cursor.execute("INSERT INTO reports_fts (reports_fts) VALUES ('rebuild')")
+
+
+def _m0008_status_codes(cursor):
+    """Canonical status written at write time: CHECK-constrained status_code plus canonical key."""
+    from app.services.database.report_status import STATUS_CODE_CHECK, status_code_sql, status_key_sql
+
+    cursor.execute(
+        f'ALTER TABLE reports ADD COLUMN status_code INTEGER NOT NULL DEFAULT 0 CHECK ({STATUS_CODE_CHECK})'
+    )
+
+    # One set-based rewrite of legacy spellings; rollups are rebuilt afterwards.
+    for trigger in ('trg_reports_rollup_insert', 'trg_reports_rollup_delete', 'trg_reports_rollup_update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute(f'''
+        UPDATE reports
+        SET status = {status_key_sql('status')},
+            status_code = {status_code_sql('status')}
+    ''')
+
+    # Writers that bypass Database (raw SQL, imports) still get a correct code.
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_status_code_insert
+        AFTER INSERT ON reports
+        WHEN NEW.status_code IS NOT {status_code_sql('NEW.status')}
+        BEGIN
+            UPDATE reports SET status_code = {status_code_sql('NEW.status')} WHERE id = NEW.id;
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_reports_status_code_update
+        AFTER UPDATE OF status ON reports
+        WHEN NEW.status_code IS NOT {status_code_sql('NEW.status')}
+        BEGIN
+            UPDATE reports SET status_code = {status_code_sql('NEW.status')} WHERE id = NEW.id;
+        END
+    ''')
+
+    cursor.execute('DROP INDEX IF EXISTS idx_reports_status_id')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_reports_status_code_id ON reports (status_code, id DESC)')
+
+    # Rollups now group by the canonical key instead of the raw status text.
+    def add_new(status):
+        return f'''
+            INSERT INTO report_counts_by_status (status, count)
+            VALUES ({status}, 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_category (category, status, count)
+            VALUES (COALESCE(NEW.category, 'Uncategorized'), {status}, 1)
+            ON CONFLICT(category, status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_location (location, count)
+            VALUES (COALESCE(NEW.location, 'Unknown'), 1)
+            ON CONFLICT(location) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_day (day, count)
+            SELECT DATE(COALESCE(NEW.created_at, NEW.status_updated_at)), 1
+            WHERE DATE(COALESCE(NEW.created_at, NEW.status_updated_at)) IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+    '''
+
+    def remove_old(status):
+        return f'''
+            UPDATE report_counts_by_status SET count = count - 1 WHERE status = {status};
+            UPDATE report_counts_by_category SET count = count - 1
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = {status};
+            UPDATE report_counts_by_location SET count = count - 1
+            WHERE location = COALESCE(OLD.location, 'Unknown');
+            UPDATE report_counts_by_day SET count = count - 1
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at));
+            DELETE FROM report_counts_by_status WHERE status = {status} AND count <= 0;
+            DELETE FROM report_counts_by_category
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = {status} AND count <= 0;
+            DELETE FROM report_counts_by_location WHERE location = COALESCE(OLD.location, 'Unknown') AND count <= 0;
+            DELETE FROM report_counts_by_day
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at)) AND count <= 0;
+    '''
+
+    new_key, old_key = status_key_sql('NEW.status'), status_key_sql('OLD.status')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_insert
+        AFTER INSERT ON reports
+        BEGIN
+            {add_new(new_key)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_delete
+        AFTER DELETE ON reports
+        BEGIN
+            {remove_old(old_key)}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_update
+        AFTER UPDATE OF status, category, location, created_at, status_updated_at ON reports
+        BEGIN
+            {remove_old(old_key)}
+            {add_new(new_key)}
+        END
+    ''')
+
+    # Statuses were rewritten to their keys above, so the status columns regroup directly.
+    for table in ('report_counts_by_status', 'report_counts_by_category'):
+        cursor.execute(f'DELETE FROM {table}')
+    cursor.execute('''
+        INSERT INTO report_counts_by_status (status, count)
+        SELECT status, COUNT(*) FROM reports
+        GROUP BY status
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_category (category, status, count)
+        SELECT COALESCE(category, 'Uncategorized'), status, COUNT(*) FROM reports
+        GROUP BY COALESCE(category, 'Uncategorized'), status
+    ''')
+
+
+def _m0009_audit_keyset_indexes(cursor):
+    """Audit indexes ending in ``id`` so ``(timestamp, id)`` keyset pages need no sort."""
+    cursor.execute('DROP INDEX IF EXISTS idx_audit_logs_actor_ts')
+    cursor.execute('DROP INDEX IF EXISTS idx_audit_logs_action_ts')
+    cursor.execute('DROP INDEX IF EXISTS idx_audit_logs_resource_ts')
+    cursor.execute('DROP INDEX IF EXISTS idx_audit_logs_ts')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_actor_ts_id ON audit_logs (actor_email, timestamp DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_action_ts_id ON audit_logs (action_type, timestamp DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_resource_ts_id ON audit_logs (resource_type, timestamp DESC, id DESC)')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_audit_logs_ts_id ON audit_logs (timestamp DESC, id DESC)')
+
+
+def _m0010_failed_login_ip_index(cursor):
+    """Per-IP failure lookups for the login limiter."""
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_failed_login_ip_ts ON failed_login_attempts (ip_address, timestamp DESC)')
+
+
+def _m0011_sessions(cursor):
+    """Login sessions shared by every worker process (times are Unix epoch seconds)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS sessions (
+            user_email TEXT PRIMARY KEY,
+            session_id TEXT NOT NULL,
+            user_name TEXT NOT NULL,
+            user_type TEXT NOT NULL,
+            created_at REAL NOT NULL,
+            last_activity REAL NOT NULL,
+            expires_at REAL NOT NULL,
+            inactivity_timeout REAL NOT NULL,
+            deadline REAL NOT NULL
+        )
+    ''')
+    # deadline = MIN(expires_at, last_activity + inactivity_timeout)
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_sessions_deadline ON sessions (deadline)')
+
+
+def _m0012_export_tokens(cursor):
+    """Single-use audit export download tokens, redeemable by any worker process."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS export_tokens (
+            token_hash TEXT PRIMARY KEY,
+            filters TEXT NOT NULL,
+            expires_at REAL NOT NULL
+        )
+    ''')
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_export_tokens_expires ON export_tokens (expires_at)')
+
+
+def _m0013_audit_log_version(cursor):
+    """Counter bumped by every audit insert or delete, whoever makes it (keys cached counts)."""
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS audit_log_version (
+            id INTEGER PRIMARY KEY CHECK (id = 1),
+            version INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    cursor.execute('INSERT OR IGNORE INTO audit_log_version (id, version) VALUES (1, 0)')
+    for event in ('INSERT', 'DELETE'):
+        cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_audit_logs_version_{event.lower()}
+            AFTER {event} ON audit_logs
+            BEGIN
+                UPDATE audit_log_version SET version = version + 1 WHERE id = 1;
+            END
+        ''')
+
+
+def _m0014_reporter_rollup(cursor):
+    """Per-user report counts, so the top reporters are read from an index instead of sorted."""
+    from app.services.database.report_status import status_key_sql
+
+    cursor.execute('''
+        CREATE TABLE IF NOT EXISTS report_counts_by_user (
+            user_email TEXT PRIMARY KEY,
+            count INTEGER NOT NULL DEFAULT 0
+        )
+    ''')
+    # Top reporters are read in index order, with no sort
+    cursor.execute(
+        'CREATE INDEX IF NOT EXISTS idx_report_counts_by_user_count ON report_counts_by_user (count DESC, user_email)'
+    )
+
+    new_key, old_key = status_key_sql('NEW.status'), status_key_sql('OLD.status')
+    add_new = f'''
+            INSERT INTO report_counts_by_status (status, count)
+            VALUES ({new_key}, 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_category (category, status, count)
+            VALUES (COALESCE(NEW.category, 'Uncategorized'), {new_key}, 1)
+            ON CONFLICT(category, status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_location (location, count)
+            VALUES (COALESCE(NEW.location, 'Unknown'), 1)
+            ON CONFLICT(location) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_day (day, count)
+            SELECT DATE(COALESCE(NEW.created_at, NEW.status_updated_at)), 1
+            WHERE DATE(COALESCE(NEW.created_at, NEW.status_updated_at)) IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_user (user_email, count)
+            VALUES (NEW.user_email, 1)
+            ON CONFLICT(user_email) DO UPDATE SET count = count + 1;
+    '''
+    remove_old = f'''
+            UPDATE report_counts_by_status SET count = count - 1 WHERE status = {old_key};
+            UPDATE report_counts_by_category SET count = count - 1
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = {old_key};
+            UPDATE report_counts_by_location SET count = count - 1
+            WHERE location = COALESCE(OLD.location, 'Unknown');
+            UPDATE report_counts_by_day SET count = count - 1
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at));
+            UPDATE report_counts_by_user SET count = count - 1 WHERE user_email = OLD.user_email;
+            DELETE FROM report_counts_by_status WHERE status = {old_key} AND count <= 0;
+            DELETE FROM report_counts_by_category
+            WHERE category = COALESCE(OLD.category, 'Uncategorized') AND status = {old_key} AND count <= 0;
+            DELETE FROM report_counts_by_location WHERE location = COALESCE(OLD.location, 'Unknown') AND count <= 0;
+            DELETE FROM report_counts_by_day
+            WHERE day = DATE(COALESCE(OLD.created_at, OLD.status_updated_at)) AND count <= 0;
+            DELETE FROM report_counts_by_user WHERE user_email = OLD.user_email AND count <= 0;
+    '''
+    for trigger in ('trg_reports_rollup_insert', 'trg_reports_rollup_delete', 'trg_reports_rollup_update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_insert
+        AFTER INSERT ON reports
+        BEGIN
+            {add_new}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_delete
+        AFTER DELETE ON reports
+        BEGIN
+            {remove_old}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_update
+        AFTER UPDATE OF status, category, location, created_at, status_updated_at, user_email ON reports
+        BEGIN
+            {remove_old}
+            {add_new}
+        END
+    ''')
+
+    # The other rollups are already current; only the new table needs a backfill.
+    cursor.execute('''
+        INSERT INTO report_counts_by_user (user_email, count)
+        SELECT user_email, COUNT(*) FROM reports
+        GROUP BY user_email
+        ON CONFLICT(user_email) DO UPDATE SET count = excluded.count
+    ''')
+
+
+def _m0015_audit_row_count(cursor):
+    """Exact audit_logs row count next to the version, kept by the same triggers (sizes count estimates)."""
+    cursor.execute('ALTER TABLE audit_log_version ADD COLUMN row_count INTEGER NOT NULL DEFAULT 0')
+    cursor.execute('UPDATE audit_log_version SET row_count = (SELECT COUNT(*) FROM audit_logs) WHERE id = 1')
+    for event, delta in (('INSERT', '+ 1'), ('DELETE', '- 1')):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_audit_logs_version_{event.lower()}')
+        cursor.execute(f'''
+            CREATE TRIGGER trg_audit_logs_version_{event.lower()}
+            AFTER {event} ON audit_logs
+            BEGIN
+                UPDATE audit_log_version SET version = version + 1, row_count = row_count {delta} WHERE id = 1;
+            END
+        ''')
+
+
+# Ordered list of (version, name, migration). Append only; never renumber.
+MIGRATIONS: List[Tuple[int, str, Callable]] = [
+    (1, "initial_schema", _m0001_initial_schema),
+    (2, "report_tracking_columns", _m0002_report_tracking_columns),
+    (3, "query_indexes", _m0003_query_indexes),
+    (4, "report_blobs", _m0004_report_blobs),
+    (5, "image_thumbnails", _m0005_image_thumbnails),
+    (6, "report_rollups", _m0006_report_rollups),
+    (7, "report_search", _m0007_report_search),
+    (8, "status_codes", _m0008_status_codes),
+    (9, "audit_keyset_indexes", _m0009_audit_keyset_indexes),
+    (10, "failed_login_ip_index", _m0010_failed_login_ip_index),
+    (11, "sessions", _m0011_sessions),
+    (12, "export_tokens", _m0012_export_tokens),
+    (13, "audit_log_version", _m0013_audit_log_version),
+    (14, "reporter_rollup", _m0014_reporter_rollup),
+    (15, "audit_row_count", _m0015_audit_row_count),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# Database files already verified as current in this process
+_current: set = set()
+_current_lock = threading.Lock()
+
+
+def get_schema_version(conn) -> int:
+    """Return the applied schema version (0 for an unversioned database)."""
+    try:
+        row = conn.execute("SELECT MAX(version) FROM schema_version").fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] or 0
+
+
+def migrate(conn) -> int:
+    """Apply pending migrations on ``conn`` and return the resulting version."""
+    if get_schema_version(conn) >= LATEST_VERSION:
+        return LATEST_VERSION
+
+    # Take the write lock up front so concurrent workers apply each step once.
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        conn.execute('''
+            CREATE TABLE IF NOT EXISTS schema_version (
+                version INTEGER PRIMARY KEY,
+                name TEXT NOT NULL,
+                applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        ''')
+        current = get_schema_version(conn)
+        cursor = conn.cursor()
+        for version, name, migration in MIGRATIONS:
+            if version <= current:
+                continue
+            migration(cursor)
+            cursor.execute(
+                "INSERT INTO schema_version (version, name) VALUES (?, ?)",
+                (version, name)
+            )
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return LATEST_VERSION
+
+
+def ensure_schema(db_path: str) -> int:
+    """Bring ``db_path`` up to date, checking at most once per process."""
+    key = os.path.abspath(db_path)
+    if key in _current:
+        return LATEST_VERSION
+
+    with _current_lock:
+        if key in _current:
+            return LATEST_VERSION
+        with get_pool(db_path).connection() as conn:
+            version = migrate(conn)
+        _current.add(key)
+    return version
+
+
+if __name__ == "__main__":
+    path = sys.argv[1] if len(sys.argv) > 1 else "app_database.db"
+    print(f"{path}: schema version {ensure_schema(path)}")
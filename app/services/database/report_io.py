@@ -0,0 +1,80 @@
+"""
+Streaming CSV / JSON Lines readers and writers for report import/export.
+
+Both directions work one record at a time, so moving 100k reports between
+deployments never holds more than a chunk in memory. Exported files use
+``EXPORT_FIELDS`` as the column set and can be fed straight back into
+``Database.bulk_import_reports``.
+"""
+
+import csv
+import json
+import os
+from typing import Dict, Iterable, Iterator, Optional
+
+FORMATS = ("csv", "jsonl")
+
+# Column order of exported files
+EXPORT_FIELDS = (
+    "id", "user_email", "user_name", "user_type", "issue_description", "location",
+    "category", "status", "admin_remarks", "created_at", "status_updated_at",
+    "status_updated_by", "report_image",
+)
+
+# Fields an imported record must provide (NOT NULL on ``reports``)
+REQUIRED_FIELDS = ("user_email", "user_name", "user_type", "issue_description", "location")
+
+
+def detect_format(path: str, default: str = "csv") -> str:
+    """Pick a format from a file extension (``.csv``, ``.jsonl``/``.ndjson``)."""
+    ext = os.path.splitext(path or "")[1].lower()
+    if ext in (".jsonl", ".ndjson"):
+        return "jsonl"
+    if ext == ".csv":
+        return "csv"
+    return default
+
+
+def _check_format(fmt: str) -> str:
+    if fmt not in FORMATS:
+        raise ValueError(f"Unsupported format {fmt!r}; expected one of {', '.join(FORMATS)}")
+    return fmt
+
+
+def read_reports(fp, fmt: str = "csv") -> Iterator[Dict[str, Optional[str]]]:
+    """Yield report records from a CSV (with header) or JSON Lines text stream."""
+    if _check_format(fmt) == "csv":
+        for record in csv.DictReader(fp):
+            # Empty CSV cells mean "not set", as a missing JSON key would.
+            yield {k: (v if v != "" else None) for k, v in record.items() if k}
+        return
+
+    for line_no, line in enumerate(fp, 1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError as e:
+            raise ValueError(f"line {line_no}: invalid JSON ({e.msg})") from None
+        if not isinstance(record, dict):
+            raise ValueError(f"line {line_no}: expected a JSON object")
+        yield record
+
+
+def write_reports(fp, records: Iterable[Dict[str, object]], fmt: str = "csv") -> int:
+    """Write report records to a text stream as they arrive; returns the count."""
+    count = 0
+    if _check_format(fmt) == "csv":
+        writer = csv.DictWriter(fp, fieldnames=EXPORT_FIELDS, extrasaction="ignore")
+        writer.writeheader()
+        for record in records:
+            writer.writerow(record)
+            count += 1
+        return count
+
+    for record in records:
+        fp.write(json.dumps({k: record.get(k) for k in EXPORT_FIELDS}, ensure_ascii=False))
+        fp.write("\n")
+        count += 1
+    return count
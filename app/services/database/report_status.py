@@ -0,0 +1,94 @@
+"""
+The single definition of report status values.
+
+Reports store both a canonical lowercase ``status`` key and an integer
+``status_code`` (CHECK-constrained to the values below), both written at
+write time. Reads map the code straight to its label; the string matching
+in ``parse_status`` only runs on input (admin actions, legacy values) and
+is cached per distinct string.
+"""
+
+from enum import IntEnum
+from functools import lru_cache
+
+
+class ReportStatus(IntEnum):
+    PENDING = 0
+    IN_PROGRESS = 1
+    RESOLVED = 2
+    REJECTED = 3
+
+    @property
+    def key(self) -> str:
+        """Canonical lowercase key stored in ``reports.status``."""
+        return STATUS_KEYS[self]
+
+    @property
+    def label(self) -> str:
+        """Display label returned on report reads."""
+        return STATUS_LABELS[self]
+
+
+# Indexed by status code
+STATUS_KEYS = ('pending', 'in progress', 'resolved', 'rejected')
+STATUS_LABELS = ('Pending', 'In Progress', 'Resolved', 'Rejected')
+
+_BY_KEY = {key: ReportStatus(code) for code, key in enumerate(STATUS_KEYS)}
+
+
+@lru_cache(maxsize=256)
+def parse_status(value) -> ReportStatus:
+    """
+    Map any legacy or user-supplied status string to a ReportStatus.
+
+    Accepts the canonical keys and labels as well as older spellings such as
+    "ON GOING", "fixed" or "reject". Empty and unrecognised values are
+    treated as pending.
+    """
+    if isinstance(value, ReportStatus):
+        return value
+    s = str(value or '').strip().lower().replace('-', ' ').replace('_', ' ')
+    if s in _BY_KEY:
+        return _BY_KEY[s]
+    if 'pending' in s:
+        return ReportStatus.PENDING
+    if 'on going' in s or 'ongoing' in s or 'in progress' in s:
+        return ReportStatus.IN_PROGRESS
+    if 'fixed' in s or 'resolved' in s:
+        return ReportStatus.RESOLVED
+    if 'reject' in s:
+        return ReportStatus.REJECTED
+    return ReportStatus.PENDING
+
+
+def status_key(value) -> str:
+    """Canonical lowercase key for any status value."""
+    return parse_status(value).key
+
+
+def status_label(value) -> str:
+    """Display label for any status value."""
+    return parse_status(value).label
+
+
+def status_code_sql(column: str) -> str:
+    """SQL expression applying ``parse_status`` rules to ``column``; yields the code."""
+    s = f"LOWER(REPLACE(REPLACE(TRIM(COALESCE({column}, '')), '-', ' '), '_', ' '))"
+    return f'''(CASE
+        WHEN {s} LIKE '%pending%' THEN {ReportStatus.PENDING.value}
+        WHEN {s} LIKE '%on going%' OR {s} LIKE '%ongoing%' OR {s} LIKE '%in progress%'
+            THEN {ReportStatus.IN_PROGRESS.value}
+        WHEN {s} LIKE '%fixed%' OR {s} LIKE '%resolved%' THEN {ReportStatus.RESOLVED.value}
+        WHEN {s} LIKE '%reject%' THEN {ReportStatus.REJECTED.value}
+        ELSE {ReportStatus.PENDING.value}
+    END)'''
+
+
+def status_key_sql(column: str) -> str:
+    """SQL expression mapping ``column`` to its canonical lowercase key."""
+    whens = ' '.join(f"WHEN {code} THEN '{key}'" for code, key in enumerate(STATUS_KEYS))
+    return f"(CASE {status_code_sql(column)} {whens} END)"
+
+
+# CHECK constraint for the status_code column
+STATUS_CODE_CHECK = f"status_code IN ({', '.join(str(s.value) for s in ReportStatus)})"
@@ -0,0 +1,203 @@
+"""
+Aggregate (rollup) tables behind the admin dashboard analytics.
+
+``report_counts_by_status``, ``report_counts_by_category`` (per category and
+status), ``report_counts_by_location``, ``report_counts_by_day`` and
+``report_counts_by_user`` are kept in step with ``reports`` by triggers
+(migrations 0006, 0008 and 0014; ``create_rollup_triggers()`` matches the
+latest), so analytics read a handful of rows instead of grouping the whole
+table. ``rebuild_rollups()`` recomputes them from scratch, e.g. after
+restoring a backup or bulk edits made with triggers disabled.
+
+Status is grouped by its canonical key (see ``report_status``), so legacy
+spellings written by raw SQL still land in the right bucket.
+"""
+
+from app.services.database.report_status import status_key_sql
+
+ROLLUP_TABLES = (
+    'report_counts_by_status',
+    'report_counts_by_category',
+    'report_counts_by_location',
+    'report_counts_by_day',
+    'report_counts_by_user',
+)
+
+
+_ROLLUP_TRIGGERS = (
+    'trg_reports_rollup_insert',
+    'trg_reports_rollup_delete',
+    'trg_reports_rollup_update',
+)
+
+
+def _add_row_sql(row):
+    """Trigger statements counting ``row`` (NEW) into every rollup."""
+    status = status_key_sql(f'{row}.status')
+    day = f'DATE(COALESCE({row}.created_at, {row}.status_updated_at))'
+    return f'''
+            INSERT INTO report_counts_by_status (status, count)
+            VALUES ({status}, 1)
+            ON CONFLICT(status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_category (category, status, count)
+            VALUES (COALESCE({row}.category, 'Uncategorized'), {status}, 1)
+            ON CONFLICT(category, status) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_location (location, count)
+            VALUES (COALESCE({row}.location, 'Unknown'), 1)
+            ON CONFLICT(location) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_day (day, count)
+            SELECT {day}, 1 WHERE {day} IS NOT NULL
+            ON CONFLICT(day) DO UPDATE SET count = count + 1;
+            INSERT INTO report_counts_by_user (user_email, count)
+            VALUES ({row}.user_email, 1)
+            ON CONFLICT(user_email) DO UPDATE SET count = count + 1;
+    '''
+
+
+def _remove_row_sql(row):
+    """Trigger statements removing ``row`` (OLD) from every rollup."""
+    status = status_key_sql(f'{row}.status')
+    category = f"COALESCE({row}.category, 'Uncategorized')"
+    location = f"COALESCE({row}.location, 'Unknown')"
+    day = f'DATE(COALESCE({row}.created_at, {row}.status_updated_at))'
+    return f'''
+            UPDATE report_counts_by_status SET count = count - 1 WHERE status = {status};
+            UPDATE report_counts_by_category SET count = count - 1
+            WHERE category = {category} AND status = {status};
+            UPDATE report_counts_by_location SET count = count - 1 WHERE location = {location};
+            UPDATE report_counts_by_day SET count = count - 1 WHERE day = {day};
+            UPDATE report_counts_by_user SET count = count - 1 WHERE user_email = {row}.user_email;
+            DELETE FROM report_counts_by_status WHERE status = {status} AND count <= 0;
+            DELETE FROM report_counts_by_category
+            WHERE category = {category} AND status = {status} AND count <= 0;
+            DELETE FROM report_counts_by_location WHERE location = {location} AND count <= 0;
+            DELETE FROM report_counts_by_day WHERE day = {day} AND count <= 0;
+            DELETE FROM report_counts_by_user WHERE user_email = {row}.user_email AND count <= 0;
+    '''
+
+
+def create_rollup_triggers(cursor):
+    """(Re)create the triggers that keep the rollup tables in step with reports."""
+    drop_rollup_triggers(cursor)
+
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_insert
+        AFTER INSERT ON reports
+        BEGIN
+            {_add_row_sql('NEW')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_delete
+        AFTER DELETE ON reports
+        BEGIN
+            {_remove_row_sql('OLD')}
+        END
+    ''')
+    cursor.execute(f'''
+        CREATE TRIGGER trg_reports_rollup_update
+        AFTER UPDATE OF status, category, location, created_at, status_updated_at, user_email ON reports
+        BEGIN
+            {_remove_row_sql('OLD')}
+            {_add_row_sql('NEW')}
+        END
+    ''')
+
+
+def drop_rollup_triggers(cursor):
+    """Drop the rollup triggers (for bulk rewrites followed by a rebuild)."""
+    for trigger in _ROLLUP_TRIGGERS:
+        cursor.execute(f'DROP TRIGGER IF EXISTS {trigger}')
+
+
+def rebuild_rollups(cursor):
+    """Recompute every rollup table from ``reports`` on an open cursor."""
+    for table in ROLLUP_TABLES:
+        cursor.execute(f'DELETE FROM {table}')
+
+    status = status_key_sql('status')
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_status (status, count)
+        SELECT {status} AS key, COUNT(*) FROM reports
+        GROUP BY key
+    ''')
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_category (category, status, count)
+        SELECT COALESCE(category, 'Uncategorized') AS cat, {status} AS key, COUNT(*) FROM reports
+        GROUP BY cat, key
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_location (location, count)
+        SELECT COALESCE(location, 'Unknown'), COUNT(*) FROM reports
+        GROUP BY COALESCE(location, 'Unknown')
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_day (day, count)
+        SELECT DATE(COALESCE(created_at, status_updated_at)) AS day, COUNT(*) FROM reports
+        WHERE DATE(COALESCE(created_at, status_updated_at)) IS NOT NULL
+        GROUP BY day
+    ''')
+    cursor.execute('''
+        INSERT INTO report_counts_by_user (user_email, count)
+        SELECT user_email, COUNT(*) FROM reports
+        GROUP BY user_email
+    ''')
+
+
+def add_to_rollups(cursor, where, params=()):
+    """
+    Count the reports matching ``where`` into the rollups in one pass per table.
+
+    For bulk inserts made with the insert trigger suspended; the rows must
+    not have been counted already.
+    """
+    status = status_key_sql('status')
+    day = 'DATE(COALESCE(created_at, status_updated_at))'
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_status (status, count)
+        SELECT {status} AS key, COUNT(*) FROM reports WHERE {where}
+        GROUP BY key
+        ON CONFLICT(status) DO UPDATE SET count = count + excluded.count
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_category (category, status, count)
+        SELECT COALESCE(category, 'Uncategorized') AS cat, {status} AS key, COUNT(*) FROM reports
+        WHERE {where}
+        GROUP BY cat, key
+        ON CONFLICT(category, status) DO UPDATE SET count = count + excluded.count
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_location (location, count)
+        SELECT COALESCE(location, 'Unknown') AS loc, COUNT(*) FROM reports WHERE {where}
+        GROUP BY loc
+        ON CONFLICT(location) DO UPDATE SET count = count + excluded.count
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_day (day, count)
+        SELECT {day} AS d, COUNT(*) FROM reports
+        WHERE ({where}) AND {day} IS NOT NULL
+        GROUP BY d
+        ON CONFLICT(day) DO UPDATE SET count = count + excluded.count
+    ''', params)
+    cursor.execute(f'''
+        INSERT INTO report_counts_by_user (user_email, count)
+        SELECT user_email, COUNT(*) FROM reports WHERE {where}
+        GROUP BY user_email
+        ON CONFLICT(user_email) DO UPDATE SET count = count + excluded.count
+    ''', params)
+
+
+def rollup_drift(cursor):
+    """Return the rollup tables whose contents differ from a fresh rebuild."""
+    drifted = []
+    cursor.execute('SAVEPOINT rollup_check')
+    try:
+        before = {table: set(cursor.execute(f'SELECT * FROM {table}').fetchall()) for table in ROLLUP_TABLES}
+        rebuild_rollups(cursor)
+        for table in ROLLUP_TABLES:
+            if set(cursor.execute(f'SELECT * FROM {table}').fetchall()) != before[table]:
+                drifted.append(table)
+    finally:
+        cursor.execute('ROLLBACK TO rollup_check')
+        cursor.execute('RELEASE rollup_check')
+    return drifted
@@ -0,0 +1,261 @@
+"""
+Report photos and avatars served over HTTP instead of the Flet websocket.
+
+Images are addressed by content hash, so a URL never changes meaning and can
+be cached by the browser indefinitely. Report photo thumbnails are generated
+once with Pillow and kept in ``image_thumbnails`` (a photo Pillow cannot read
+is stored there as its own thumbnail, so it is not retried); avatars are
+small and are resized on demand behind an in-process LRU cache.
+"""
+
+import io
+import threading
+from collections import OrderedDict
+from functools import lru_cache
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Optional, Tuple
+
+from app.services.database.blob_store import blob_key, parse_data_uri, to_data_uri
+
+
+class MediaConfig:
+    # Longest side in pixels for each generated variant ("full" is the original)
+    SIZES = {
+        "thumb": 160,
+        "medium": 480,
+    }
+    DEFAULT_REPORT_SIZE = "medium"
+    DEFAULT_AVATAR_SIZE = "thumb"
+
+    JPEG_QUALITY = 82
+    AVATAR_CACHE_ENTRIES = 256
+
+    # Content-addressed URLs never change, so browsers may keep them for a year
+    CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+    REPORT_IMAGE_ROUTE = "/media/reports"
+    AVATAR_ROUTE = "/media/avatars"
+
+
+# Set by register_media_routes(); without the HTTP routes views fall back to inline images.
+_media_urls_enabled = False
+
+
+def enable_media_urls(enabled: bool = True):
+    """Toggle whether views reference media URLs (requires the routes to be mounted)."""
+    global _media_urls_enabled
+    _media_urls_enabled = enabled
+
+
+def media_urls_enabled() -> bool:
+    return _media_urls_enabled
+
+
+def normalize_size(size: Optional[str], default: str) -> str:
+    """Map a requested size name to a known variant."""
+    if size == "full" or size in MediaConfig.SIZES:
+        return size
+    return default
+
+
+def report_image_url(image_key: Optional[str], size: str = MediaConfig.DEFAULT_REPORT_SIZE) -> Optional[str]:
+    """URL for a report photo, or None if media URLs are unavailable."""
+    if not image_key or not _media_urls_enabled:
+        return None
+    return f"{MediaConfig.REPORT_IMAGE_ROUTE}/{image_key}?size={size}"
+
+
+def report_image_src(db, image_key: Optional[str], size: str = MediaConfig.DEFAULT_REPORT_SIZE) -> Optional[str]:
+    """
+    Image source for a report card: the media URL, or without the HTTP routes
+    the stored thumbnail inline, so a list of cards does not load every original.
+    """
+    if not image_key:
+        return None
+    url = report_image_url(image_key, size)
+    if url:
+        return url
+    image = get_report_image(db, image_key, size)
+    return to_data_uri(image['mime_type'], image['data']) if image else None
+
+
+def avatar_url(picture: Optional[str], size: str = MediaConfig.DEFAULT_AVATAR_SIZE) -> Optional[str]:
+    """URL for a data URI avatar, or None (external URLs are used as-is by callers)."""
+    if not picture or not _media_urls_enabled:
+        return None
+    parsed = parse_data_uri(picture)
+    if parsed is None:
+        return None
+    return f"{MediaConfig.AVATAR_ROUTE}/{blob_key(parsed[1])}?size={size}"
+
+
+def make_thumbnail(data: bytes, max_px: int) -> Tuple[bytes, str]:
+    """Downscale image bytes to ``max_px`` on the longest side as JPEG."""
+    from PIL import Image as PilImage, ImageOps
+
+    img = PilImage.open(io.BytesIO(data))
+    img = ImageOps.exif_transpose(img)
+    img = img.convert("RGB")
+    img.thumbnail((max_px, max_px), PilImage.LANCZOS)
+    buf = io.BytesIO()
+    img.save(buf, format="JPEG", quality=MediaConfig.JPEG_QUALITY, optimize=True)
+    return buf.getvalue(), "image/jpeg"
+
+
+@lru_cache(maxsize=None)
+def _pillow_available() -> bool:
+    """Whether Pillow can be imported (reported once when it cannot)."""
+    try:
+        import PIL  # noqa: F401
+    except ImportError:
+        print("Pillow is not installed; serving original images instead of thumbnails")
+        return False
+    return True
+
+
+def _try_thumbnail(data: bytes, size: str) -> Optional[Tuple[bytes, str]]:
+    """Thumbnail for ``size``, or None if Pillow is missing or cannot read the image."""
+    if not _pillow_available():
+        return None
+    try:
+        return make_thumbnail(data, MediaConfig.SIZES[size])
+    except Exception as e:
+        print(f"Thumbnail generation failed, serving original: {e}")
+        return None
+
+
+def pregenerate_report_thumbnails(db, image_key: str) -> int:
+    """
+    Generate every thumbnail size for a stored report photo; returns how many were added.
+
+    Resizing happens before any write, so the transaction that stores the
+    thumbnails is a single short ``executemany``.
+    """
+    blob = db.blobs.get(image_key)
+    if blob is None:
+        return 0
+    with db._pool.connection() as conn:
+        existing = {
+            row[0] for row in conn.execute(
+                'SELECT size FROM image_thumbnails WHERE source_key = ?', (image_key,)
+            )
+        }
+    rows = []
+    for size in MediaConfig.SIZES:
+        if size in existing:
+            continue
+        thumbnail = _try_thumbnail(blob['data'], size)
+        if thumbnail is not None:
+            rows.append((image_key, size, thumbnail[1], thumbnail[0]))
+        elif _pillow_available():
+            # Undecodable: keep the original as this size so it is not retried per request
+            rows.append((image_key, size, blob['mime_type'], blob['data']))
+    if not rows:
+        return 0
+    with db._pool.connection() as conn:
+        conn.executemany('''
+            INSERT OR IGNORE INTO image_thumbnails (source_key, size, mime_type, data)
+            VALUES (?, ?, ?, ?)
+        ''', rows)
+    return len(rows)
+
+
+def get_report_image(db, image_key: str, size: str) -> Optional[Dict[str, object]]:
+    """
+    Return ``{'data', 'mime_type', 'created_at'}`` for a report photo variant.
+
+    Missing thumbnails are generated and stored on first request; if one
+    cannot be generated the original is returned.
+    """
+    size = normalize_size(size, MediaConfig.DEFAULT_REPORT_SIZE)
+    if size != "full":
+        with db._pool.connection() as conn:
+            row = conn.execute('''
+                SELECT data, mime_type, created_at FROM image_thumbnails
+                WHERE source_key = ? AND size = ?
+            ''', (image_key, size)).fetchone()
+        if row:
+            return {'data': row[0], 'mime_type': row[1], 'created_at': row[2]}
+
+    blob = db.blobs.get(image_key)
+    if blob is None:
+        return None
+    if size != "full" and pregenerate_report_thumbnails(db, image_key):
+        return get_report_image(db, image_key, size)
+    return {'data': blob['data'], 'mime_type': blob['mime_type'], 'created_at': blob['created_at']}
+
+
+_avatar_cache: "OrderedDict[Tuple[str, str], Dict[str, object]]" = OrderedDict()
+_avatar_cache_lock = threading.Lock()
+
+
+def get_avatar_image(db, avatar_key: str, size: str) -> Optional[Dict[str, object]]:
+    """Return ``{'data', 'mime_type', 'created_at'}`` for an avatar variant (LRU cached)."""
+    size = normalize_size(size, MediaConfig.DEFAULT_AVATAR_SIZE)
+    cache_key = (avatar_key, size)
+    with _avatar_cache_lock:
+        cached = _avatar_cache.get(cache_key)
+        if cached is not None:
+            _avatar_cache.move_to_end(cache_key)
+            return cached
+
+    avatar = db.get_avatar(avatar_key)
+    if avatar is None:
+        return None
+    mime_type, data, updated_at = avatar
+    if size != "full":
+        thumbnail = _try_thumbnail(data, size)
+        if thumbnail is not None:
+            data, mime_type = thumbnail
+    image = {'data': data, 'mime_type': mime_type, 'created_at': updated_at}
+
+    with _avatar_cache_lock:
+        _avatar_cache[cache_key] = image
+        while len(_avatar_cache) > MediaConfig.AVATAR_CACHE_ENTRIES:
+            _avatar_cache.popitem(last=False)
+    return image
+
+
+def etag_for(key: str, size: str) -> str:
+    """Strong ETag for a content-addressed image variant."""
+    return f'"{key[:32]}-{size}"'
+
+
+def http_date(timestamp) -> Optional[str]:
+    """Format a SQLite UTC timestamp for Last-Modified."""
+    if not timestamp:
+        return None
+    try:
+        parsed = datetime.fromisoformat(str(timestamp))
+    except ValueError:
+        return None
+    if parsed.tzinfo is None:
+        parsed = parsed.replace(tzinfo=timezone.utc)
+    return format_datetime(parsed.astimezone(timezone.utc), usegmt=True)
+
+
+def is_not_modified(etag: str, last_modified: Optional[str],
+                    if_none_match: Optional[str] = None,
+                    if_modified_since: Optional[str] = None) -> bool:
+    """Evaluate conditional request headers (If-None-Match takes precedence)."""
+    if if_none_match:
+        candidates = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+    if if_modified_since and last_modified:
+        try:
+            return parsedate_to_datetime(last_modified) <= parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def cache_headers(etag: str, last_modified: Optional[str]) -> Dict[str, str]:
+    """Response headers shared by the image routes."""
+    headers = {
+        "ETag": etag,
+        "Cache-Control": MediaConfig.CACHE_CONTROL,
+    }
+    if last_modified:
+        headers["Last-Modified"] = last_modified
+    return headers
@@ -0,0 +1,70 @@
+"""
+FastAPI routes that serve report photos and avatars from the database.
+
+Mounted on the exported ASGI ``app`` in ``main.py``; once registered, the
+card and avatar views reference these URLs instead of inlining base64.
+"""
+
+import re
+
+from app.services.media.image_service import (
+    MediaConfig,
+    cache_headers,
+    enable_media_urls,
+    etag_for,
+    get_avatar_image,
+    get_report_image,
+    http_date,
+    is_not_modified,
+    normalize_size,
+)
+
+_KEY_PATTERN = re.compile(r'^[0-9a-f]{64}$')
+
+
+def _image_response(image, key, size, request):
+    from fastapi.responses import Response
+
+    etag = etag_for(key, size)
+    last_modified = http_date(image['created_at'])
+    headers = cache_headers(etag, last_modified)
+
+    if is_not_modified(
+        etag,
+        last_modified,
+        request.headers.get("if-none-match"),
+        request.headers.get("if-modified-since"),
+    ):
+        return Response(status_code=304, headers=headers)
+    return Response(content=image['data'], media_type=image['mime_type'], headers=headers)
+
+
+def register_media_routes(app, db=None):
+    """Add the image routes to a FastAPI app and switch views to media URLs."""
+    from fastapi import HTTPException, Request
+    from starlette.concurrency import run_in_threadpool
+
+    if db is None:
+        from app.services.database.database import db
+
+    @app.get(MediaConfig.REPORT_IMAGE_ROUTE + "/{image_key}")
+    async def report_image(image_key: str, request: Request, size: str = MediaConfig.DEFAULT_REPORT_SIZE):
+        if not _KEY_PATTERN.match(image_key):
+            raise HTTPException(status_code=404)
+        size = normalize_size(size, MediaConfig.DEFAULT_REPORT_SIZE)
+        image = await run_in_threadpool(get_report_image, db, image_key, size)
+        if image is None:
+            raise HTTPException(status_code=404)
+        return _image_response(image, image_key, size, request)
+
+    @app.get(MediaConfig.AVATAR_ROUTE + "/{avatar_key}")
+    async def avatar_image(avatar_key: str, request: Request, size: str = MediaConfig.DEFAULT_AVATAR_SIZE):
+        if not _KEY_PATTERN.match(avatar_key):
+            raise HTTPException(status_code=404)
+        size = normalize_size(size, MediaConfig.DEFAULT_AVATAR_SIZE)
+        image = await run_in_threadpool(get_avatar_image, db, avatar_key, size)
+        if image is None:
+            raise HTTPException(status_code=404)
+        return _image_response(image, avatar_key, size, request)
+
+    enable_media_urls()
@@ -4,12 +4,17 @@ from .session_manager import (
     SessionManager,
     SessionInfo,
     SessionConfig,
-    get_session_manager
+    get_session_manager,
+    create_session_store
 )
+from .session_store import MemorySessionStore, SQLiteSessionStore
 
 __all__ = [
     'SessionManager',
     'SessionInfo',
     'SessionConfig',
-    'get_session_manager'
+    'get_session_manager',
+    'create_session_store',
+    'MemorySessionStore',
+    'SQLiteSessionStore'
 ]
@@ -0,0 +1,87 @@
+"""
+Load benchmark for the in-memory session manager.
+
+    python -m app.services.session.benchmark [--sessions 100000] [--threads 8] [--updates 200000]
+
+Creates ``--sessions`` sessions, then has ``--threads`` threads call
+``update_activity`` and ``validate_session`` for random users, and reports
+memory per session, throughput and the cost of a full active-session listing.
+"""
+
+import argparse
+import random
+import sys
+import threading
+import time
+import tracemalloc
+
+from app.services.session.session_manager import SessionManager
+from app.services.session.session_store import MemorySessionStore
+
+
+def _timed(label, fn, count):
+    start = time.perf_counter()
+    fn()
+    elapsed = time.perf_counter() - start
+    print(f"{label:<28} {elapsed:8.3f} s  {count / elapsed:>12,.0f} ops/s")
+    return elapsed
+
+
+def run(sessions=100_000, threads=8, updates=200_000, seed=0):
+    manager = SessionManager(MemorySessionStore())
+    emails = [f"user{i}@example.com" for i in range(sessions)]
+
+    _timed("create_session", lambda: [
+        manager.create_session(email, "Bench User", "admin" if i % 50 == 0 else "student")
+        for i, email in enumerate(emails)
+    ], sessions)
+
+    # Memory is sampled on a separate manager; tracing slows allocation a lot.
+    sample = min(sessions, 10_000)
+    probe = SessionManager(MemorySessionStore())
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    for email in emails[:sample]:
+        probe.create_session(email, "Bench User", "student")
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    print(f"{'memory per session':<28} {used / sample:8.0f} B")
+
+    per_thread = updates // threads
+
+    def hammer(method, rng):
+        call = getattr(manager, method)
+        for _ in range(per_thread):
+            call(rng.choice(emails))
+
+    for method in ("update_activity", "validate_session"):
+        workers = [
+            threading.Thread(target=hammer, args=(method, random.Random(seed + n)))
+            for n in range(threads)
+        ]
+
+        def go():
+            for worker in workers:
+                worker.start()
+            for worker in workers:
+                worker.join()
+
+        _timed(f"{method} x{threads} threads", go, per_thread * threads)
+
+    _timed("get_all_active_sessions", manager.get_all_active_sessions, sessions)
+    _timed("_check_sessions (none due)", manager._check_sessions, 1)
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m app.services.session.benchmark",
+                                     description="Session manager load benchmark.")
+    parser.add_argument("--sessions", type=int, default=100_000, help="concurrent sessions (default: 100000)")
+    parser.add_argument("--threads", type=int, default=8, help="threads issuing requests (default: 8)")
+    parser.add_argument("--updates", type=int, default=200_000, help="calls per method (default: 200000)")
+    args = parser.parse_args(argv)
+    return run(args.sessions, args.threads, args.updates)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
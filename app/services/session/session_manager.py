@@ -1,9 +1,16 @@
+import heapq
+import os
+import secrets
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from typing import Optional, Callable, Dict, Any
 import json
 
+from app.services.session.session_store import MemorySessionStore, SQLiteSessionStore
+
 
 class SessionConfig:
     # Session timeout durations (in minutes)
@@ -14,90 +21,259 @@ class SessionConfig:
     ADMIN_INACTIVITY_TIMEOUT = 45  # 45 minutes of no activity
     USER_INACTIVITY_TIMEOUT = 90   # 90 minutes of no activity
     
-    # Session check interval (how often to check for expired sessions)
-    SESSION_CHECK_INTERVAL = 30  # Check every 30 seconds
+    # Longest the monitor sleeps when no deadline is due sooner (seconds)
+    SESSION_CHECK_INTERVAL = 30
+    
+    # Where the app's sessions live: 'memory' keeps them in this process only;
+    # deployments running several workers (or wanting sessions to survive a
+    # restart) set SESSION_BACKEND=sqlite to share them through SESSION_DB
+    BACKEND = os.environ.get("SESSION_BACKEND", "memory")
+    DB_PATH = os.environ.get("SESSION_DB", "app_database.db")
+    
+    # Seconds a cached session is trusted before it is re-read from a shared
+    # store; bounds how long a logout in another worker takes to apply here
+    CACHE_TTL = 5
+    CACHE_SIZE = 10_000
+    
+    # Activity is written to a shared store at most this often per session (seconds)
+    ACTIVITY_WRITE_INTERVAL = 30
+    
+    # Per-user timeout callbacks kept (oldest dropped first) and threads running them
+    MAX_CALLBACKS_PER_USER = 8
+    CALLBACK_WORKERS = 4
+    
+    # Session map partitions, each with its own lock
+    SESSION_SHARDS = 32
+    
+    # Activity within this many seconds of the last recorded activity is not re-recorded
+    ACTIVITY_DEBOUNCE = 1.0
+
+# Fixed wall-clock/monotonic pair for showing monotonic deadlines as datetimes
+_WALL_ANCHOR = time.time()
+_MONO_ANCHOR = time.monotonic()
+
+
+def _to_wall(mono: float) -> float:
+    return _WALL_ANCHOR + (mono - _MONO_ANCHOR)
+
+
+def _from_wall(wall: float) -> float:
+    return _MONO_ANCHOR + (wall - _WALL_ANCHOR)
+
+
+def _to_datetime(mono: float) -> datetime:
+    return datetime.fromtimestamp(_to_wall(mono))
+
+
+def _to_monotonic(value: datetime) -> float:
+    return _from_wall(value.timestamp())
+
 
 class SessionInfo:
-    """Stores session information for a user"""
+    """
+    Stores session information for a user.
+
+    Deadlines are kept as ``time.monotonic()`` values so wall-clock changes
+    cannot expire or extend sessions; ``created_at``, ``last_activity`` and
+    ``expires_at`` read and write them as datetimes.
+    """
+    
+    __slots__ = (
+        'user_email', 'user_name', 'user_type',
+        '_created', '_last_activity', '_expires',
+        'is_active', 'session_id', 'warned',
+        '_manager', '_scheduled',
+    )
     
     def __init__(self, user_email: str, user_name: str, user_type: str):
         self.user_email = user_email
         self.user_name = user_name
         self.user_type = user_type  # 'admin', 'student', 'faculty'
         
-        # Session timestamps
-        self.created_at = datetime.now()
-        self.last_activity = datetime.now()
-        self.expires_at = self._calculate_expiry()
+        # Session timestamps (monotonic seconds)
+        now = time.monotonic()
+        self._created = now
+        self._last_activity = now
+        self._expires = now + self._session_timeout()
         
         # Session state
         self.is_active = True
+        # Identifies this login in a shared store (None for process-local sessions)
+        self.session_id: Optional[str] = None
+        self.warned = False
+        
+        # Owning SessionManager, told when a deadline is moved by assignment
+        self._manager: Optional["SessionManager"] = None
+        # Deadline of this session's live entry in the manager's expiry heap
+        self._scheduled: Optional[float] = None
+    
+    def __lt__(self, other: "SessionInfo") -> bool:
+        # Orders expiry heap entries that share a deadline
+        return id(self) < id(other)
+    
+    def _session_timeout(self) -> float:
+        if self.user_type == "admin":
+            return SessionConfig.ADMIN_SESSION_TIMEOUT * 60
+        return SessionConfig.USER_SESSION_TIMEOUT * 60
+    
+    def _inactivity_timeout(self) -> float:
+        if self.user_type == "admin":
+            return SessionConfig.ADMIN_INACTIVITY_TIMEOUT * 60
+        return SessionConfig.USER_INACTIVITY_TIMEOUT * 60
     
     def _calculate_expiry(self) -> datetime:
         """Calculate session expiry based on user type"""
-        if self.user_type == "admin":
-            timeout = SessionConfig.ADMIN_SESSION_TIMEOUT
-        else:
-            timeout = SessionConfig.USER_SESSION_TIMEOUT
-        
-        return datetime.now() + timedelta(minutes=timeout)
+        return _to_datetime(time.monotonic() + self._session_timeout())
+    
+    @property
+    def created_at(self) -> datetime:
+        return _to_datetime(self._created)
+    
+    @property
+    def last_activity(self) -> datetime:
+        return _to_datetime(self._last_activity)
+    
+    @last_activity.setter
+    def last_activity(self, value: datetime):
+        self._last_activity = _to_monotonic(value)
+        if self._manager is not None:
+            self._manager._schedule(self)
+    
+    @property
+    def expires_at(self) -> datetime:
+        return _to_datetime(self._expires)
+    
+    @expires_at.setter
+    def expires_at(self, value: datetime):
+        self._expires = _to_monotonic(value)
+        if self._manager is not None:
+            self._manager._schedule(self)
+    
+    def deadline(self) -> float:
+        """Monotonic time at which the session times out or goes inactive, whichever is first."""
+        return min(self._expires, self._last_activity + self._inactivity_timeout())
     
     def update_activity(self):
         """Update last activity timestamp"""
-        self.last_activity = datetime.now()
+        # Only ever moves the deadline later, so the expiry heap needs no update.
+        self._last_activity = time.monotonic()
     
-    def is_expired(self) -> bool:
+    def is_expired(self, now: Optional[float] = None) -> bool:
         """Check if session has expired"""
-        return datetime.now() > self.expires_at
+        return (time.monotonic() if now is None else now) > self._expires
     
-    def is_inactive(self) -> bool:
+    def is_inactive(self, now: Optional[float] = None) -> bool:
         """Check if session has exceeded inactivity timeout"""
-        if self.user_type == "admin":
-            inactivity_timeout = SessionConfig.ADMIN_INACTIVITY_TIMEOUT
-        else:
-            inactivity_timeout = SessionConfig.USER_INACTIVITY_TIMEOUT
-        
-        time_since_activity = (datetime.now() - self.last_activity).total_seconds() / 60
-        return time_since_activity > inactivity_timeout
+        now = time.monotonic() if now is None else now
+        return now - self._last_activity > self._inactivity_timeout()
     
     def get_time_remaining(self) -> int:
         """Get remaining session time in minutes"""
-        remaining = (self.expires_at - datetime.now()).total_seconds() / 60
+        remaining = (self._expires - time.monotonic()) / 60
         return max(0, int(remaining))
     
     def get_inactivity_time(self) -> int:
         """Get inactivity duration in minutes"""
-        inactive_time = (datetime.now() - self.last_activity).total_seconds() / 60
-        return int(inactive_time)
+        return int((time.monotonic() - self._last_activity) / 60)
+    
+    def to_record(self) -> Dict[str, Any]:
+        """Convert session to a session store record (epoch seconds)"""
+        return {
+            'user_email': self.user_email,
+            'session_id': self.session_id,
+            'user_name': self.user_name,
+            'user_type': self.user_type,
+            'created_at': _to_wall(self._created),
+            'last_activity': _to_wall(self._last_activity),
+            'expires_at': _to_wall(self._expires),
+            'inactivity_timeout': self._inactivity_timeout(),
+        }
+    
+    @classmethod
+    def from_record(cls, record: Dict[str, Any]) -> "SessionInfo":
+        """Rebuild a session read from a session store"""
+        session = cls(record['user_email'], record['user_name'], record['user_type'])
+        session.session_id = record['session_id']
+        session._created = _from_wall(record['created_at'])
+        session._expires = _from_wall(record['expires_at'])
+        session._last_activity = _from_wall(record['last_activity'])
+        return session
+    
+    def _merge(self, record: Dict[str, Any]) -> float:
+        """Adopt activity and expiry recorded by other processes; returns the stored activity"""
+        stored_activity = _from_wall(record['last_activity'])
+        self._expires = _from_wall(record['expires_at'])
+        if stored_activity > self._last_activity:
+            self._last_activity = stored_activity
+        return stored_activity
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert session to dictionary"""
+        now = time.monotonic()
+        # Inlined _to_datetime: this runs once per row of the session listing
+        shift = _WALL_ANCHOR - _MONO_ANCHOR
+        fromtimestamp = datetime.fromtimestamp
         return {
             'user_email': self.user_email,
             'user_name': self.user_name,
             'user_type': self.user_type,
-            'created_at': self.created_at.isoformat(),
-            'last_activity': self.last_activity.isoformat(),
-            'expires_at': self.expires_at.isoformat(),
+            'created_at': fromtimestamp(self._created + shift).isoformat(),
+            'last_activity': fromtimestamp(self._last_activity + shift).isoformat(),
+            'expires_at': fromtimestamp(self._expires + shift).isoformat(),
             'is_active': self.is_active,
-            'time_remaining': self.get_time_remaining(),
-            'inactivity_minutes': self.get_inactivity_time()
+            'time_remaining': max(0, int((self._expires - now) / 60)),
+            'inactivity_minutes': int((now - self._last_activity) / 60)
         }
 
 
+class _SessionShard:
+    """One partition of the session map, guarded by its own lock."""
+    
+    __slots__ = ('lock', 'sessions', 'sync')
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        # Insertion-ordered, so with a shared store the first key is least recently used
+        self.sessions: Dict[str, SessionInfo] = {}
+        # Shared store only: email -> [last confirmed against the store,
+        # last activity written to it] (monotonic)
+        self.sync: Dict[str, list] = {}
+
+
 class SessionManager:
     """
     Manages user sessions with timeout and inactivity handling.
     Provides session creation, validation, activity tracking, and cleanup.
+    
+    Sessions are spread over ``SESSION_SHARDS`` partitions by email, so
+    lookups and activity updates for different users do not contend; ``_lock``
+    only guards the expiry heap and callback registry.
+    
+    With a shared ``store`` (see ``session_store``) each partition is a bounded
+    read-through cache: entries older than ``CACHE_TTL`` are re-read, so
+    logins, logouts and timeouts in other processes show up here.
     """
     
-    def __init__(self):
-        self._sessions: Dict[str, SessionInfo] = {}
+    def __init__(self, store: Optional[MemorySessionStore] = None):
+        self._store = store or MemorySessionStore()
+        self._shards = [_SessionShard() for _ in range(SessionConfig.SESSION_SHARDS)]
+        self._shard_cache_size = max(1, SessionConfig.CACHE_SIZE // SessionConfig.SESSION_SHARDS)
+        self._last_purge = time.monotonic()
         self._timeout_callbacks: list[Callable] = []
+        # user_email -> {key: callback}; dispatched on _callback_pool and
+        # dropped once that user's session ends
+        self._user_callbacks: Dict[str, "OrderedDict[Any, Callable]"] = {}
+        self._callback_pool: Optional[ThreadPoolExecutor] = None
         
         self._monitor_thread: Optional[threading.Thread] = None
         self._stop_monitoring = False
         self._lock = threading.Lock()
+        # Wakes the monitor when an earlier deadline is scheduled or monitoring stops
+        self._wakeup = threading.Condition(self._lock)
+        
+        # Min-heap of (deadline, session); entries whose deadline no longer
+        # matches session._scheduled are stale and skipped when popped.
+        self._deadlines: list = []
     
     def create_session(
         self,
@@ -116,20 +292,89 @@ class SessionManager:
         Returns:
             SessionInfo object for the created session
         """
-        with self._lock:
+        shard = self._shard(user_email)
+        with shard.lock:
             # Invalidate any existing session for this user
-            if user_email in self._sessions:
-                self._sessions[user_email].is_active = False
+            old = shard.sessions.get(user_email)
+            if old is not None:
+                old.is_active = False
             
             session = SessionInfo(user_email, user_name, user_type)
-            self._sessions[user_email] = session
-            
-            return session
+            if self._store.shared:
+                session.session_id = secrets.token_hex(16)
+            self._cache_locked(shard, session, session._created)
+        self._schedule(session)
+        
+        # Replacing the stored record also revokes the old session in other processes
+        self._store.save(session.to_record())
+        return session
+    
+    def _shard(self, user_email: str) -> _SessionShard:
+        return self._shards[hash(user_email) % len(self._shards)]
+    
+    def _cache_locked(self, shard: _SessionShard, session: SessionInfo, stored_activity: float):
+        """Put ``session`` in ``shard``; with a shared store, record it as just read from the store"""
+        email = session.user_email
+        sessions = shard.sessions
+        if self._store.shared:
+            sessions.pop(email, None)  # re-insert as most recently used
+            while len(sessions) >= self._shard_cache_size:
+                evicted = next(iter(sessions))
+                del sessions[evicted]
+                del shard.sync[evicted]
+            shard.sync[email] = [time.monotonic(), stored_activity]
+        sessions[email] = session
+        session._manager = self
+    
+    def _schedule(self, session: SessionInfo):
+        """Queue ``session`` in the expiry heap if its deadline moved earlier."""
+        with self._lock:
+            deadline = session.deadline()
+            # A later deadline is picked up when the earlier entry fires.
+            if session._scheduled is not None and session._scheduled <= deadline:
+                return
+            self._push_locked(session, deadline)
+    
+    def _push_locked(self, session: SessionInfo, deadline: float):
+        session._scheduled = deadline
+        heapq.heappush(self._deadlines, (deadline, session))
+        if self._deadlines[0][1] is session:
+            self._wakeup.notify()
     
     def get_session(self, user_email: str) -> Optional[SessionInfo]:
         """Get session for a user"""
-        with self._lock:
-            return self._sessions.get(user_email)
+        shard = self._shard(user_email)
+        with shard.lock:
+            session = shard.sessions.get(user_email)
+            if not self._store.shared:
+                return session
+            if session is not None and time.monotonic() - shard.sync[user_email][0] < SessionConfig.CACHE_TTL:
+                shard.sessions[user_email] = shard.sessions.pop(user_email)
+                return session
+        return self._refresh(user_email)
+    
+    def _refresh(self, user_email: str) -> Optional[SessionInfo]:
+        """Re-read a user's session from the shared store into the cache"""
+        record = self._store.load(user_email)
+        shard = self._shard(user_email)
+        with shard.lock:
+            cached = shard.sessions.get(user_email)
+            if cached is not None and record is not None and cached.session_id == record['session_id']:
+                stored_activity = max(cached._merge(record), shard.sync[user_email][1])
+                self._cache_locked(shard, cached, stored_activity)
+                session = cached
+            else:
+                # Logged out, timed out or logged in again elsewhere
+                if cached is not None:
+                    cached.is_active = False
+                    del shard.sessions[user_email]
+                    del shard.sync[user_email]
+                if record is None:
+                    return None
+                session = SessionInfo.from_record(record)
+                self._cache_locked(shard, session, session._last_activity)
+        self._schedule(session)
+        return session
     
     def validate_session(self, user_email: str) -> bool:
         """
@@ -146,10 +391,11 @@ class SessionManager:
         if not session.is_active:
             return False
         
-        if session.is_expired():
+        now = time.monotonic()
+        if session.is_expired(now):
             return False
         
-        if session.is_inactive():
+        if session.is_inactive(now):
             return False
         
         return True
@@ -167,7 +413,19 @@ class SessionManager:
         if not session:
             return False
         
-        session.update_activity()
+        now = time.monotonic()
+        if now - session._last_activity < SessionConfig.ACTIVITY_DEBOUNCE:
+            return True
+        session._last_activity = now
+        if self._store.shared:
+            shard = self._shard(user_email)
+            with shard.lock:
+                sync = shard.sync.get(user_email)
+                write = sync is not None and now - sync[1] >= SessionConfig.ACTIVITY_WRITE_INTERVAL
+                if write:
+                    sync[1] = now
+            if write:
+                self._store.touch(user_email, session.session_id, _to_wall(now))
         return True
     
     def invalidate_session(self, user_email: str) -> bool:
@@ -182,17 +440,58 @@ class SessionManager:
         if not session:
             return False
         
+        session.is_active = False
         with self._lock:
-            session.is_active = False
+            self._user_callbacks.pop(user_email, None)
+        self._store.revoke(user_email, session.session_id)
         
         return True
     
-    def register_timeout_callback(self, callback: Callable[[str, str], None]):
+    def register_timeout_callback(
+        self,
+        callback: Callable[[str, str], None],
+        user_email: Optional[str] = None,
+        key: Any = None
+    ) -> Callable[[], None]:
         """
         Register callback for when session times out.
         Callback receives (user_email, reason) where reason is 'timeout' or 'inactivity'
+        
+        Without ``user_email`` the callback runs for every user, on the monitor
+        thread. With it, the callback runs on a worker thread only for that
+        user's session, and is dropped when the session ends. Registering again
+        with the same ``key`` (e.g. one per page) replaces the earlier callback.
+        
+        Returns:
+            Function that unregisters the callback
         """
-        self._timeout_callbacks.append(callback)
+        if user_email is None:
+            with self._lock:
+                self._timeout_callbacks.append(callback)
+            
+            def unsubscribe():
+                with self._lock:
+                    if callback in self._timeout_callbacks:
+                        self._timeout_callbacks.remove(callback)
+            return unsubscribe
+        
+        if key is None:
+            key = object()
+        with self._lock:
+            callbacks = self._user_callbacks.setdefault(user_email, OrderedDict())
+            callbacks.pop(key, None)
+            callbacks[key] = callback
+            while len(callbacks) > SessionConfig.MAX_CALLBACKS_PER_USER:
+                callbacks.popitem(last=False)
+        
+        def unsubscribe():
+            with self._lock:
+                callbacks = self._user_callbacks.get(user_email)
+                if callbacks is not None and callbacks.get(key) is callback:
+                    del callbacks[key]
+                    if not callbacks:
+                        del self._user_callbacks[user_email]
+        return unsubscribe
     
     def start_monitoring(self):
         """Start background monitoring of session timeouts"""
@@ -208,56 +507,108 @@ class SessionManager:
     
     def stop_monitoring(self):
         """Stop background monitoring"""
-        self._stop_monitoring = True
+        with self._lock:
+            self._stop_monitoring = True
+            self._wakeup.notify_all()
         if self._monitor_thread:
             self._monitor_thread.join(timeout=2)
     
     def _monitor_sessions(self):
-        """Background thread that monitors sessions"""
+        """Background thread that sleeps until the earliest session deadline"""
         while not self._stop_monitoring:
             try:
                 self._check_sessions()
-                time.sleep(SessionConfig.SESSION_CHECK_INTERVAL)
+                if self._store.shared and time.monotonic() - self._last_purge >= SessionConfig.SESSION_CHECK_INTERVAL:
+                    self._last_purge = time.monotonic()
+                    self._store.purge(time.time())
+                with self._lock:
+                    if self._stop_monitoring:
+                        break
+                    wait = SessionConfig.SESSION_CHECK_INTERVAL
+                    if self._deadlines:
+                        wait = min(wait, max(0.0, self._deadlines[0][0] - time.monotonic()))
+                    if wait > 0:
+                        self._wakeup.wait(wait)
             except Exception as e:
                 print(f"Error monitoring sessions: {e}")
     
     def _check_sessions(self):
-        """Check all sessions for timeout/inactivity"""
+        """Time out every session whose deadline has passed"""
+        due = []
         with self._lock:
-            sessions_to_check = list(self._sessions.items())
+            now = time.monotonic()
+            while self._deadlines and self._deadlines[0][0] <= now:
+                deadline, session = heapq.heappop(self._deadlines)
+                if session._scheduled != deadline:
+                    continue  # superseded by an earlier deadline
+                session._scheduled = None
+                if not session.is_active:
+                    continue  # logged out or replaced by a newer login
+                if session.deadline() > now:
+                    # Activity since this entry was queued moved the deadline later
+                    self._push_locked(session, session.deadline())
+                    continue
+                due.append((session, 'timeout' if session._expires <= now else 'inactivity'))
         
-        for user_email, session in sessions_to_check:
-            if not session.is_active:
-                continue
-            
-            # Check for timeout
-            if session.is_expired():
-                self._handle_timeout(user_email, session, 'timeout')
-            
-            # Check for inactivity
-            elif session.is_inactive():
-                self._handle_timeout(user_email, session, 'inactivity')
+        for session, reason in due:
+            if self._store.shared:
+                # Another process may have recorded later activity or a new login;
+                # if the record is gone it was revoked or purged there.
+                current = self._refresh(session.user_email)
+                if current is not None and current is not session:
+                    continue
+                now = time.monotonic()
+                if current is session and session.deadline() > now:
+                    continue
+                reason = 'timeout' if session._expires <= now else 'inactivity'
+            self._handle_timeout(session.user_email, session, reason)
     
     def _handle_timeout(self, user_email: str, session: SessionInfo, reason: str):
         """Handle session timeout"""
+        session.is_active = False
         with self._lock:
-            session.is_active = False
+            user_callbacks = self._user_callbacks.pop(user_email, None)
+            callbacks = list(self._timeout_callbacks)
+        self._store.revoke(user_email, session.session_id)
         
         # Trigger timeout callbacks
-        for callback in self._timeout_callbacks:
-            try:
-                callback(user_email, reason)
-            except Exception as e:
-                print(f"Error in timeout callback: {e}")
+        for callback in callbacks:
+            self._run_callback(callback, user_email, reason)
+        
+        if user_callbacks:
+            pool = self._get_callback_pool()
+            for callback in user_callbacks.values():
+                pool.submit(self._run_callback, callback, user_email, reason)
+    
+    @staticmethod
+    def _run_callback(callback: Callable[[str, str], None], user_email: str, reason: str):
+        try:
+            callback(user_email, reason)
+        except Exception as e:
+            print(f"Error in timeout callback: {e}")
+    
+    def _get_callback_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._callback_pool is None:
+                self._callback_pool = ThreadPoolExecutor(
+                    max_workers=SessionConfig.CALLBACK_WORKERS,
+                    thread_name_prefix="session-timeout"
+                )
+            return self._callback_pool
     
     def get_all_active_sessions(self) -> Dict[str, Dict]:
         """Get all currently active sessions"""
-        with self._lock:
-            active = {
-                email: session.to_dict()
-                for email, session in self._sessions.items()
-                if session.is_active
+        if self._store.shared:
+            return {
+                record['user_email']: SessionInfo.from_record(record).to_dict()
+                for record in self._store.active(time.time())
             }
+        active = {}
+        for shard in self._shards:
+            with shard.lock:
+                sessions = [session for session in shard.sessions.values() if session.is_active]
+            for session in sessions:
+                active[session.user_email] = session.to_dict()
         return active
     
     def get_session_stats(self, user_email: str) -> Optional[Dict]:
@@ -308,21 +659,34 @@ class SessionManager:
         session.expires_at = session._calculate_expiry()
         session.last_activity = datetime.now()
         session.warned = False
+        if self._store.shared:
+            shard = self._shard(user_email)
+            with shard.lock:
+                sync = shard.sync.get(user_email)
+                if sync is not None:
+                    sync[1] = session._last_activity
+        self._store.save(session.to_record())
         
         return True
     
     def cleanup_inactive_sessions(self):
-        """Remove sessions that have been inactive or expired"""
-        with self._lock:
-            to_remove = [
-                email for email, session in self._sessions.items()
-                if session.is_expired() or session.is_inactive()
-            ]
-            
-            for email in to_remove:
-                del self._sessions[email]
-            
-            return len(to_remove)
+        """Remove sessions that have been inactive or expired (returns how many were cached here)"""
+        removed = 0
+        now = time.monotonic()
+        for shard in self._shards:
+            with shard.lock:
+                to_remove = [
+                    email for email, session in shard.sessions.items()
+                    if session.is_expired(now) or session.is_inactive(now)
+                ]
+                
+                for email in to_remove:
+                    del shard.sessions[email]
+                    shard.sync.pop(email, None)
+            removed += len(to_remove)
+        
+        self._store.purge(time.time())
+        return removed
 
 
 # Global singleton instance
@@ -333,5 +697,15 @@ def get_session_manager() -> SessionManager:
     """Get or create the singleton session manager"""
     global _session_manager
     if _session_manager is None:
-        _session_manager = SessionManager()
+        _session_manager = SessionManager(create_session_store())
     return _session_manager
+
+
+def create_session_store(backend: Optional[str] = None) -> MemorySessionStore:
+    """Session store for ``backend`` ('memory' or 'sqlite'; default ``SessionConfig.BACKEND``)"""
+    backend = backend or SessionConfig.BACKEND
+    if backend == "sqlite":
+        return SQLiteSessionStore(SessionConfig.DB_PATH)
+    if backend == "memory":
+        return MemorySessionStore()
+    raise ValueError(f"Unknown session backend: {backend!r}")
@@ -0,0 +1,112 @@
+"""
+Session backends for ``SessionManager``.
+
+``MemorySessionStore`` keeps nothing outside the manager's own map, so
+sessions belong to one process. ``SQLiteSessionStore`` writes them to the
+``sessions`` table (migration 0011) so every web worker sees the same
+logins, a restart does not log everyone out, and logging out or timing out
+in one worker revokes the session everywhere.
+
+Records are plain dicts with ``user_email``, ``session_id``, ``user_name``,
+``user_type``, ``created_at``, ``last_activity``, ``expires_at`` and
+``inactivity_timeout``; times are Unix epoch seconds so that processes with
+different monotonic clocks agree on them.
+"""
+
+from typing import Dict, List, Optional
+
+from app.services.database.connection_pool import get_pool
+from app.services.database.migrations import ensure_schema
+
+_COLUMNS = (
+    'user_email', 'session_id', 'user_name', 'user_type',
+    'created_at', 'last_activity', 'expires_at', 'inactivity_timeout',
+)
+
+
+class MemorySessionStore:
+    """
+    Process-local backend: the manager's map is the only copy.
+
+    Also documents the backend interface; ``shared`` tells the manager
+    whether other processes may change sessions behind its back.
+    """
+
+    shared = False
+
+    def save(self, record: Dict) -> None:
+        """Insert or replace the session for ``record['user_email']``."""
+
+    def load(self, user_email: str) -> Optional[Dict]:
+        """Current session record for ``user_email``, or None."""
+        return None
+
+    def touch(self, user_email: str, session_id: str, last_activity: float) -> None:
+        """Move a session's last activity forward (never back)."""
+
+    def revoke(self, user_email: str, session_id: str) -> None:
+        """Remove a session, unless it has since been replaced by a newer login."""
+
+    def active(self, now: float) -> List[Dict]:
+        """Records whose deadline is after ``now``."""
+        return []
+
+    def purge(self, now: float) -> int:
+        """Delete records whose deadline has passed; returns how many."""
+        return 0
+
+
+class SQLiteSessionStore(MemorySessionStore):
+    """Sessions in the shared SQLite database (WAL, indexed on deadline)."""
+
+    shared = True
+
+    def __init__(self, db_path="app_database.db"):
+        self.db_path = db_path
+        self._pool = get_pool(db_path)
+        ensure_schema(db_path)
+
+    def save(self, record):
+        values = [record[c] for c in _COLUMNS]
+        deadline = min(record['expires_at'], record['last_activity'] + record['inactivity_timeout'])
+        with self._pool.connection() as conn:
+            conn.execute(f'''
+                INSERT INTO sessions ({', '.join(_COLUMNS)}, deadline)
+                VALUES ({', '.join('?' * len(_COLUMNS))}, ?)
+                ON CONFLICT(user_email) DO UPDATE SET
+                    {', '.join(f'{c} = excluded.{c}' for c in _COLUMNS[1:])},
+                    deadline = excluded.deadline
+            ''', values + [deadline])
+
+    def load(self, user_email):
+        with self._pool.connection() as conn:
+            row = conn.execute(
+                f'SELECT {", ".join(_COLUMNS)} FROM sessions WHERE user_email = ?', (user_email,)
+            ).fetchone()
+        return dict(zip(_COLUMNS, row)) if row else None
+
+    def touch(self, user_email, session_id, last_activity):
+        with self._pool.connection() as conn:
+            conn.execute('''
+                UPDATE sessions
+                SET last_activity = MAX(last_activity, ?),
+                    deadline = MIN(expires_at, MAX(last_activity, ?) + inactivity_timeout)
+                WHERE user_email = ? AND session_id = ?
+            ''', (last_activity, last_activity, user_email, session_id))
+
+    def revoke(self, user_email, session_id):
+        with self._pool.connection() as conn:
+            conn.execute(
+                'DELETE FROM sessions WHERE user_email = ? AND session_id = ?', (user_email, session_id)
+            )
+
+    def active(self, now):
+        with self._pool.connection() as conn:
+            rows = conn.execute(
+                f'SELECT {", ".join(_COLUMNS)} FROM sessions WHERE deadline > ?', (now,)
+            ).fetchall()
+        return [dict(zip(_COLUMNS, row)) for row in rows]
+
+    def purge(self, now):
+        with self._pool.connection() as conn:
+            return conn.execute('DELETE FROM sessions WHERE deadline <= ?', (now,)).rowcount
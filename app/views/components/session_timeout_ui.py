@@ -3,10 +3,18 @@ Session Timeout UI Components
 Provides Flet UI components for session timeout warnings and management.
 """
 
+import asyncio
+import weakref
+
 import flet as ft
 from datetime import datetime
 from app.services.session import get_session_manager, SessionConfig
 
+# Seconds between refreshes of the session status indicators
+STATUS_REFRESH_INTERVAL = 10
+
+_NOT_SHOWN = object()
+
 
 class SessionTimeoutDialog(ft.AlertDialog):
     """Dialog warning user about session timeout"""
@@ -158,64 +166,138 @@ class SessionStatusIndicator(ft.Container):
             spacing=4
         )
         
-        # Start update thread
-        self._start_updates()
+        # What the indicator currently shows; refreshes only push changes
+        self._shown = _NOT_SHOWN
     
-    def _start_updates(self):
-        """Start periodic updates"""
-        import threading
-        
-        def update_loop():
-            while True:
-                try:
-                    self._update_display()
-                    import time
-                    time.sleep(10)  # Update every 10 seconds
-                except Exception as e:
-                    print(f"Error updating session indicator: {e}")
-                    break
-        
-        thread = threading.Thread(target=update_loop, daemon=True)
-        thread.start()
+    def did_mount(self):
+        """Show the current status and join the shared refresh ticker"""
+        self._update_display()
+        _ticker_for(self.page).add(self)
     
-    def _update_display(self):
-        """Update status display"""
+    def will_unmount(self):
+        """Stop refreshing once removed from the page (or the page closes)"""
+        ticker = _tickers.get(getattr(self.page, "loop", None))
+        if ticker:
+            ticker.discard(self)
+    
+    def _read_state(self):
+        """What the indicator should show now (safe to call off the event loop)"""
         session = self.session_manager.get_session(self.user_email)
         
         if not session or not session.is_active:
-            self.visible = False
-            self.page.update()
-            return
+            return None
         
-        # Update timer
+        # Timer and color based on time remaining
         time_remaining = session.get_time_remaining()
-        self.timer_text.value = f"{time_remaining} seconds remaining"
-        
-        # Update color based on time remaining
         if time_remaining <= 5:
-            self.status_icon.color = ft.Colors.RED
-            self.timer_text.color = ft.Colors.RED
+            icon_color, text_color = ft.Colors.RED, ft.Colors.RED
         elif time_remaining <= 15:
-            self.status_icon.color = ft.Colors.ORANGE
-            self.timer_text.color = ft.Colors.ORANGE
+            icon_color, text_color = ft.Colors.ORANGE, ft.Colors.ORANGE
         else:
-            self.status_icon.color = ft.Colors.GREEN
-            self.timer_text.color = ft.Colors.GREY_700
+            icon_color, text_color = ft.Colors.GREEN, ft.Colors.GREY_700
         
-        # Show inactivity warning if applicable
+        # Inactivity warning if applicable
         inactivity_secs = session.get_inactivity_time()
         if session.user_type == "admin":
             inactivity_threshold = SessionConfig.ADMIN_INACTIVITY_TIMEOUT * 0.8  # Warn at 80%
         else:
             inactivity_threshold = SessionConfig.USER_INACTIVITY_TIMEOUT * 0.8
+        warning = f"No activity for {inactivity_secs} seconds" if inactivity_secs > inactivity_threshold else None
         
-        if inactivity_secs > inactivity_threshold:
-            self.warning_text.value = f"No activity for {inactivity_secs} seconds"
-            self.warning_text.visible = True
-        else:
-            self.warning_text.visible = False
+        return f"{time_remaining} seconds remaining", icon_color, text_color, warning
+    
+    def _apply_state(self, state) -> bool:
+        """Show ``state``; returns False if that is already what is shown"""
+        if state == self._shown:
+            return False
+        self._shown = state
         
-        self.page.update()
+        if state is None:
+            self.visible = False
+            return True
+        
+        timer_value, icon_color, text_color, warning = state
+        self.visible = True
+        self.timer_text.value = timer_value
+        self.status_icon.color = icon_color
+        self.timer_text.color = text_color
+        if warning:
+            self.warning_text.value = warning
+        self.warning_text.visible = bool(warning)
+        return True
+    
+    def _update_display(self):
+        """Update status display"""
+        if self._apply_state(self._read_state()):
+            self.update()
+
+
+class _StatusTicker:
+    """
+    One asyncio task per event loop that refreshes every mounted
+    ``SessionStatusIndicator`` on it, instead of a thread per widget.
+    
+    Session lookups for a tick run together on a worker thread; each page
+    then gets at most one update, covering only the indicators that changed.
+    """
+    
+    def __init__(self):
+        self._indicators: "weakref.WeakSet[SessionStatusIndicator]" = weakref.WeakSet()
+        self._task = None
+    
+    def add(self, indicator: "SessionStatusIndicator"):
+        self._indicators.add(indicator)
+        if self._task is None or self._task.done():
+            self._task = indicator.page.run_task(self._run)
+    
+    def discard(self, indicator: "SessionStatusIndicator"):
+        self._indicators.discard(indicator)
+    
+    async def _run(self):
+        while self._indicators:
+            await asyncio.sleep(STATUS_REFRESH_INTERVAL)
+            try:
+                await self.tick()
+            except Exception as e:
+                print(f"Error updating session indicators: {e}")
+        
+        # An indicator added while this task was finishing saw it still running
+        if self._indicators:
+            self._task = asyncio.ensure_future(self._run())
+    
+    async def tick(self):
+        """Refresh all registered indicators once"""
+        indicators = [i for i in self._indicators if i.page is not None]
+        if not indicators:
+            return
+        
+        states = await asyncio.to_thread(lambda: [i._read_state() for i in indicators])
+        
+        # Group changed indicators by page
+        changed = {}
+        for indicator, state in zip(indicators, states):
+            if indicator._apply_state(state):
+                changed.setdefault(id(indicator.page), (indicator.page, []))[1].append(indicator)
+        
+        for page, page_indicators in changed.values():
+            try:
+                page.update(*page_indicators)
+            except Exception as e:
+                # Page went away without unmounting its controls: stop refreshing it
+                print(f"Error updating session indicators: {e}")
+                for indicator in page_indicators:
+                    self.discard(indicator)
+
+
+# Status tickers keyed by event loop
+_tickers = {}
+
+
+def _ticker_for(page: ft.Page) -> _StatusTicker:
+    ticker = _tickers.get(page.loop)
+    if ticker is None:
+        ticker = _tickers.setdefault(page.loop, _StatusTicker())
+    return ticker
 
 
 class SessionActivityTracker:
@@ -262,21 +344,26 @@ def create_session_timeout_handler(page: ft.Page, user_email: str, on_logout_cal
         on_logout_callback: Function to call on logout
     
     Returns:
-        Dictionary with tracker
+        Dictionary with tracker and an ``unsubscribe`` function
     """
     session_manager = get_session_manager()
     
-    # Register timeout callback for automatic logout
+    # Register timeout callback for automatic logout; re-rendering the same
+    # page replaces its earlier callback instead of adding another one
     def timeout_callback(email, reason):
-        if email == user_email:
-            if on_logout_callback:
-                on_logout_callback()
+        if on_logout_callback:
+            on_logout_callback()
     
-    session_manager.register_timeout_callback(timeout_callback)
+    unsubscribe = session_manager.register_timeout_callback(
+        timeout_callback,
+        user_email=user_email,
+        key=getattr(page, "session_id", None) or id(page)
+    )
     
     # Create activity tracker
     tracker = SessionActivityTracker(page, user_email)
     
     return {
         'tracker': tracker,
+        'unsubscribe': unsubscribe,
     }
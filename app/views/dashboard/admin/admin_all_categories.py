@@ -2,7 +2,7 @@ import flet as ft
 from app.services.database.database import db
 from app.views.dashboard.session_manager import SessionManager
 from app.views.dashboard.navigation_drawer import NavigationDrawerComponent
-from .dashboard_data_manager import DataManager, StatusNormalizer
+from .dashboard_data_manager import DataManager
 from .admin_dashboard_ui import UIComponents
 
 # ── Palette ──
@@ -48,7 +48,7 @@ def admin_all_categories(page: ft.Page, user_data=None):
 
     data_manager = DataManager()
     ui_components = UIComponents()
-    all_reports = db.get_all_reports() or []
+    status_counts = db.get_status_counts()
 
     stats_row = ft.ResponsiveRow(spacing=10, run_spacing=10)
     status_filter_buttons = ft.Row(spacing=6, scroll=ft.ScrollMode.AUTO, tight=True)
@@ -56,12 +56,11 @@ def admin_all_categories(page: ft.Page, user_data=None):
 
     def update_stats():
         stats_row.controls.clear()
-        filtered = all_reports
+        counts = dict(status_counts)
         if current_status_filter["status"] != "All":
             target = (current_status_filter["status"] or "").strip().lower()
-            filtered = [r for r in all_reports if (r.get("status") or "").strip().lower() == target]
+            counts = {key: (value if key == target else 0) for key, value in counts.items()}
 
-        counts = DataManager.calculate_status_counts(filtered)
         stats_row.controls.extend([
             ui_components.create_stat_card("Pending", counts.get("pending", 0),
                                             ft.Icons.SCHEDULE_OUTLINED, "#B45309", "#FEF3C7", is_dark=is_dark),
@@ -75,10 +74,10 @@ def admin_all_categories(page: ft.Page, user_data=None):
 
     def update_status_filters():
         status_filter_buttons.controls.clear()
-        counts = DataManager.calculate_status_counts(all_reports)
+        counts = status_counts
 
         status_mapping = {
-            "All": len(all_reports),
+            "All": sum(counts.values()),
             "Pending": counts.get("pending", 0),
             "In Progress": counts.get("in progress", 0),
             "Resolved": counts.get("resolved", 0),
@@ -104,16 +103,11 @@ def admin_all_categories(page: ft.Page, user_data=None):
 
     def update_category_list():
         category_list_view.controls.clear()
-        filtered_reports = all_reports
-        if current_status_filter["status"] != "All":
-            target = (current_status_filter["status"] or "").strip().lower()
-            filtered_reports = [r for r in all_reports if (r.get("status") or "").strip().lower() == target]
-
-        category_counts = DataManager.calculate_category_counts(filtered_reports)
-        if not category_counts:
+        status = current_status_filter["status"]
+        sorted_categories = DataManager.fetch_category_counts(status=None if status == "All" else status)
+        if not sorted_categories:
             category_list_view.controls.append(ui_components.create_empty_category_message(is_dark=is_dark))
         else:
-            sorted_categories = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
             for category_name, count in sorted_categories:
                 item = ui_components.create_category_list_item(
                     category_name, count,
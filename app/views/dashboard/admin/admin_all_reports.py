@@ -2,7 +2,7 @@ import flet as ft
 from app.services.database.database import db
 from app.views.dashboard.session_manager import SessionManager
 from app.views.dashboard.navigation_drawer import NavigationDrawerComponent
-from .dashboard_data_manager import DataManager, StatusNormalizer
+from .dashboard_data_manager import DataManager
 from .admin_dashboard_ui import UIComponents
 from .admin_sidebar import create_admin_sidebar
 
@@ -54,17 +54,17 @@ def admin_all_reports(page: ft.Page, user_data=None):
 
     data_manager = DataManager()
     ui_components = UIComponents()
-    all_reports = db.get_all_reports() or []
+    status_counts = db.get_status_counts()
 
     status_filter_buttons = ft.Row(spacing=6, scroll=ft.ScrollMode.AUTO, tight=True)
     category_list_view = ft.Column(spacing=8, scroll=ft.ScrollMode.AUTO, expand=True)
 
     def update_status_filters():
         status_filter_buttons.controls.clear()
-        counts = DataManager.calculate_status_counts(all_reports)
+        counts = status_counts
 
         status_mapping = {
-            "All": len(all_reports),
+            "All": sum(counts.values()),
             "Pending": counts.get("pending", 0),
             "In Progress": counts.get("in progress", 0),
             "Resolved": counts.get("resolved", 0),
@@ -89,17 +89,12 @@ def admin_all_reports(page: ft.Page, user_data=None):
 
     def update_category_list():
         category_list_view.controls.clear()
-        filtered_reports = all_reports
-        if current_filters["status"] != "All":
-            target = current_filters["status"].lower()
-            filtered_reports = [r for r in all_reports if (r.get("status") or "").lower() == target]
+        status = current_filters["status"]
+        sorted_categories = DataManager.fetch_category_counts(status=None if status == "All" else status)
 
-        category_counts = DataManager.calculate_category_counts(filtered_reports)
-
-        if not category_counts:
+        if not sorted_categories:
             category_list_view.controls.append(ui_components.create_empty_category_message(is_dark=is_dark))
         else:
-            sorted_categories = sorted(category_counts.items(), key=lambda x: x[1], reverse=True)
             for category_name, count in sorted_categories:
                 item = ui_components.create_category_list_item(
                     category_name, count,
@@ -162,9 +157,30 @@ def admin_all_reports(page: ft.Page, user_data=None):
         border=ft.border.only(bottom=ft.BorderSide(1, _BORDER)),
     )
 
+    # ── Search (opens the report list ranked by relevance) ──
+    def on_search_submit(e):
+        text = (search_field.value or "").strip()
+        if text:
+            from .admin_category_reports import admin_category_reports
+            admin_category_reports(page, user_data, None, None, text)
+
+    search_field = ft.TextField(
+        hint_text="Search all reports…",
+        prefix_icon=ft.Icons.SEARCH_ROUNDED,
+        dense=True,
+        height=40,
+        text_size=12,
+        border_radius=10,
+        border_color=_BORDER,
+        focused_border_color=_ACCENT,
+        on_submit=on_search_submit,
+    )
+
     # ── Main content ──
     main_content = ft.Column(
         [
+            search_field,
+            ft.Container(height=12),
             ft.Container(
                 content=status_filter_buttons,
             ),
@@ -1,8 +1,8 @@
 import flet as ft
-from app.services.database.database import db
+from app.services.database.database import db, SNIPPET_START, SNIPPET_END
 from app.views.dashboard.session_manager import SessionManager
 from app.views.dashboard.navigation_drawer import NavigationDrawerComponent
-from .dashboard_data_manager import DataManager, StatusNormalizer
+from .dashboard_data_manager import DataManager
 from .admin_dashboard_ui import UIComponents
 from .admin_sidebar import create_admin_sidebar
 
@@ -15,9 +15,25 @@ _BORDER = "#E0E6ED"
 _BORDER_LIGHT = "#F1F5F9"
 _WHITE = "#FFFFFF"
 
+_PAGE_SIZE = 20
+_SCROLL_THRESHOLD = 300  # px from the bottom at which the next page loads
 
-def admin_category_reports(page: ft.Page, user_data=None, category=None, status=None):
-    """Detailed reports page for a specific category, optionally filtered by status."""
+
+def _snippet_text(snippet, color, highlight_bg):
+    """Render a search snippet with the matched terms highlighted."""
+    spans = []
+    for i, part in enumerate(snippet.replace(SNIPPET_END, SNIPPET_START).split(SNIPPET_START)):
+        if not part:
+            continue
+        if i % 2:
+            spans.append(ft.TextSpan(part, ft.TextStyle(weight=ft.FontWeight.BOLD, bgcolor=highlight_bg)))
+        else:
+            spans.append(ft.TextSpan(part))
+    return ft.Text(spans=spans, size=11, font_family="Poppins-Light", color=color)
+
+
+def admin_category_reports(page: ft.Page, user_data=None, category=None, status=None, query=None):
+    """Detailed reports page for a specific category, optionally filtered by status or a search query."""
     page.controls.clear()
     page.overlay.clear()
     page.floating_action_button = None
@@ -42,44 +58,40 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
 
     def toggle_dark_theme(e):
         SessionManager.set_theme_preference(page, not is_dark)
-        admin_category_reports(page, user_data, category, status)
+        admin_category_reports(page, user_data, category, status, query)
 
     nav_drawer = NavigationDrawerComponent(page, user_data, toggle_dark_theme)
     drawer = nav_drawer.create_drawer(is_dark)
     ui_components = UIComponents()
 
     # ── Data ──
-    all_reports = db.get_all_reports() or []
+    # Reports are fetched a page at a time as the list is scrolled; a search
+    # query switches the source from newest-first to relevance-ranked.
+    report_filters = {"category": category, "status": status}
+    paging = {"cursor": None, "done": False, "loading": False, "loaded": 0}
 
-    if category:
-        filtered_reports = [r for r in all_reports if r.get("category", "Uncategorized") == category]
-    else:
-        filtered_reports = all_reports
-
-    if status:
-        sf = (status or "").strip().lower()
-        filtered_reports = [r for r in filtered_reports if (r.get("status") or "").strip().lower() == sf]
+    reports_list = ft.Column(spacing=8)
 
-    reports_list = ft.Column(spacing=8, scroll=ft.ScrollMode.AUTO, expand=True)
+    # Multi-select: ids of checked reports and the checkbox shown on each loaded card
+    selected_ids = set()
+    row_checkboxes = {}
     status_filter_buttons = ft.Row(spacing=6, scroll=ft.ScrollMode.AUTO, tight=True)
 
     def update_status_filters():
         status_filter_buttons.controls.clear()
-        category_reports = (
-            [r for r in all_reports if r.get("category", "Uncategorized") == category]
-            if category
-            else all_reports
-        )
-        status_counts = {"Pending": 0, "In Progress": 0, "Resolved": 0, "Rejected": 0}
-        for report in category_reports:
-            canon = StatusNormalizer.canonicalize(report.get("status", "Pending"))
-            status_counts[canon] = status_counts.get(canon, 0) + 1
+        counts = DataManager.fetch_status_counts(category=category)
+        status_counts = {
+            "Pending": counts.get("pending", 0),
+            "In Progress": counts.get("in progress", 0),
+            "Resolved": counts.get("resolved", 0),
+            "Rejected": counts.get("rejected", 0),
+        }
 
         # "All" button
         all_active = status is None
         all_btn = ft.Container(
-            content=ui_components.create_tab_button("All", len(category_reports), all_active, is_dark=is_dark),
-            on_click=lambda e: admin_category_reports(page, user_data, category, None),
+            content=ui_components.create_tab_button("All", sum(counts.values()), all_active, is_dark=is_dark),
+            on_click=lambda e: admin_category_reports(page, user_data, category, None, query),
         )
         status_filter_buttons.controls.append(all_btn)
 
@@ -88,7 +100,7 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
             is_active = status == s_label
             btn = ft.Container(
                 content=ui_components.create_tab_button(s_label, count, is_active, is_dark=is_dark),
-                on_click=lambda e, st=s_label: admin_category_reports(page, user_data, category, st),
+                on_click=lambda e, st=s_label: admin_category_reports(page, user_data, category, st, query),
             )
             status_filter_buttons.controls.append(btn)
 
@@ -110,7 +122,7 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
             status="success",
         )
 
-        admin_category_reports(page, user_data, category, status)
+        admin_category_reports(page, user_data, category, status, query)
 
     def handle_report_delete(report_id):
         from app.services.audit.audit_logger import audit_logger
@@ -139,7 +151,7 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
             )
             page.snack_bar.open = True
             page.update()
-            admin_category_reports(page, user_data, category, status)
+            admin_category_reports(page, user_data, category, status, query)
         except Exception as ex:
             page.snack_bar = ft.SnackBar(
                 content=ft.Text(f"Delete failed: {str(ex)}"),
@@ -148,17 +160,166 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
             page.snack_bar.open = True
             page.update()
 
-    if not filtered_reports:
-        reports_list.controls.append(ui_components.create_empty_category_message(category, is_dark=is_dark))
-    else:
-        for report in filtered_reports:
+    def handle_bulk_status_change(new_status, remarks=""):
+        if not (user_data or {}).get("email"):
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text("Bulk update failed: your session has no admin email. Please sign in again."),
+                bgcolor=ft.Colors.RED_600,
+            )
+            page.snack_bar.open = True
+            page.update()
+            return
+
+        changes = [(report_id, new_status, remarks) for report_id in sorted(selected_ids)]
+        try:
+            updated = DataManager.update_statuses_bulk(changes, user_data)
+        except Exception as ex:
+            page.snack_bar = ft.SnackBar(
+                content=ft.Text(f"Bulk update failed: {str(ex)}"),
+                bgcolor=ft.Colors.RED_600,
+            )
+            page.snack_bar.open = True
+            page.update()
+            return
+
+        page.snack_bar = ft.SnackBar(
+            content=ft.Text(f"Updated {len(updated)} report{'s' if len(updated) != 1 else ''} to {new_status}."),
+            bgcolor=ft.Colors.GREEN_600,
+        )
+        page.snack_bar.open = True
+        admin_category_reports(page, user_data, category, status, query)
+
+    selection_label = ft.Text("", size=12, font_family="Poppins-Medium", color=_NAVY)
+    select_all_box = ft.Checkbox(tooltip="Select all loaded reports")
+    bulk_update_button = ft.ElevatedButton(
+        content=ft.Text("Update selected", size=12, font_family="Poppins-SemiBold", color="#FFFFFF"),
+        bgcolor=_ACCENT,
+        on_click=lambda e: UIComponents.open_bulk_status_dialog(page, len(selected_ids), handle_bulk_status_change),
+    )
+
+    def refresh_selection_bar():
+        count = len(selected_ids)
+        selection_label.value = f"{count} selected" if count else "Select reports to update in bulk"
+        select_all_box.value = bool(row_checkboxes) and count == len(row_checkboxes)
+        bulk_update_button.disabled = count == 0
+
+    def on_select(report_id, checked):
+        if checked:
+            selected_ids.add(report_id)
+        else:
+            selected_ids.discard(report_id)
+        refresh_selection_bar()
+        page.update()
+
+    def set_all_selected(checked):
+        for report_id, box in row_checkboxes.items():
+            box.value = checked
+            if checked:
+                selected_ids.add(report_id)
+            else:
+                selected_ids.discard(report_id)
+        refresh_selection_bar()
+        page.update()
+
+    def on_select_all(e):
+        set_all_selected(bool(e.control.value))
+
+    def clear_selection(e):
+        set_all_selected(False)
+
+    select_all_box.on_change = on_select_all
+    refresh_selection_bar()
+
+    selection_bar = ft.Container(
+        content=ft.Row(
+            [
+                select_all_box,
+                ft.Container(content=selection_label, expand=True),
+                ft.TextButton(
+                    content=ft.Text("Clear", size=12, font_family="Poppins-Medium", color=_NAVY_MUTED),
+                    on_click=clear_selection,
+                ),
+                bulk_update_button,
+            ],
+            spacing=6,
+            vertical_alignment=ft.CrossAxisAlignment.CENTER,
+        ),
+        padding=ft.padding.symmetric(horizontal=8, vertical=4),
+        bgcolor=_WHITE,
+        border_radius=10,
+        border=ft.border.all(1, _BORDER),
+    )
+
+    load_more_button = ft.TextButton(
+        content=ft.Text("Load more", size=12, font_family="Poppins-Medium", color=_ACCENT),
+        visible=False,
+    )
+
+    def load_next_page(e=None):
+        if paging["done"] or paging["loading"]:
+            return
+        paging["loading"] = True
+        try:
+            if query:
+                result = DataManager.search_reports(
+                    query, cursor=paging["cursor"], limit=_PAGE_SIZE, filters=report_filters,
+                )
+            else:
+                result = DataManager.fetch_reports_page(
+                    cursor=paging["cursor"], limit=_PAGE_SIZE, filters=report_filters,
+                )
+        finally:
+            paging["loading"] = False
+
+        for report in result["reports"]:
             report_card = ui_components.create_report_card(
                 report,
                 handle_status_change,
                 page=page,
                 on_delete=handle_report_delete,
             )
-            reports_list.controls.append(report_card)
+            if report.get("snippet"):
+                report_card = ft.Column(
+                    [_snippet_text(report["snippet"], _NAVY_MUTED, _BORDER_LIGHT), report_card],
+                    spacing=4,
+                )
+            checkbox = ft.Checkbox(
+                value=report["id"] in selected_ids,
+                on_change=lambda ev, rid=report["id"]: on_select(rid, ev.control.value),
+            )
+            row_checkboxes[report["id"]] = checkbox
+            reports_list.controls.append(
+                ft.Row(
+                    [checkbox, ft.Container(content=report_card, expand=True)],
+                    spacing=4,
+                    vertical_alignment=ft.CrossAxisAlignment.START,
+                )
+            )
+
+        paging["loaded"] += len(result["reports"])
+        paging["cursor"] = result["next_cursor"]
+        paging["done"] = result["next_cursor"] is None
+        load_more_button.visible = not paging["done"]
+        refresh_selection_bar()
+
+        if paging["loaded"] == 0:
+            if query:
+                reports_list.controls.append(
+                    ft.Text(f'No reports match "{query}".', size=12, font_family="Poppins-Light", color=_NAVY_MUTED)
+                )
+            else:
+                reports_list.controls.append(ui_components.create_empty_category_message(category, is_dark=is_dark))
+
+        if e is not None:
+            page.update()
+
+    def on_list_scroll(e: ft.OnScrollEvent):
+        # Fetch the next page once the user nears the bottom of the list.
+        if e.max_scroll_extent and e.pixels >= e.max_scroll_extent - _SCROLL_THRESHOLD:
+            load_next_page(e)
+
+    load_more_button.on_click = load_next_page
+    load_next_page()
 
     if category:
         update_status_filters()
@@ -182,6 +343,25 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
 
     title = category or "Reports"
     subtitle = f"Filtered: {status}" if status else "All statuses"
+    if query:
+        subtitle += f' · Search: "{query}"'
+
+    def on_search_submit(e):
+        text = (search_field.value or "").strip()
+        admin_category_reports(page, user_data, category, status, text or None)
+
+    search_field = ft.TextField(
+        value=query or "",
+        hint_text="Search descriptions, locations, remarks…",
+        prefix_icon=ft.Icons.SEARCH_ROUNDED,
+        dense=True,
+        height=40,
+        text_size=12,
+        border_radius=10,
+        border_color=_BORDER,
+        focused_border_color=_ACCENT,
+        on_submit=on_search_submit,
+    )
 
     top_bar = ft.Container(
         content=ft.Row(
@@ -213,16 +393,18 @@ def admin_category_reports(page: ft.Page, user_data=None, category=None, status=
     )
 
     # ── Main content ──
-    content_items = []
+    content_items = [search_field, ft.Container(height=10)]
     if category:
         content_items.extend([status_filter_buttons, ft.Container(height=12)])
-    content_items.append(reports_list)
+    content_items.extend([selection_bar, ft.Container(height=10), reports_list, load_more_button])
 
     main_content = ft.Column(
         content_items,
         spacing=0,
         expand=True,
         scroll=ft.ScrollMode.AUTO,
+        on_scroll=on_list_scroll,
+        on_scroll_interval=100,
     )
 
     content_area = ft.Container(
@@ -341,15 +341,15 @@ def admin_dashboard(page: ft.Page, user_data=None):
     content_pad_h = 12 if is_mobile else 24
 
     # ── Analytics data ──
-    reports_per_day = db.get_reports_per_day(days=7)
-    reports_per_category = db.get_reports_per_category()
-    reports_per_location = db.get_reports_per_location()
-    resolution_rate = db.get_resolution_rate()
-    total_users = db.get_total_users_count()
-    top_reporters = db.get_top_reporters(limit=5)
-    all_reports_for_stats = db.get_all_reports() or []
-    status_counts = DataManager.calculate_status_counts(all_reports_for_stats)
-    total_reports = len(all_reports_for_stats)
+    snapshot = db.get_dashboard_snapshot(days=7, top_reporters=5)
+    reports_per_day = snapshot.reports_per_day
+    reports_per_category = snapshot.reports_per_category
+    reports_per_location = snapshot.reports_per_location
+    resolution_rate = snapshot.resolution_rate
+    total_users = snapshot.total_users
+    top_reporters = snapshot.top_reporters
+    status_counts = snapshot.status_counts
+    total_reports = snapshot.total_reports
 
     # ── Analytics widgets ──
     daily_trend = AnalyticsUI.daily_trend_chart(reports_per_day, days=7, is_dark=is_dark)
@@ -420,6 +420,7 @@ def admin_dashboard(page: ft.Page, user_data=None):
 
     main_content = ft.Column(
         [
+            state.loading_bar,
             # Stats grid
             ft.ResponsiveRow(state.stats_row.controls, spacing=10, run_spacing=10),
             ft.Container(height=12),
@@ -510,6 +511,6 @@ def admin_dashboard(page: ft.Page, user_data=None):
     )
 
     page.add(layout)
-    controller.refresh_dashboard()
     page.update()
+    page.run_task(controller.refresh_dashboard)
 
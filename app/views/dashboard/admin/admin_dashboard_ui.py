@@ -1,5 +1,7 @@
 
 import flet as ft
+from app.services.database.database import db
+from app.services.media.image_service import report_image_src
 
 # ── Palette (matches app theme) ──
 _BG = "#F5F7FA"
@@ -356,6 +358,87 @@ class UIComponents:
         dialog.open = True
         page.update()
 
+    @staticmethod
+    def open_bulk_status_dialog(page, count, on_confirm):
+        """Open a dialog that sets one status (and optional remark) on ``count`` selected reports.
+
+        Args:
+            page: ft.Page
+            count: number of selected reports
+            on_confirm: callback(new_status, remarks)
+        """
+        from app.theme import DARK, LIGHT
+        _c = DARK if (page.session.get("is_dark_theme") or False) else LIGHT
+        _NAVY = _c["NAVY"]; _NAVY_MUTED = _c["NAVY_MUTED"]
+        _ACCENT = _c["ACCENT"]; _CARD = _c["CARD"]; _BORDER = _c["BORDER"]
+        _REJECTED_TEXT = _c["REJECTED_TEXT"]
+
+        status_group = ft.RadioGroup(
+            content=ft.Column(
+                [
+                    ft.Radio(value=s, label=s, label_style=ft.TextStyle(size=13, color=_NAVY))
+                    for s in ["Pending", "In Progress", "Resolved", "Rejected"]
+                ],
+                spacing=2,
+            ),
+        )
+        remarks_field = ft.TextField(
+            label="Admin Remarks / Notes",
+            multiline=True, min_lines=2, max_lines=4,
+            border_color=_BORDER, focused_border_color=_ACCENT,
+            border_radius=10, text_size=13, bgcolor=_CARD, color=_NAVY,
+            hint_text="Optional note added to every selected report…",
+            hint_style=ft.TextStyle(size=12, color=_NAVY_MUTED),
+        )
+        error_text = ft.Text("Select a status.", size=11, color=_REJECTED_TEXT, visible=False)
+
+        def on_submit(e):
+            if not status_group.value:
+                error_text.visible = True
+                page.update()
+                return
+            dialog.open = False
+            page.update()
+            on_confirm(status_group.value, (remarks_field.value or "").strip())
+
+        def on_cancel(e):
+            dialog.open = False
+            page.update()
+
+        dialog = ft.AlertDialog(
+            modal=True,
+            title=ft.Text(f"Update {count} Report{'s' if count != 1 else ''}", size=16,
+                          font_family="Poppins-Bold", color=_NAVY),
+            content=ft.Container(
+                content=ft.Column(
+                    [status_group, ft.Container(height=10), remarks_field, error_text],
+                    spacing=0,
+                    tight=True,
+                ),
+                width=360,
+            ),
+            actions=[
+                ft.TextButton(
+                    content=ft.Text("Cancel", size=13, font_family="Poppins-Medium",
+                                    color=_NAVY_MUTED),
+                    on_click=on_cancel,
+                ),
+                ft.ElevatedButton(
+                    content=ft.Text("Apply", size=13, font_family="Poppins-SemiBold", color="#FFFFFF"),
+                    bgcolor=_ACCENT,
+                    on_click=on_submit,
+                    style=ft.ButtonStyle(shape=ft.RoundedRectangleBorder(radius=10)),
+                ),
+            ],
+            actions_alignment=ft.MainAxisAlignment.END,
+            shape=ft.RoundedRectangleBorder(radius=16),
+            bgcolor=_CARD,
+        )
+
+        page.overlay.append(dialog)
+        dialog.open = True
+        page.update()
+
     # ── Delete confirmation dialog ──
     @staticmethod
     def open_delete_dialog(page, report, on_confirm):
@@ -471,7 +554,8 @@ class UIComponents:
         remarks = report.get("admin_remarks")
         updated_at = report.get("status_updated_at")
         updated_by = report.get("status_updated_by")
-        report_image = report.get("report_image")
+        image_key = report.get("image_key")
+        report_image = report_image_src(db, image_key) if image_key else report.get("report_image")
 
         # ── Remarks display ──
         remarks_section = ft.Container()
@@ -604,7 +688,7 @@ class UIComponents:
                     src_base64=report_image.split(",", 1)[1],
                     fit=ft.ImageFit.COVER,
                 )
-            elif isinstance(report_image, str) and report_image.startswith(("http://", "https://")):
+            elif isinstance(report_image, str) and report_image.startswith(("http://", "https://", "/media/")):
                 image_control = ft.Image(
                     src=report_image,
                     fit=ft.ImageFit.COVER,
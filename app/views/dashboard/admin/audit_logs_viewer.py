@@ -1,8 +1,14 @@
 """Audit Log Viewer – admin compliance and debugging."""
 
+import os
 import flet as ft
 from datetime import datetime
 from app.services.audit.audit_logger import audit_logger
+from app.services.audit.audit_export import (
+    ExportConfig, export_audit_logs, export_download_url, export_downloads_enabled,
+    export_filename, issue_export_token,
+)
+from app.services.database.async_services import ServicesBusyError, get_async_services
 from .admin_sidebar import create_admin_sidebar
 
 # ── Fallback palette (shadowed by theme-resolved locals at runtime) ──
@@ -179,36 +185,47 @@ def audit_logs_page(page: ft.Page, user_data=None):
 
     # ── Logs list & pagination state ────────────────────────────────
     logs_list       = ft.Column(spacing=8)
+    loading_bar     = ft.ProgressBar(color=_ACCENT, bgcolor=_BORDER_LIGHT, visible=False)
     pagination_info = ft.Text("", size=12, color=_NAVY_MUTED)
     current_page    = {"page": 0}
     page_size       = 50
+    # Keyset cursor per visited page: (timestamp, id) of the previous page's last entry
+    page_cursors    = [None]
 
     prev_btn = ft.TextButton(
         "← Previous",
         style=ft.ButtonStyle(color=_ACCENT),
-        on_click=lambda e: _go_prev(e),
+        on_click=lambda e: page.run_task(_go_prev, e),
         disabled=True,
     )
     next_btn = ft.TextButton(
         "Next →",
         style=ft.ButtonStyle(color=_ACCENT),
-        on_click=lambda e: _go_next(e),
+        on_click=lambda e: page.run_task(_go_next, e),
         disabled=True,
     )
 
-    def load_logs():
+    def read_filters():
+        """Active filters as get_audit_logs kwargs; raises ValueError on a bad date."""
+        start_date = start_date_field.value.strip() or None
+        end_date   = end_date_field.value.strip() or None
+        # Whole days, in the stored "YYYY-MM-DD HH:MM:SS" form
+        if start_date:
+            start_date = datetime.strptime(start_date, "%Y-%m-%d").strftime("%Y-%m-%d 00:00:00")
+        if end_date:
+            end_date = datetime.strptime(end_date, "%Y-%m-%d").strftime("%Y-%m-%d 23:59:59")
+        return {
+            "actor_email": filter_actor_email.value.strip() or None,
+            "action_type": filter_action.value or None,
+            "start_date":  start_date,
+            "end_date":    end_date,
+        }
+
+    async def load_logs():
         logs_list.controls.clear()
 
-        actor_email = filter_actor_email.value.strip() or None
-        action_type = filter_action.value or None
-        start_date  = start_date_field.value.strip() or None
-        end_date    = end_date_field.value.strip() or None
-
         try:
-            if start_date:
-                start_date = datetime.strptime(start_date, "%Y-%m-%d").isoformat()
-            if end_date:
-                end_date = datetime.strptime(end_date, "%Y-%m-%d").isoformat()
+            filters = read_filters()
         except ValueError:
             logs_list.controls.append(
                 ft.Container(
@@ -227,22 +244,36 @@ def audit_logs_page(page: ft.Page, user_data=None):
             page.update()
             return
 
-        offset      = current_page["page"] * page_size
-        logs        = audit_logger.get_audit_logs(
-            actor_email=actor_email, action_type=action_type,
-            start_date=start_date,   end_date=end_date,
-            limit=page_size,         offset=offset,
-        )
-        total_count = audit_logger.get_audit_logs_count(
-            actor_email=actor_email, action_type=action_type,
-            start_date=start_date,   end_date=end_date,
-        )
+        services    = get_async_services()
+        loading_bar.visible = True
+        page.update()
+        try:
+            # One extra row tells us whether a next page exists.
+            logs        = await services.audit.get_audit_logs(
+                **filters, limit=page_size + 1, before=page_cursors[current_page["page"]],
+            )
+            total       = await services.audit.get_audit_logs_total(**filters)
+        except ServicesBusyError as ex:
+            page.snack_bar = ft.SnackBar(ft.Text(str(ex)), bgcolor=_t["RED"])
+            page.snack_bar.open = True
+            return
+        finally:
+            loading_bar.visible = False
+            page.update()
 
+        has_next               = len(logs) > page_size
+        logs                   = logs[:page_size]
+        del page_cursors[current_page["page"] + 1:]
+        if has_next:
+            page_cursors.append((logs[-1]["timestamp"], logs[-1]["id"]))
+
+        total_count            = total["count"]
         total_pages            = max(1, (total_count + page_size - 1) // page_size)
         prev_btn.disabled      = current_page["page"] == 0
-        next_btn.disabled      = current_page["page"] >= total_pages - 1
+        next_btn.disabled      = not has_next
         pagination_info.value  = (
-            f"Page {current_page['page'] + 1} of {total_pages}  ·  {total_count:,} logs"
+            f"Page {current_page['page'] + 1} of {'~' if total['estimated'] else ''}{total_pages:,}"
+            f"  ·  {'about ' if total['estimated'] else ''}{total_count:,} logs"
         )
 
         if not logs:
@@ -361,54 +392,66 @@ def audit_logs_page(page: ft.Page, user_data=None):
 
         page.update()
 
-    def on_filter_click(e):
+    def reset_paging():
         current_page["page"] = 0
-        load_logs()
+        del page_cursors[1:]
+
+    async def on_filter_click(e):
+        reset_paging()
+        await load_logs()
 
-    def on_clear_click(e):
+    async def on_clear_click(e):
         filter_actor_email.value = ""
         filter_action.value      = None
         filter_status.value      = None
         start_date_field.value   = ""
         end_date_field.value     = ""
-        current_page["page"]     = 0
-        load_logs()
+        reset_paging()
+        await load_logs()
 
-    def _go_prev(e):
+    async def _go_prev(e):
         if current_page["page"] > 0:
             current_page["page"] -= 1
-            load_logs()
+            await load_logs()
 
-    def _go_next(e):
-        current_page["page"] += 1
-        load_logs()
+    async def _go_next(e):
+        if current_page["page"] + 1 < len(page_cursors):
+            current_page["page"] += 1
+            await load_logs()
 
-    def on_export_csv(e):
-        import csv
+    async def on_export_csv(e):
+        try:
+            filters = read_filters()
+        except ValueError:
+            page.snack_bar = ft.SnackBar(ft.Text("Invalid date. Use YYYY-MM-DD."),
+                                         bgcolor=_t["RED"])
+            page.snack_bar.open = True
+            page.update()
+            return
 
-        actor_email = filter_actor_email.value.strip() or None
-        action_type = filter_action.value or None
-        logs        = audit_logger.get_audit_logs(
-            actor_email=actor_email, action_type=action_type, limit=10_000,
-        )
-        timestamp   = datetime.now().strftime("%Y%m%d_%H%M%S")
-        filename    = f"audit_logs_{timestamp}.csv"
+        if export_downloads_enabled():
+            # The download streams every matching row; the token carries the filters.
+            try:
+                token = await get_async_services().call(issue_export_token, filters, audit_logger.db_path)
+            except Exception as ex:
+                page.snack_bar = ft.SnackBar(ft.Text(f"Export failed: {ex}"), bgcolor=_t["RED"])
+                page.snack_bar.open = True
+                page.update()
+                return
+            page.launch_url(export_download_url(token))
+            return
 
+        path = os.path.join(ExportConfig.EXPORT_DIR, export_filename())
+        loading_bar.visible = True
+        page.update()
         try:
-            with open(filename, "w", newline="") as f:
-                writer = csv.DictWriter(
-                    f,
-                    fieldnames=[
-                        "id", "actor_email", "actor_name", "action_type",
-                        "resource_type", "resource_id", "details", "timestamp", "status",
-                    ],
-                )
-                writer.writeheader()
-                writer.writerows(logs)
-            page.snack_bar = ft.SnackBar(ft.Text(f"Exported: {filename}"))
+            count = await get_async_services().call(export_audit_logs, audit_logger, path, filters)
+            page.snack_bar = ft.SnackBar(ft.Text(f"Exported {count:,} logs: {path}"))
         except Exception as ex:
             page.snack_bar = ft.SnackBar(ft.Text(f"Export failed: {ex}"),
                                          bgcolor=_t["RED"])
+        finally:
+            loading_bar.visible = False
 
         page.snack_bar.open = True
         page.update()
@@ -487,6 +530,7 @@ def audit_logs_page(page: ft.Page, user_data=None):
                 vertical_alignment=ft.CrossAxisAlignment.CENTER,
             ),
             ft.Container(height=6),
+            loading_bar,
             logs_list,
             ft.Container(height=8),
             ft.Row(
@@ -539,4 +583,4 @@ def audit_logs_page(page: ft.Page, user_data=None):
         vertical_alignment=ft.CrossAxisAlignment.START,
     ))
 
-    load_logs()
+    page.run_task(load_logs)
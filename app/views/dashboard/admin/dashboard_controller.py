@@ -1,4 +1,5 @@
 import flet as ft
+from app.services.database.async_services import ServicesBusyError, get_async_services
 
 
 class DashboardState:
@@ -7,6 +8,7 @@ class DashboardState:
         self.stats_row = ft.Row(spacing=12, wrap=False, expand=True)
         self.category_filter_buttons = ft.Row(spacing=10, scroll=ft.ScrollMode.AUTO, expand=True)
         self.category_list_view = ft.Column(spacing=6, scroll=ft.ScrollMode.AUTO, expand=True)
+        self.loading_bar = ft.ProgressBar(visible=False)
 
 
 class DashboardController:
@@ -25,14 +27,14 @@ class DashboardController:
     def handle_category_filter_click(self, status_filter):
         
         self.state.category_status_filter = status_filter
-        self.refresh_dashboard()
+        self.page.run_task(self.refresh_dashboard)
     
     def handle_category_click(self, category_name, status_filter="All"):
         
         from .admin_category_reports import admin_category_reports
         admin_category_reports(self.page, self.user_data, category=category_name, status=status_filter)
     
-    def update_stats_and_tabs(self, reports, counts):
+    def update_stats_and_tabs(self, counts):
         is_dark = self.page.session.get("is_dark_theme") or False
         self.state.stats_row.controls.clear()
         self.state.stats_row.controls.extend([
@@ -46,13 +48,13 @@ class DashboardController:
                                                  ft.Icons.CANCEL_OUTLINED, "#DC2626", "#FEE2E2", is_dark=is_dark),
         ])
     
-    def update_category_filter_buttons(self, reports, counts):
+    def update_category_filter_buttons(self, total, counts):
         self.state.category_filter_buttons.controls.clear()
         is_dark = self.page.session.get("is_dark_theme") or False
         
         all_button = ft.TextButton(
             content=self.ui_components.create_tab_button(
-                "All", len(reports), self.state.category_status_filter == "All",
+                "All", total, self.state.category_status_filter == "All",
                 is_dark=is_dark,
             ),
             on_click=lambda e: self.handle_category_filter_click("All")
@@ -78,22 +80,11 @@ class DashboardController:
             )
             self.state.category_filter_buttons.controls.append(btn)
     
-    def update_category_cards(self, reports):
+    def update_category_cards(self, top_categories):
         
         self.state.category_list_view.controls.clear()
         
         
-        filtered_reports = reports
-        if self.state.category_status_filter != "All":
-            target = (self.state.category_status_filter or "").strip().lower()
-            filtered_reports = [
-                r for r in reports
-                if (r.get('status') or "").strip().lower() == target
-            ]
-        
-        
-        top_categories = self.data_manager.get_top_categories(filtered_reports, limit=5)
-        
         for category_name, count in top_categories:
             item = self.ui_components.create_category_list_item(
                 category_name, 
@@ -104,17 +95,33 @@ class DashboardController:
             )
             self.state.category_list_view.controls.append(item)
     
-    def refresh_dashboard(self):
-        
-        all_reports = self.data_manager.fetch_all_reports()
-        counts = self.data_manager.calculate_status_counts(all_reports)
-        
-        
-        self.update_stats_and_tabs(all_reports, counts)
-        
-        
-        self.update_category_filter_buttons(all_reports, counts)
-        
-        self.update_category_cards(all_reports)
-        
-        self.page.update()
\ No newline at end of file
+    async def refresh_dashboard(self):
+        # Queries run on the service executor so the session's UI stays responsive.
+        services = get_async_services()
+        status_filter = self.state.category_status_filter
+        self.state.loading_bar.visible = True
+        self.page.update()
+        try:
+            counts = await services.call(self.data_manager.fetch_status_counts)
+            top_categories = (await services.call(
+                self.data_manager.fetch_category_counts,
+                status=None if status_filter == "All" else status_filter,
+            ))[:5]
+        except ServicesBusyError as ex:
+            self.page.snack_bar = ft.SnackBar(ft.Text(str(ex)))
+            self.page.snack_bar.open = True
+            return
+        finally:
+            self.state.loading_bar.visible = False
+            self.page.update()
+        total = sum(counts.values())
+        
+        
+        self.update_stats_and_tabs(counts)
+        
+        
+        self.update_category_filter_buttons(total, counts)
+        
+        self.update_category_cards(top_categories)
+        
+        self.page.update()
@@ -1,65 +1,48 @@
 from app.services.database.database import db
+from app.services.database.report_status import STATUS_KEYS, status_key
 
 
-class StatusNormalizer:
+class DataManager:
     @staticmethod
-    def normalize(status_string):
-        return (status_string or "").strip().lower().replace("-", " ").replace("_", " ")
-    
+    def fetch_all_reports():
+        return db.get_all_reports() or []
+
     @staticmethod
-    def canonicalize(status_string):
-        """Convert any status string to canonical Title Case format"""
-        normalized = StatusNormalizer.normalize(status_string)
-        if "pending" in normalized:
-            return "Pending"
-        elif "in progress" in normalized or "on going" in normalized or "ongoing" in normalized:
-            return "In Progress"
-        elif "fixed" in normalized or "resolved" in normalized:
-            return "Resolved"
-        elif "reject" in normalized or "rejected" in normalized:
-            return "Rejected"
-        return "Pending"
-    
+    def fetch_reports_page(cursor=None, limit=20, filters=None):
+        return db.get_reports_page(cursor=cursor, limit=limit, filters=filters)
+
     @staticmethod
-    def match_status(status_a, status_b):
-        """Case-insensitive status comparison"""
-        return StatusNormalizer.normalize(status_a) == StatusNormalizer.normalize(status_b.lower())
+    def search_reports(query, cursor=None, limit=20, filters=None):
+        return db.search_reports(query, filters=filters, limit=limit, cursor=cursor)
 
+    @staticmethod
+    def fetch_status_counts(category=None):
+        return db.get_status_counts(category=category)
 
-class DataManager:
     @staticmethod
-    def fetch_all_reports():
-        return db.get_all_reports() or []
+    def fetch_category_counts(status=None):
+        """Category counts from SQL, largest first, as (category, count) pairs."""
+        return [(row['category'], row['count']) for row in db.get_reports_per_category(status=status)]
     
     @staticmethod
     def update_report_status(report_id, new_status):
         db.update_report_status(report_id, new_status)
     
+    @staticmethod
+    def update_statuses_bulk(changes, actor):
+        return db.update_statuses_bulk(changes, actor)
+    
     @staticmethod
     def calculate_status_counts(reports):
-        counts = {
-            "pending": 0,
-            "in progress": 0,
-            "resolved": 0,
-            "rejected": 0
-        }
+        counts = dict.fromkeys(STATUS_KEYS, 0)
         for report in reports:
-            normalized = StatusNormalizer.normalize(report.get('status'))
-            if "pending" in normalized:
-                counts["pending"] += 1
-                
-            elif "in progress" in normalized or "on going" in normalized or "ongoing" in normalized:
-                counts["in progress"] += 1
-            elif "fixed" in normalized or "resolved" in normalized:
-                counts["resolved"] += 1
-            elif "reject" in normalized or "rejected" in normalized:
-                counts["rejected"] += 1
+            counts[status_key(report.get('status'))] += 1
         return counts
     
     @staticmethod
     def filter_reports_by_status(reports, status_filter):
-        target = StatusNormalizer.normalize(status_filter)
-        return [r for r in reports if target in StatusNormalizer.normalize(r.get('status'))]
+        target = status_key(status_filter)
+        return [r for r in reports if status_key(r.get('status')) == target]
     
     @staticmethod
     def calculate_category_counts(reports):
@@ -1,4 +1,5 @@
 import flet as ft
+from app.services.media.image_service import avatar_url
 
 # === Color Palette ===
 _BG = "#F5F7FA"
@@ -30,6 +31,7 @@ class DashboardUI:
         """Build a circular avatar: user picture if available, else letter fallback."""
         if picture:
             try:
+                picture = avatar_url(picture) or picture
                 if picture.startswith("data:image"):
                     b64 = picture.split(",")[1] if "," in picture else picture
                     return ft.Container(
@@ -43,7 +45,7 @@ class DashboardUI:
                         border_radius=border_radius,
                         clip_behavior=ft.ClipBehavior.ANTI_ALIAS,
                     )
-                elif picture.startswith(("http://", "https://")):
+                elif picture.startswith(("http://", "https://", "/media/")):
                     return ft.Container(
                         content=ft.Image(
                             src=picture,
@@ -1,5 +1,6 @@
 import flet as ft
 from app.services.database.database import db
+from app.services.media.image_service import report_image_src
 
 # === Color Palette (mirrors dashboard_ui) — resolved per-instance ===
 _BG = "#F5F7FA"
@@ -64,7 +65,8 @@ class ReportCard:
         remarks = self.report.get("admin_remarks")
         updated_at = self.report.get("status_updated_at")
         updated_by = self.report.get("status_updated_by")
-        report_image = self.report.get("report_image")
+        image_key = self.report.get("image_key")
+        report_image = report_image_src(db, image_key) if image_key else self.report.get("report_image")
 
         # ── Build the column children ──
         col_children = [
@@ -137,7 +139,7 @@ class ReportCard:
                     src_base64=report_image.split(",", 1)[1],
                     fit=ft.ImageFit.COVER,
                 )
-            elif isinstance(report_image, str) and report_image.startswith(("http://", "https://")):
+            elif isinstance(report_image, str) and report_image.startswith(("http://", "https://", "/media/")):
                 image_control = ft.Image(
                     src=report_image,
                     fit=ft.ImageFit.COVER,
@@ -6,6 +6,7 @@ import os
 import time
 import uuid
 from app.services.database.database import db
+from app.services.database.async_services import ServicesBusyError, get_async_services
 from app.services.ai.ai_services import predict_category
 from .session_manager import SessionManager
 from .navigation_drawer import NavigationDrawerComponent
@@ -462,7 +463,7 @@ def report_issue_page(page: ft.Page, user_data=None):
     )
 
     # ── Submit logic ──
-    def submit_clicked(e):
+    async def submit_clicked(e):
         issue_desc = issue_description_field.value
         location = location_field.value
 
@@ -479,8 +480,13 @@ def report_issue_page(page: ft.Page, user_data=None):
         submit_button.content.controls[1].value = "Submitting\u2026"
         page.update()
 
+        services = get_async_services()
         try:
-            category = predict_category(issue_desc)
+            category = await services.call(predict_category, issue_desc)
+        except ServicesBusyError:
+            _show_snackbar("The server is busy. Please try again in a moment.", ft.Colors.RED_400)
+            _reset_submit_button()
+            return
         except Exception as ex:
             print(f"Error predicting category: {ex}")
             category = "Uncategorized"
@@ -491,7 +497,7 @@ def report_issue_page(page: ft.Page, user_data=None):
                 _reset_submit_button()
                 return
 
-            report_id = db.add_report(
+            report_id, image_key = await services.db.add_report(
                 user_email=user_email,
                 user_name=full_name,
                 user_type=user_type,
@@ -499,10 +505,10 @@ def report_issue_page(page: ft.Page, user_data=None):
                 location=location.strip(),
                 category=category,
                 report_image=selected_report_image.get("data"),
+                with_image_key=True,
             )
 
-            from app.services.audit.audit_logger import audit_logger
-            audit_logger.log_action(
+            await services.audit.log_action(
                 actor_email=user_email,
                 actor_name=full_name,
                 action_type="report_create",
@@ -512,6 +518,15 @@ def report_issue_page(page: ft.Page, user_data=None):
                 status="success",
             )
 
+            # Build the card thumbnails now so the first dashboard load is a cache hit. Not
+            # awaited; if the queue is busy they are generated on first request instead.
+            if image_key:
+                from app.services.media.image_service import pregenerate_report_thumbnails
+                try:
+                    services.executor.submit(pregenerate_report_thumbnails, db, image_key)
+                except ServicesBusyError:
+                    pass
+
             issue_description_field.value = ""
             location_field.value = ""
             _clear_image()
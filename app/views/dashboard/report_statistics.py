@@ -1,6 +1,13 @@
+from app.services.database.report_status import ReportStatus, parse_status
+
+
 class ReportStatistics:
     def __init__(self, reports):
         self.reports = reports if reports else []
+        # One pass buckets every report by its ReportStatus code
+        self._by_status = {status: [] for status in ReportStatus}
+        for report in self.reports:
+            self._by_status[parse_status(report.get('status'))].append(report)
     
     def get_total_issues(self):
         
@@ -8,23 +15,23 @@ class ReportStatistics:
     
     def get_resolved_issues(self):
         
-        return len([r for r in self.reports if self._normalize_status(r.get('status')) == 'Resolved'])
+        return len(self._by_status[ReportStatus.RESOLVED])
     
     def get_pending_reports(self):
         
-        return [r for r in self.reports if self._normalize_status(r.get('status')) == 'Pending']
+        return self._by_status[ReportStatus.PENDING]
     
     def get_ongoing_reports(self):
         
-        return [r for r in self.reports if self._normalize_status(r.get('status')) == 'In Progress']
+        return self._by_status[ReportStatus.IN_PROGRESS]
     
     def get_resolved_reports(self):
         
-        return [r for r in self.reports if self._normalize_status(r.get('status')) == 'Resolved']
+        return self._by_status[ReportStatus.RESOLVED]
     
     def get_rejected_reports(self):
         
-        return [r for r in self.reports if self._normalize_status(r.get('status')) == 'Rejected']
+        return self._by_status[ReportStatus.REJECTED]
     
     def get_filtered_reports(self, filter_type):
         
@@ -37,20 +44,3 @@ class ReportStatistics:
         }
         return filter_map.get(filter_type, lambda: self.reports)()
 
-    def _normalize_status(self, status):
-        if not status:
-            return 'Pending'
-
-        s = str(status).strip().lower()
-
-        if 'pending' in s:
-            return 'Pending'
-        if 'on going' in s or 'ongoing' in s or 'in progress' in s:
-            return 'In Progress'
-        if 'fixed' in s or 'resolved' in s:
-            return 'Resolved'
-        if 'reject' in s or 'rejected' in s:
-            return 'Rejected'
-
-        # Fallback: return title-cased unknown value
-        return str(status).strip().title()
@@ -5,6 +5,7 @@ from app.services.auth.admin_account import validate_admin_credentials
 from app.services.database.database import db
 from app.services.audit.audit_logger import audit_logger
 from app.services.activity.activity_monitor import activity_monitor
+from app.services.activity.login_limiter import login_limiter
 from app.views.dashboard.admin.admin_dashboard import admin_dashboard
 from app.views.dashboard.user_dashboard import user_dashboard
 from app.services.session import get_session_manager
@@ -107,6 +108,7 @@ def loginpage(page: ft.Page):
 
     # ── Login logic ──
     def login_clicked(e):
+        client_ip = getattr(page, "client_ip", None)
         role = role_dropdown.value
         email = email_field.value.strip() if email_field.value else ""
         password = password_field.value if password_field.value else ""
@@ -121,19 +123,32 @@ def loginpage(page: ft.Page):
             show_snackbar("Please enter your password")
             return
 
+        # Turn locked-out callers away before any password hashing (or logging) happens.
+        retry_after = login_limiter.check(email, client_ip)
+        if retry_after:
+            show_snackbar(f"Too many failed attempts. Try again in {(retry_after + 59) // 60} min.")
+            return
+
+        def login_failed(reason):
+            if login_limiter.record_failure(email, client_ip):
+                audit_logger.log_action(email, email, "account_locked", status="failed",
+                                        details=f"Locked after repeated failed logins from {client_ip or 'unknown IP'}")
+            audit_logger.log_action(email, email, "login_attempt", status="failed", details=reason)
+            activity_monitor.log_login_attempt(email, email, success=False, details=reason, ip_address=client_ip)
+
         if role.lower() in ["student", "faculty"]:
             show_snackbar("Account not existed")
-            audit_logger.log_action(email, email, "login_attempt", status="failed", details="Account not existed")
-            activity_monitor.log_login_attempt(email, email, success=False, details="Account not existed")
+            login_failed("Account not existed")
             return
 
         admin_account = validate_admin_credentials(email, password)
         if not admin_account:
             show_snackbar("Invalid admin credentials")
-            audit_logger.log_action(email, email, "login_attempt", status="failed", details="Invalid credentials")
-            activity_monitor.log_login_attempt(email, email, success=False, details="Invalid credentials")
+            login_failed("Invalid credentials")
             return
 
+        login_limiter.record_success(email, client_ip)
+
         user_firstname = admin_account["name"].split()[0]
         existing = db.get_user_by_email(admin_account["email"])
         preserved_name = existing.get("name") if existing and existing.get("name") else admin_account["name"]
@@ -151,7 +166,7 @@ def loginpage(page: ft.Page):
         session_manager.create_session(admin_account["email"], preserved_name, "admin")
 
         audit_logger.log_action(admin_account["email"], preserved_name, "login", status="success", details="Admin login successful")
-        activity_monitor.log_login_attempt(admin_account["email"], preserved_name, success=True, details="Admin login successful")
+        activity_monitor.log_login_attempt(admin_account["email"], preserved_name, success=True, details="Admin login successful", ip_address=client_ip)
         page.controls.clear()
         admin_dashboard(page, user_data)
         page.update()
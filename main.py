@@ -133,6 +133,7 @@ def main(page: ft.Page):
                 user_data["name"],
                 success=True,
                 details="CSPC OAuth login successful",
+                ip_address=getattr(page, "client_ip", None),
             )
 
             # Remove callback query/path from browser URL after successful auth.
@@ -179,5 +180,38 @@ if hasattr(app, "get"):
 
         return RedirectResponse(url=target, status_code=302)
 
+    # Report photos and avatars over HTTP (cacheable) instead of base64 over the websocket.
+    from app.services.media.routes import register_media_routes
+
+    register_media_routes(app)
+
+    # Audit log exports stream to the browser as gzip CSV downloads.
+    from app.services.audit.audit_export import register_audit_export_route
+
+    register_audit_export_route(app)
+
+_retention_worker = None
+
+
+def start_background_workers():
+    """Start process-wide maintenance threads once, when the app starts serving."""
+    global _retention_worker
+    if _retention_worker is None:
+        # Keep the live audit table small: move old entries into monthly archives once a day.
+        from app.services.audit.audit_archive import start_retention_worker
+
+        _retention_worker = start_retention_worker()
+
+
+if hasattr(app, "add_event_handler"):
+    app.add_event_handler("startup", start_background_workers)
+
 if __name__ == "__main__":
+    start_background_workers()
+    # The standalone runner does not serve the exported app's routes.
+    from app.services.media.image_service import enable_media_urls
+    from app.services.audit.audit_export import enable_export_downloads
+
+    enable_media_urls(False)
+    enable_export_downloads(False)
     ft.app(**APP_KWARGS)
\ No newline at end of file
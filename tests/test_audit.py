@@ -421,3 +421,480 @@ class TestAuditLogValidation:
         assert isinstance(logs, list)
         assert len(logs) == 0
 
+
+
+class TestAuditWriteBehind:
+    """Test the write-behind audit queue"""
+    
+    @pytest.fixture
+    def audit_db(self):
+        """Create a temporary audit database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.audit.audit_logger import AuditLogger
+        logger = AuditLogger(db_path=db_path)
+        yield logger
+        
+        logger.close()
+        for path in (db_path, db_path + "-audit-pending.jsonl"):
+            try:
+                os.unlink(path)
+            except:
+                pass
+    
+    def _stored_ids(self, logger):
+        import sqlite3
+        conn = sqlite3.connect(logger.db_path)
+        ids = [row[0] for row in conn.execute('SELECT id FROM audit_logs ORDER BY id')]
+        conn.close()
+        return ids
+    
+    def test_log_action_queues_and_flush_writes(self, audit_db):
+        """Test entries are committed together and keep the ids log_action returned"""
+        with patch('app.services.audit.audit_logger.AuditConfig.FLUSH_INTERVAL', 60):
+            ids = [audit_db.log_action("a@example.com", "A", "login") for _ in range(50)]
+            
+            assert ids == list(range(ids[0], ids[0] + 50))
+            assert audit_db.flush() == 50
+        
+        assert self._stored_ids(audit_db) == ids
+    
+    def test_background_writer_commits(self, audit_db):
+        """Test queued entries are written without an explicit flush"""
+        import time
+        log_id = audit_db.log_action("a@example.com", "A", "login")
+        
+        deadline = time.monotonic() + 5
+        while log_id not in self._stored_ids(audit_db) and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert self._stored_ids(audit_db) == [log_id]
+    
+    def test_reserved_ids_do_not_collide(self, audit_db):
+        """Test direct inserts after a reservation get ids outside the reserved block"""
+        from app.services.audit.audit_logger import write_audit_rows
+        queued_id = audit_db.log_action("a@example.com", "A", "login")
+        
+        with audit_db._pool.connection() as conn:
+            write_audit_rows(conn.cursor(), [("b@example.com", "B", "logout", None, None, None, "success")])
+        audit_db.log_action("a@example.com", "A", "logout")
+        audit_db.flush()
+        
+        ids = self._stored_ids(audit_db)
+        assert len(ids) == len(set(ids)) == 3
+        assert queued_id in ids
+    
+    def test_reservation_survives_outer_rollback(self, audit_db):
+        """Test ids reserved inside a rolled-back pooled transaction are not reused"""
+        from app.services.audit.audit_logger import write_audit_rows
+        with pytest.raises(RuntimeError):
+            with audit_db._pool.connection() as conn:
+                conn.execute('BEGIN')
+                conn.execute('SELECT COUNT(*) FROM audit_logs').fetchone()
+                queued_id = audit_db.log_action("a@example.com", "A", "login")
+                raise RuntimeError("request failed")
+        
+        with audit_db._pool.connection() as conn:
+            write_audit_rows(conn.cursor(), [("b@example.com", "B", "logout", None, None, None, "success")])
+        audit_db.flush()
+        
+        ids = self._stored_ids(audit_db)
+        assert len(ids) == len(set(ids)) == 2
+        assert queued_id in ids
+    
+    def test_id_conflict_is_not_dropped(self, audit_db):
+        """Test a queued entry whose id is already taken is still written"""
+        from app.services.audit.audit_logger import write_audit_rows
+        queued_id = audit_db.log_action("a@example.com", "A", "login")
+        with audit_db._pool.connection() as conn:
+            conn.execute("UPDATE sqlite_sequence SET seq = ? WHERE name = 'audit_logs'", (queued_id - 1,))
+            write_audit_rows(conn.cursor(), [("b@example.com", "B", "logout", None, None, None, "success")])
+        
+        audit_db.flush()
+        
+        logs = audit_db.get_audit_logs()
+        assert sorted(log['action_type'] for log in logs) == ["login", "logout"]
+        assert len({log['id'] for log in logs}) == 2
+    
+    def test_shutdown_spills_and_replays(self, audit_db):
+        """Test entries that cannot be written at shutdown are replayed on next start"""
+        from app.services.audit.audit_logger import AuditLogger
+        with patch('app.services.audit.audit_logger.AuditConfig.FLUSH_INTERVAL', 60):
+            log_id = audit_db.log_action("a@example.com", "A", "report_delete", "report", 7)
+            with patch.object(audit_db, '_write', side_effect=OSError("disk unavailable")):
+                audit_db.close()
+        
+        spill = audit_db.db_path + "-audit-pending.jsonl"
+        assert os.path.exists(spill)
+        assert self._stored_ids(audit_db) == []
+        
+        restarted = AuditLogger(db_path=audit_db.db_path)
+        try:
+            assert not os.path.exists(spill)
+            logs = restarted.get_audit_logs()
+            assert [(l['id'], l['action_type'], l['resource_id']) for l in logs] == [(log_id, "report_delete", 7)]
+        finally:
+            restarted.close()
+
+
+class TestAuditArchive:
+    """Test monthly audit archives and transparent reads"""
+    
+    @pytest.fixture
+    def audit_db(self, tmp_path):
+        """Audit logger with three old months and two recent entries"""
+        import sqlite3
+        from app.services.audit.audit_logger import AuditLogger
+        logger = AuditLogger(db_path=str(tmp_path / "audit.db"))
+        
+        stamps = ["2024-01-05 10:00:00", "2024-01-20 10:00:00", "2024-02-03 09:00:00", "2024-03-15 08:00:00"]
+        for i, stamp in enumerate(stamps):
+            logger.log_action("old@example.com", "Old", "report_update", "report", i, details=f"old entry {i} " * 20)
+        logger.log_action("new@example.com", "New", "login")
+        logger.log_action("old@example.com", "Old", "logout")
+        logger.flush()
+        
+        conn = sqlite3.connect(logger.db_path)
+        for i, stamp in enumerate(stamps):
+            conn.execute("UPDATE audit_logs SET timestamp = ? WHERE resource_id = ?", (stamp, i))
+        conn.commit()
+        conn.close()
+        yield logger
+        
+        logger.close()
+    
+    def test_moves_old_rows_into_monthly_files(self, audit_db):
+        """Test rows past retention leave the hot table, grouped by month and compressed"""
+        import sqlite3
+        import zlib
+        from app.services.audit.audit_archive import archive_path, archived_months
+        
+        assert audit_db.archive_old_logs(older_than_days=30) == 4
+        assert archived_months(audit_db.db_path) == ["2024-03", "2024-02", "2024-01"]
+        
+        conn = sqlite3.connect(archive_path(audit_db.db_path, "2024-01"))
+        blobs = [row[0] for row in conn.execute("SELECT details FROM audit_logs ORDER BY id")]
+        conn.close()
+        assert len(blobs) == 2
+        assert zlib.decompress(blobs[0]).decode() == "old entry 0 " * 20
+        assert len(blobs[0]) < len("old entry 0 " * 20)
+        
+        conn = sqlite3.connect(audit_db.db_path)
+        assert conn.execute("SELECT COUNT(*) FROM audit_logs").fetchone()[0] == 2
+        conn.close()
+        assert audit_db.archive_old_logs(older_than_days=30) == 0
+    
+    def test_date_range_reads_archives(self, audit_db):
+        """Test a start date inside the archive merges archived and live rows"""
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        logs = audit_db.get_audit_logs(start_date="2024-01-15 00:00:00")
+        assert [l['resource_id'] for l in logs if l['resource_id'] is not None] == [3, 2, 1]
+        assert logs[-1]['details'] == "old entry 1 " * 20
+        assert audit_db.get_audit_logs_count(start_date="2024-01-15 00:00:00") == 5
+        assert audit_db.get_audit_logs_count(start_date="2024-01-01", actor_email="old@example.com") == 5
+        
+        page = audit_db.get_audit_logs(start_date="2024-01-01", end_date="2024-02-28", limit=2, offset=1)
+        assert [l['resource_id'] for l in page] == [1, 0]
+    
+    def test_end_date_only_reads_archives(self, audit_db):
+        """Test an end date without a start date still searches older archives"""
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        logs = audit_db.get_audit_logs(end_date="2024-02-28 23:59:59")
+        assert [l['resource_id'] for l in logs] == [2, 1, 0]
+        assert audit_db.get_audit_logs_count(end_date="2024-02-28 23:59:59") == 3
+        assert audit_db.get_audit_logs_total(end_date="2024-02-28 23:59:59") == {'count': 3, 'estimated': False}
+    
+    def test_unfiltered_reads_all_archives(self, audit_db):
+        """Test a query without dates includes every archived month"""
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        logs = audit_db.get_audit_logs()
+        assert [l['resource_id'] for l in logs if l['resource_id'] is not None] == [3, 2, 1, 0]
+        assert len(logs) == 6
+        assert audit_db.get_audit_logs_count() == 6
+        assert audit_db.get_audit_logs_count(actor_email="old@example.com") == 5
+        
+        pages, before = [], None
+        while True:
+            page = audit_db.get_audit_logs(limit=4, before=before)
+            pages.append(page)
+            if len(page) < 4:
+                break
+            before = (page[-1]['timestamp'], page[-1]['id'])
+        assert [l['id'] for page in pages for l in page] == [l['id'] for l in logs]
+    
+    def test_full_recent_page_skips_archives(self, audit_db):
+        """Test a page the hot table can fill with recent entries never opens an archive"""
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        with patch('app.services.audit.audit_logger.query_archives', side_effect=AssertionError("archive read")):
+            assert [l['action_type'] for l in audit_db.get_audit_logs(limit=2)] == ["logout", "login"]
+        
+        assert [l['resource_id'] for l in audit_db.get_audit_logs(limit=3)][-1] == 3
+    
+    def test_archive_reads_stop_once_page_is_full(self, audit_db):
+        """Test older monthly files are not opened once newer ones fill the page"""
+        import sqlite3
+        from app.services.audit import audit_archive
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        with patch.object(audit_archive.sqlite3, 'connect', wraps=sqlite3.connect) as connect:
+            logs = audit_db.get_audit_logs(limit=3)
+        assert [l['resource_id'] for l in logs][-1] == 3
+        assert [call.args[0] for call in connect.call_args_list] == [
+            f"file:{audit_archive.archive_path(audit_db.db_path, '2024-03')}?mode=ro"
+        ]
+    
+    def test_archive_counts_cached_until_file_changes(self, audit_db):
+        """Test repeated counts reuse per-archive results and see later appends"""
+        import sqlite3
+        from app.services.audit import audit_archive
+        audit_db.archive_old_logs(older_than_days=30)
+        assert audit_db.get_audit_logs_count(actor_email="old@example.com") == 5
+        audit_db.log_action("old@example.com", "Old", "login")
+        
+        with patch.object(audit_archive.sqlite3, 'connect', wraps=sqlite3.connect) as connect:
+            assert audit_db.get_audit_logs_count(actor_email="old@example.com") == 6
+        assert connect.call_count == 0
+        
+        conn = sqlite3.connect(audit_db.db_path)
+        conn.execute("UPDATE audit_logs SET timestamp = '2024-03-20 08:00:00' WHERE action_type = 'login' "
+                     "AND actor_email = 'old@example.com'")
+        conn.commit()
+        conn.close()
+        audit_db.archive_old_logs(older_than_days=30)
+        assert audit_db.get_audit_logs_count(actor_email="old@example.com") == 6
+        assert audit_db.get_audit_logs_count(actor_email="old@example.com", start_date="2024-03-01") == 3
+    
+    def test_archive_indexes_resource_type(self, audit_db):
+        """Test archives can filter by resource type without a table scan"""
+        import sqlite3
+        from app.services.audit.audit_archive import archive_path
+        audit_db.archive_old_logs(older_than_days=30)
+        
+        conn = sqlite3.connect(archive_path(audit_db.db_path, "2024-01"))
+        plan = [row[3] for row in conn.execute(
+            "EXPLAIN QUERY PLAN SELECT id FROM audit_logs WHERE resource_type = ? ORDER BY timestamp DESC", ("report",)
+        )]
+        conn.close()
+        assert not any(step.startswith('SCAN audit_logs') and 'INDEX' not in step for step in plan)
+        assert any('idx_archive_resource_ts' in step for step in plan)
+    
+    def test_cli_archive(self, audit_db):
+        """Test the archive-audit command"""
+        from app.services.database.cli import main
+        
+        from app.services.audit.audit_archive import archived_months
+        
+        assert main(["--db", audit_db.db_path, "archive-audit", "--days", "30"]) == 0
+        assert archived_months(audit_db.db_path) == ["2024-03", "2024-02", "2024-01"]
+        assert audit_db.get_audit_logs_count(start_date="2024-04-01") == 2
+
+
+class TestAuditCountsAndKeyset:
+    """Test cached/estimated counts and keyset pagination"""
+    
+    @pytest.fixture
+    def audit_db(self):
+        """Audit logger with 30 entries sharing a handful of timestamps"""
+        import sqlite3
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.audit.audit_logger import AuditLogger
+        logger = AuditLogger(db_path=db_path)
+        for i in range(30):
+            logger.log_action(f"user{i % 3}@example.com", "User", "login" if i % 2 else "logout", "report", i)
+        logger.flush()
+        conn = sqlite3.connect(db_path)
+        conn.execute("UPDATE audit_logs SET timestamp = '2024-05-0' || (resource_id % 4 + 1) || ' 12:00:00'")
+        conn.commit()
+        conn.close()
+        yield logger
+        
+        logger.close()
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def test_keyset_pages_match_offset_pages(self, audit_db):
+        """Test walking pages by (timestamp, id) cursor visits every entry once, in order"""
+        expected = [log['id'] for log in audit_db.get_audit_logs(limit=100)]
+        seen = []
+        before = None
+        while True:
+            page = audit_db.get_audit_logs(limit=7, before=before)
+            if not page:
+                break
+            seen.extend(log['id'] for log in page)
+            before = (page[-1]['timestamp'], page[-1]['id'])
+        assert seen == expected
+        assert len(seen) == 30
+        
+        third = audit_db.get_audit_logs(action_type="login", limit=3)[-1]
+        page = audit_db.get_audit_logs(action_type="login", limit=4, before=(third['timestamp'], third['id']))
+        expected_logins = [log['id'] for log in audit_db.get_audit_logs(action_type="login", limit=7)]
+        assert [log['id'] for log in page] == expected_logins[3:]
+    
+    def test_count_cached_until_next_write(self, audit_db):
+        """Test a repeated count is served from cache and a write invalidates it"""
+        statements = []
+        with audit_db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                assert audit_db.get_audit_logs_count(action_type="login") == 15
+                assert audit_db.get_audit_logs_count(action_type="login") == 15
+            finally:
+                conn.set_trace_callback(None)
+        assert sum('COUNT(*)' in sql for sql in statements) == 1
+        
+        audit_db.log_action("user0@example.com", "User", "login")
+        assert audit_db.get_audit_logs_count(action_type="login") == 16
+    
+    def test_estimated_count_for_large_unfiltered_range(self, audit_db):
+        """Test unfiltered totals above the threshold are estimated from the id span"""
+        total = audit_db.get_audit_logs_total()
+        assert total == {'count': 30, 'estimated': False}
+        
+        with patch('app.services.audit.audit_logger.AuditConfig.ESTIMATE_MIN_ROWS', 10):
+            total = audit_db.get_audit_logs_total(start_date="2024-05-01 00:00:00")
+            assert total['estimated'] is True
+            assert 25 <= total['count'] <= 35
+            # Column filters are always counted exactly
+            assert audit_db.get_audit_logs_total(action_type="login") == {'count': 15, 'estimated': False}
+    
+    def test_estimate_is_not_inflated_by_id_gaps(self, audit_db):
+        """Test skipped id blocks (e.g. worker restarts) do not inflate the estimate"""
+        import sqlite3
+        conn = sqlite3.connect(audit_db.db_path)
+        for restart in range(10):
+            conn.execute("UPDATE sqlite_sequence SET seq = seq + 256 WHERE name = 'audit_logs'")
+            for i in range(3):
+                conn.execute("INSERT INTO audit_logs (actor_email, action_type, timestamp) "
+                             "VALUES ('w@example.com', 'login', '2024-06-01 12:00:00')")
+        conn.commit()
+        conn.close()
+        
+        with patch('app.services.audit.audit_logger.AuditConfig.ESTIMATE_MIN_ROWS', 10):
+            total = audit_db.get_audit_logs_total(start_date="2024-05-01 00:00:00")
+        assert total['estimated'] is True
+        assert total['count'] == 60
+    
+    def test_unfiltered_total_uses_row_count(self, audit_db):
+        """Test the unfiltered total is exact without running COUNT(*)"""
+        statements = []
+        with audit_db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                total = audit_db.get_audit_logs_total()
+            finally:
+                conn.set_trace_callback(None)
+        assert total == {'count': 30, 'estimated': False}
+        assert not any('COUNT(*)' in sql for sql in statements)
+        
+        audit_db.log_action("user0@example.com", "User", "login")
+        assert audit_db.get_audit_logs_total() == {'count': 31, 'estimated': False}
+
+
+
+class TestAuditExport:
+    """Test streaming audit iteration and gzip CSV export"""
+    
+    @pytest.fixture
+    def audit_db(self, tmp_path):
+        """Audit logger with entries spread over three days"""
+        import sqlite3
+        from app.services.audit.audit_logger import AuditLogger
+        logger = AuditLogger(db_path=str(tmp_path / "audit.db"))
+        for i in range(25):
+            logger.log_action(f"user{i % 2}@example.com", "User", "login", "report", i, details=f"entry, \"{i}\"\n")
+        logger.flush()
+        conn = sqlite3.connect(logger.db_path)
+        conn.execute("UPDATE audit_logs SET timestamp = '2024-06-1' || (resource_id % 3) || ' 08:30:00'")
+        conn.commit()
+        conn.close()
+        yield logger
+        
+        logger.close()
+    
+    def test_iter_audit_logs_streams_all_batches(self, audit_db):
+        """Test iteration covers every matching row, newest first, without a row cap"""
+        ids = [log['id'] for log in audit_db.iter_audit_logs(batch_size=4)]
+        assert ids == [log['id'] for log in audit_db.get_audit_logs(limit=100)]
+        assert len(ids) == 25
+        
+        user0 = list(audit_db.iter_audit_logs({"actor_email": "user0@example.com"}, batch_size=5))
+        assert len(user0) == 13
+    
+    def test_export_gzip_csv_applies_date_range(self, audit_db, tmp_path):
+        """Test the export writes a gzip CSV with only the filtered date range"""
+        import csv
+        import gzip
+        from app.services.audit.audit_export import ExportConfig, export_audit_logs
+        
+        path = str(tmp_path / "exports" / "audit.csv.gz")
+        with patch.object(ExportConfig, 'BATCH_SIZE', 3):
+            count = export_audit_logs(audit_db, path, {
+                "start_date": "2024-06-11 00:00:00", "end_date": "2024-06-11 23:59:59", "status": "ignored",
+            })
+        
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert count == len(rows) == 8
+        assert all(row['timestamp'].startswith("2024-06-11") for row in rows)
+        assert rows[0]['details'] == 'entry, "{}"\n'.format(rows[0]['resource_id'])
+    
+    def test_export_includes_archived_rows(self, audit_db, tmp_path):
+        """Test an export without a start date includes archived months"""
+        import csv
+        import gzip
+        from app.services.audit.audit_export import export_audit_logs
+        
+        assert audit_db.archive_old_logs(older_than_days=30) == 25
+        
+        path = str(tmp_path / "all.csv.gz")
+        assert export_audit_logs(audit_db, path) == 25
+        assert export_audit_logs(audit_db, str(tmp_path / "end.csv.gz"), {"end_date": "2024-06-11 23:59:59"}) == 17
+        with gzip.open(path, "rt", newline="", encoding="utf-8") as f:
+            rows = list(csv.DictReader(f))
+        assert sorted(int(row['resource_id']) for row in rows) == list(range(25))
+    
+    def test_download_tokens_are_single_use(self, tmp_path):
+        """Test an export token returns its filters once"""
+        from app.services.audit.audit_export import issue_export_token, redeem_export_token
+        
+        db_path = str(tmp_path / "tokens.db")
+        token = issue_export_token({"action_type": "login", "actor_email": None}, db_path)
+        assert redeem_export_token(token, db_path) == {"action_type": "login"}
+        assert redeem_export_token(token, db_path) is None
+        assert redeem_export_token("bogus", db_path) is None
+    
+    def test_download_token_redeemed_by_other_process(self, tmp_path):
+        """Test a token issued here can be redeemed by another worker process"""
+        import subprocess
+        from app.services.audit.audit_export import issue_export_token, redeem_export_token
+        
+        db_path = str(tmp_path / "tokens.db")
+        token = issue_export_token({"actor_email": "a@example.com"}, db_path)
+        
+        result = subprocess.run(
+            [sys.executable, "-c",
+             "import sys; from app.services.audit.audit_export import redeem_export_token; "
+             "print(redeem_export_token(sys.argv[1], sys.argv[2]))", token, db_path],
+            capture_output=True, text=True, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+        )
+        
+        assert result.stdout.strip() == "{'actor_email': 'a@example.com'}", result.stderr
+        assert redeem_export_token(token, db_path) is None
+    
+    def test_expired_download_token_rejected(self, tmp_path):
+        """Test a token past its TTL is refused"""
+        from app.services.audit.audit_export import ExportConfig, issue_export_token, redeem_export_token
+        
+        db_path = str(tmp_path / "tokens.db")
+        with patch.object(ExportConfig, 'TOKEN_TTL', -1):
+            token = issue_export_token({}, db_path)
+        assert redeem_export_token(token, db_path) is None
@@ -140,3 +140,116 @@ class TestOAuthIntegration:
         assert _STORED_PASSWORD_HASH is not None
         assert isinstance(_STORED_PASSWORD_HASH, str)
         assert len(_STORED_PASSWORD_HASH) > 0
+
+
+class TestLoginLimiter:
+    """Test the sliding-window login limiter"""
+    
+    @pytest.fixture
+    def limiter(self, tmp_path):
+        """Limiter on a temp database with a controllable clock"""
+        from app.services.activity.login_limiter import LoginLimiter
+        clock = {"now": 1_700_000_000.0}
+        limiter = LoginLimiter(db_path=str(tmp_path / "auth.db"), clock=lambda: clock["now"])
+        limiter.clock = clock
+        yield limiter
+        
+        limiter._pool.close()
+    
+    def _locked_row(self, limiter, email):
+        with limiter._pool.connection() as conn:
+            return conn.execute(
+                "SELECT account_locked, lock_until FROM user_login_stats WHERE user_email = ?", (email,)
+            ).fetchone()
+    
+    def test_email_locked_after_repeated_failures(self, limiter):
+        """Test the fifth failure within the window locks the account until it expires"""
+        from app.services.activity.login_limiter import LimiterConfig
+        
+        for _ in range(LimiterConfig.MAX_FAILURES_PER_EMAIL - 1):
+            assert limiter.record_failure("admin@example.com", "203.0.113.5") is None
+        assert limiter.check("admin@example.com") is None
+        
+        assert limiter.record_failure("admin@example.com", "203.0.113.5") == LimiterConfig.LOCKOUT
+        assert limiter.check("admin@example.com") == LimiterConfig.LOCKOUT
+        assert self._locked_row(limiter, "admin@example.com")[0] == 1
+        
+        limiter.clock["now"] += LimiterConfig.LOCKOUT + 1
+        assert limiter.check("admin@example.com") is None
+        assert self._locked_row(limiter, "admin@example.com") == (0, None)
+    
+    def test_failures_outside_window_do_not_lock(self, limiter):
+        """Test failures spread wider than the window never accumulate"""
+        from app.services.activity.login_limiter import LimiterConfig
+        
+        step = LimiterConfig.WINDOW / (LimiterConfig.MAX_FAILURES_PER_EMAIL - 1) + 1
+        for _ in range(LimiterConfig.MAX_FAILURES_PER_EMAIL * 3):
+            assert limiter.record_failure("slow@example.com") is None
+            limiter.clock["now"] += step
+    
+    def test_ip_blocked_across_emails(self, limiter):
+        """Test password spraying from one IP is blocked regardless of the email"""
+        from app.services.activity.login_limiter import LimiterConfig
+        
+        for i in range(LimiterConfig.MAX_FAILURES_PER_IP):
+            limiter.record_failure(f"user{i}@example.com", "198.51.100.7")
+        assert limiter.check("fresh@example.com", "198.51.100.7") is not None
+        assert limiter.check("fresh@example.com", "198.51.100.8") is None
+    
+    def test_state_survives_restart(self, limiter):
+        """Test a new limiter seeds its counters and locks from the database"""
+        from app.services.activity.activity_monitor import ActivityMonitor
+        from app.services.activity.login_limiter import LimiterConfig, LoginLimiter, _to_db_time
+        
+        monitor = ActivityMonitor(db_path=limiter.db_path)
+        for _ in range(LimiterConfig.MAX_FAILURES_PER_EMAIL - 1):
+            monitor.log_login_attempt("admin@example.com", "Admin", success=False, ip_address="203.0.113.9")
+        with limiter._pool.connection() as conn:
+            conn.execute("UPDATE failed_login_attempts SET timestamp = ?", (_to_db_time(limiter.clock["now"] - 60),))
+        
+        restarted = LoginLimiter(db_path=limiter.db_path, clock=lambda: limiter.clock["now"])
+        assert restarted.record_failure("admin@example.com") == LimiterConfig.LOCKOUT
+        
+        again = LoginLimiter(db_path=limiter.db_path, clock=lambda: limiter.clock["now"])
+        assert again.check("admin@example.com") is not None
+    
+    def test_cache_miss_does_not_block_other_logins(self, limiter):
+        """Test a slow database read for one email does not hold up checks for others"""
+        import threading
+        
+        limiter.check("cached@example.com")
+        loading = threading.Event()
+        release = threading.Event()
+        real_load = limiter._load_email
+        
+        def slow_load(email, now):
+            loading.set()
+            release.wait(5)
+            return real_load(email, now)
+        
+        with patch.object(limiter, '_load_email', side_effect=slow_load):
+            worker = threading.Thread(target=limiter.check, args=("new@example.com",))
+            worker.start()
+            assert loading.wait(5)
+            results = []
+            probe = threading.Thread(target=lambda: results.extend([
+                limiter.check("cached@example.com"), limiter.record_failure("cached@example.com"),
+            ]))
+            try:
+                probe.start()
+                probe.join(2)
+                assert results == [None, None]
+            finally:
+                release.set()
+                worker.join(5)
+                probe.join(5)
+        assert not worker.is_alive()
+    
+    def test_success_clears_failures(self, limiter):
+        """Test a successful login resets the email's failure count"""
+        from app.services.activity.login_limiter import LimiterConfig
+        
+        for _ in range(LimiterConfig.MAX_FAILURES_PER_EMAIL - 1):
+            limiter.record_failure("admin@example.com")
+        limiter.record_success("admin@example.com")
+        assert limiter.record_failure("admin@example.com") is None
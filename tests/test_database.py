@@ -2,6 +2,7 @@
 Tests for database service
 """
 import pytest
+import base64
 import os
 import sqlite3
 from unittest.mock import Mock, patch, MagicMock
@@ -1178,3 +1179,1206 @@ class TestDatabaseUpdateOperations:
 
 
 
+
+
+class TestConnectionPool:
+    """Test pooled connection handling"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        db._pool.close()
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.unlink(db_path + suffix)
+            except:
+                pass
+    
+    def test_connection_profile_applied(self, test_db):
+        """Test that pooled connections use WAL and the tuned pragmas"""
+        from app.services.database.connection_pool import PoolConfig
+        
+        with test_db._pool.connection() as conn:
+            journal_mode = conn.execute("PRAGMA journal_mode").fetchone()[0]
+            synchronous = conn.execute("PRAGMA synchronous").fetchone()[0]
+            busy_timeout = conn.execute("PRAGMA busy_timeout").fetchone()[0]
+        
+        assert journal_mode.lower() == 'wal'
+        assert synchronous == 1  # NORMAL
+        assert busy_timeout == PoolConfig.BUSY_TIMEOUT_MS
+    
+    def test_connections_are_reused(self, test_db):
+        """Test that repeated calls reuse the same pooled connection"""
+        for i in range(5):
+            test_db.add_report(
+                user_email=f"user{i}@example.com",
+                user_name="User",
+                user_type="student",
+                issue_description="Issue",
+                location="Lab"
+            )
+            test_db.get_all_reports()
+        
+        stats = test_db.pool_stats()
+        assert stats['open'] == 1
+        assert stats['in_use'] == 0
+        assert stats['checkouts'] >= 10
+    
+    def test_pool_shared_across_services(self, test_db):
+        """Test that audit and activity services share the database pool"""
+        from app.services.audit.audit_logger import AuditLogger
+        from app.services.activity.activity_monitor import ActivityMonitor
+        
+        logger = AuditLogger(db_path=test_db.db_name)
+        monitor = ActivityMonitor(db_path=test_db.db_name)
+        
+        assert logger._pool is test_db._pool
+        assert monitor._pool is test_db._pool
+    
+    def test_error_rolls_back_transaction(self, test_db):
+        """Test that a failing block rolls back and returns the connection"""
+        with pytest.raises(RuntimeError):
+            with test_db._pool.connection() as conn:
+                conn.execute(
+                    "INSERT INTO users (email, name, role) VALUES (?, ?, ?)",
+                    ("rollback@example.com", "Rollback", "student")
+                )
+                raise RuntimeError("boom")
+        
+        assert test_db.get_user_by_email("rollback@example.com") is None
+        assert test_db.pool_stats()['in_use'] == 0
+    
+    def test_nested_use_joins_outer_transaction(self, test_db):
+        """Test that nested use on one thread shares a single connection"""
+        with test_db._pool.connection() as outer:
+            with test_db._pool.connection() as inner:
+                assert inner is outer
+            assert test_db.pool_stats()['in_use'] == 1
+    
+    def test_pool_is_bounded(self, test_db):
+        """Test that the pool times out instead of opening past its limit"""
+        from app.services.database.connection_pool import ConnectionPool, PoolTimeoutError
+        
+        pool = ConnectionPool(test_db.db_name, max_size=1)
+        conn = pool.acquire()
+        try:
+            with pytest.raises(PoolTimeoutError):
+                pool.acquire(timeout=0.05)
+        finally:
+            pool.release(conn)
+            pool.close()
+        
+        assert pool.stats()['timeouts'] == 1
+    
+    def test_discard_wakes_waiter(self, test_db):
+        """Test a caller waiting for a connection opens one as soon as a slot is discarded"""
+        import threading
+        import time
+        from app.services.database.connection_pool import ConnectionPool
+        
+        pool = ConnectionPool(test_db.db_name, max_size=1)
+        conn = pool.acquire()
+        acquired = []
+        waiter = threading.Thread(target=lambda: acquired.append(pool.acquire(timeout=5)))
+        waiter.start()
+        while not pool._waiting:
+            time.sleep(0.001)
+        try:
+            pool.release(conn, discard=True)
+            waiter.join(2)
+            assert not waiter.is_alive()
+            assert acquired and acquired[0] is not conn
+            assert pool.stats()['open'] == 1
+        finally:
+            waiter.join()
+            for c in acquired:
+                pool.release(c)
+            pool.close()
+
+
+class TestSchemaMigrations:
+    """Test the versioned schema migration engine"""
+    
+    @pytest.fixture
+    def db_path(self):
+        """Provide a temporary database path"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            path = f.name
+        yield path
+        
+        for suffix in ('', '-wal', '-shm'):
+            try:
+                os.unlink(path + suffix)
+            except:
+                pass
+    
+    def test_fresh_database_reaches_latest_version(self, db_path):
+        """Test that a new database records every migration"""
+        from app.services.database.database import Database
+        from app.services.database.migrations import LATEST_VERSION, MIGRATIONS
+        
+        db = Database(db_name=db_path)
+        conn = db.get_connection()
+        versions = [r[0] for r in conn.execute("SELECT version FROM schema_version ORDER BY version")]
+        tables = {r[0] for r in conn.execute("SELECT name FROM sqlite_master WHERE type='table'")}
+        conn.close()
+        
+        assert versions == [m[0] for m in MIGRATIONS]
+        assert versions[-1] == LATEST_VERSION
+        for table in ('reports', 'users', 'audit_logs', 'user_activity',
+                      'user_login_stats', 'failed_login_attempts'):
+            assert table in tables
+    
+    def test_legacy_database_is_upgraded(self, db_path):
+        """Test that an unversioned legacy reports table gains new columns"""
+        conn = sqlite3.connect(db_path)
+        conn.execute('''
+            CREATE TABLE reports (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_email TEXT NOT NULL,
+                user_name TEXT NOT NULL,
+                user_type TEXT NOT NULL,
+                issue_description TEXT NOT NULL,
+                location TEXT NOT NULL,
+                status TEXT DEFAULT 'pending'
+            )
+        ''')
+        conn.execute(
+            "INSERT INTO reports (user_email, user_name, user_type, issue_description, location) "
+            "VALUES ('old@example.com', 'Old', 'student', 'Legacy', 'Lab')"
+        )
+        conn.commit()
+        conn.close()
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        
+        report = db.get_reports_by_user('old@example.com')[0]
+        assert report['category'] == 'Uncategorized'
+        conn = db.get_connection()
+        created_at = conn.execute("SELECT created_at FROM reports").fetchone()[0]
+        conn.close()
+        assert created_at is not None
+    
+    def test_migrations_are_not_reapplied(self, db_path):
+        """Test that a current database only runs the version check"""
+        from app.services.database.connection_pool import get_pool
+        from app.services.database.migrations import migrate, LATEST_VERSION
+        
+        with get_pool(db_path).connection() as conn:
+            assert migrate(conn) == LATEST_VERSION
+            statements = []
+            conn.set_trace_callback(statements.append)
+            assert migrate(conn) == LATEST_VERSION
+            conn.set_trace_callback(None)
+        
+        assert len(statements) == 1
+        assert 'schema_version' in statements[0]
+
+
+class TestReportPagination:
+    """Test keyset-paginated report listing and SQL-side counts"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database with 25 reports"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        for i in range(25):
+            report_id = db.add_report(
+                user_email=f"user{i % 2}@example.com",
+                user_name="User",
+                user_type="student",
+                issue_description=f"Issue {i}",
+                location="Lab",
+                category="IT" if i % 5 else "Facilities"
+            )
+            if i % 3 == 0:
+                db.update_report_status(report_id, "resolved")
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def test_pages_cover_all_reports_once(self, test_db):
+        """Test walking every page returns each report exactly once, newest first"""
+        seen = []
+        cursor = None
+        while True:
+            page = test_db.get_reports_page(cursor=cursor, limit=10)
+            assert len(page['reports']) <= 10
+            seen.extend(r['id'] for r in page['reports'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert seen == sorted(seen, reverse=True)
+        assert len(seen) == len(set(seen)) == 25
+    
+    def test_last_full_page_has_no_cursor(self, test_db):
+        """Test an exact final page does not advertise another page"""
+        first = test_db.get_reports_page(limit=20)
+        last = test_db.get_reports_page(cursor=first['next_cursor'], limit=5)
+        
+        assert len(last['reports']) == 5
+        assert last['next_cursor'] is None
+    
+    def test_page_filters(self, test_db):
+        """Test category and status filters are applied in SQL"""
+        page = test_db.get_reports_page(limit=50, filters={"category": "Facilities", "status": "Resolved"})
+        
+        assert page['reports']
+        for report in page['reports']:
+            assert report['category'] == "Facilities"
+            assert report['status'] == "Resolved"
+    
+    def test_status_counts(self, test_db):
+        """Test per-status counts, overall and within a category"""
+        counts = test_db.get_status_counts()
+        assert counts == {'pending': 16, 'in progress': 0, 'resolved': 9, 'rejected': 0}
+        
+        facilities = test_db.get_status_counts(category="Facilities")
+        assert sum(facilities.values()) == 5
+    
+    def test_category_counts_by_status(self, test_db):
+        """Test category counts can be restricted to one status"""
+        rows = test_db.get_reports_per_category(status="resolved")
+        
+        assert sum(r['count'] for r in rows) == 9
+
+
+class TestReportBlobStore:
+    """Test report photos are stored once by content hash and refcounted"""
+    
+    PHOTO = "data:image/jpeg;base64," + base64.b64encode(b"\xff\xd8jpeg-bytes").decode()
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def _add(self, db, image):
+        return db.add_report("user@example.com", "User", "student", "Issue", "Lab", "IT", report_image=image)
+    
+    def test_report_keeps_only_blob_key(self, test_db):
+        """Test a data URI photo is moved out of the reports row"""
+        report = test_db.get_report_by_id(self._add(test_db, self.PHOTO))
+        
+        assert report['report_image'] is None
+        assert len(report['image_key']) == 64
+        assert test_db.get_report_image(report['image_key']) == self.PHOTO
+    
+    def test_identical_photos_are_deduplicated(self, test_db):
+        """Test the same bytes are stored once with a reference per report"""
+        first = test_db.get_report_by_id(self._add(test_db, self.PHOTO))
+        second = test_db.get_report_by_id(self._add(test_db, self.PHOTO))
+        
+        assert first['image_key'] == second['image_key']
+        blob = test_db.blobs.get(first['image_key'])
+        assert blob['refcount'] == 2
+        assert blob['mime_type'] == "image/jpeg"
+        assert test_db.blobs.stats()['blobs'] == 1
+    
+    def test_blob_released_with_last_report(self, test_db):
+        """Test deleting reports decrements and finally removes the blob"""
+        first_id = self._add(test_db, self.PHOTO)
+        second_id = self._add(test_db, self.PHOTO)
+        key = test_db.get_report_by_id(first_id)['image_key']
+        
+        test_db.delete_report(first_id)
+        assert test_db.blobs.get(key)['refcount'] == 1
+        
+        test_db.delete_report(second_id)
+        assert test_db.blobs.get(key) is None
+    
+    def test_external_url_kept_as_is(self, test_db):
+        """Test non data-URI images are not put in the blob store"""
+        report = test_db.get_report_by_id(self._add(test_db, "https://example.com/a.jpg"))
+        
+        assert report['report_image'] == "https://example.com/a.jpg"
+        assert report['image_key'] is None
+    
+    def test_inline_photos_migrated(self):
+        """Test migration moves existing inline photos into the blob store"""
+        from app.services.database.migrations import MIGRATIONS, migrate
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        try:
+            conn = sqlite3.connect(db_path)
+            conn.execute('CREATE TABLE schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL, applied_at TIMESTAMP)')
+            for version, name, fn in MIGRATIONS[:3]:
+                fn(conn.cursor())
+                conn.execute('INSERT INTO schema_version (version, name) VALUES (?, ?)', (version, name))
+            conn.execute('''INSERT INTO reports (user_email, user_name, user_type, issue_description, location, report_image)
+                            VALUES ('a@example.com', 'A', 'student', 'Issue', 'Lab', ?)''', (self.PHOTO,))
+            conn.commit()
+            
+            migrate(conn)
+            image, key = conn.execute('SELECT report_image, image_key FROM reports').fetchone()
+            refcount = conn.execute('SELECT refcount FROM report_blobs WHERE key = ?', (key,)).fetchone()[0]
+            conn.close()
+            
+            assert image is None
+            assert refcount == 1
+        finally:
+            os.unlink(db_path)
+
+
+class TestDashboardSnapshot:
+    """Test the single-transaction admin dashboard snapshot"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database with a few reports"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        for i in range(6):
+            email = f"user{i % 3}@example.com"
+            db.create_or_update_user(email, f"User {i % 3}", "student")
+            report_id = db.add_report(email, f"User {i % 3}", "student", f"Issue {i}",
+                                      f"Room {i % 2}", "IT" if i % 2 else "Facilities")
+            if i < 2:
+                db.update_report_status(report_id, "resolved")
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def test_matches_individual_queries(self, test_db):
+        """Test the snapshot agrees with the standalone analytics methods"""
+        snapshot = test_db.get_dashboard_snapshot()
+        
+        assert snapshot.total_reports == 6
+        assert snapshot.total_users == test_db.get_total_users_count() == 3
+        assert snapshot.resolution_rate == test_db.get_resolution_rate()
+        assert snapshot.status_counts == test_db.get_status_counts()
+        assert snapshot.reports_per_day == test_db.get_reports_per_day(days=7)
+        assert snapshot.reports_per_category == test_db.get_reports_per_category()
+        assert snapshot.reports_per_location == test_db.get_reports_per_location()
+        assert snapshot.top_reporters == test_db.get_top_reporters(limit=5)
+    
+    def test_resolution_rate(self, test_db):
+        """Test resolved totals and rate"""
+        rate = test_db.get_dashboard_snapshot().resolution_rate
+        
+        assert rate == {'total': 6, 'resolved': 2, 'rate': 33.3}
+    
+    def test_single_connection_and_transaction(self, test_db):
+        """Test the snapshot checks out one connection and reads inside one transaction"""
+        statements = []
+        before = test_db.pool_stats()['checkouts']
+        with test_db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            test_db.get_dashboard_snapshot()
+            conn.set_trace_callback(None)
+        
+        assert test_db.pool_stats()['checkouts'] - before == 1
+        assert statements[0] == 'BEGIN'
+        assert sum(1 for sql in statements if sql.lstrip().upper().startswith('SELECT')) == 7
+
+
+class TestReportRollups:
+    """Test trigger-maintained analytics rollup tables"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def _drift(self, db):
+        from app.services.database.rollups import rollup_drift
+        with db._pool.connection() as conn:
+            return rollup_drift(conn.cursor())
+    
+    def test_triggers_track_writes(self, test_db):
+        """Test inserts, status/category/location edits and deletes keep rollups exact"""
+        ids = [test_db.add_report("u@example.com", "U", "student", f"Issue {i}", "Lab A", "IT") for i in range(4)]
+        test_db.update_report_status(ids[0], "resolved")
+        test_db.update_report(ids[1], "Edited", "Lab B")
+        test_db.delete_report(ids[2])
+        
+        assert self._drift(test_db) == []
+        assert test_db.get_status_counts() == {'pending': 2, 'in progress': 0, 'resolved': 1, 'rejected': 0}
+        assert test_db.get_status_counts(category="IT")['resolved'] == 1
+        assert {r['location']: r['count'] for r in test_db.get_reports_per_location()} == {"Lab A": 2, "Lab B": 1}
+        assert sum(r['count'] for r in test_db.get_reports_per_day()) == 3
+        assert test_db.get_top_reporters() == [{'name': "U", 'email': "u@example.com", 'count': 3}]
+    
+    def test_empty_groups_are_removed(self, test_db):
+        """Test a group disappears once its last report is deleted"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Annex", "Facilities")
+        test_db.delete_report(report_id)
+        
+        assert test_db.get_reports_per_category() == []
+        assert test_db.get_reports_per_location() == []
+    
+    def test_raw_sql_writes_are_tracked(self, test_db):
+        """Test writes that bypass the Database API still update rollups"""
+        conn = test_db.get_connection()
+        conn.execute('''INSERT INTO reports (user_email, user_name, user_type, issue_description, location, status)
+                        VALUES ('a@example.com', 'A', 'student', 'Issue', 'Lab', 'FIXED')''')
+        conn.commit()
+        conn.close()
+        
+        assert test_db.get_resolution_rate() == {'total': 1, 'resolved': 1, 'rate': 100.0}
+        assert self._drift(test_db) == []
+    
+    def test_rebuild_command(self, test_db):
+        """Test the CLI detects drift and rebuilds the rollups"""
+        from app.services.database.cli import main
+        test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", "IT")
+        conn = test_db.get_connection()
+        conn.execute('DELETE FROM report_counts_by_location')
+        conn.commit()
+        conn.close()
+        
+        assert main(["--db", test_db.db_name, "check-rollups"]) == 1
+        assert main(["--db", test_db.db_name, "rebuild-rollups"]) == 0
+        assert main(["--db", test_db.db_name, "check-rollups"]) == 0
+        assert test_db.get_reports_per_location() == [{'location': 'Lab', 'count': 1}]
+    
+    def test_migrated_triggers_match_current_definitions(self, test_db):
+        """Test the frozen migration triggers equal what create_rollup_triggers builds today"""
+        from app.services.database.rollups import create_rollup_triggers
+        
+        def trigger_sql(conn):
+            rows = conn.execute("SELECT name, sql FROM sqlite_master WHERE name LIKE 'trg_reports_rollup_%'")
+            return {name: ' '.join(sql.split()) for name, sql in rows}
+        
+        conn = test_db.get_connection()
+        migrated = trigger_sql(conn)
+        create_rollup_triggers(conn.cursor())
+        assert trigger_sql(conn) == migrated
+        conn.close()
+    
+    def test_upgrade_from_pre_rollup_schema(self):
+        """Test an old database with legacy statuses upgrades to consistent rollups"""
+        import sqlite3
+        from app.services.database.migrations import MIGRATIONS, migrate
+        from app.services.database.rollups import rollup_drift
+        conn = sqlite3.connect(':memory:')
+        conn.execute('CREATE TABLE schema_version (version INTEGER PRIMARY KEY, name TEXT NOT NULL, '
+                     'applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP)')
+        cursor = conn.cursor()
+        for version, name, migration in MIGRATIONS[:5]:
+            migration(cursor)
+            cursor.execute("INSERT INTO schema_version (version, name) VALUES (?, ?)", (version, name))
+        for i, status in enumerate(["FIXED", "pending", None, "In-Progress", "fixed"]):
+            cursor.execute('''INSERT INTO reports (user_email, user_name, user_type, issue_description, location,
+                              category, status) VALUES (?, 'U', 'student', 'Issue', 'Lab', 'IT', ?)''',
+                           (f"u{i % 2}@example.com", status))
+        conn.commit()
+        
+        migrate(conn)
+        
+        assert rollup_drift(conn.cursor()) == []
+        assert dict(conn.execute('SELECT status, count FROM report_counts_by_status')) == {
+            'resolved': 2, 'pending': 2, 'in progress': 1
+        }
+        assert dict(conn.execute('SELECT user_email, count FROM report_counts_by_user')) == {
+            'u0@example.com': 3, 'u1@example.com': 2
+        }
+        conn.close()
+
+
+class TestReportSearch:
+    """Test FTS5 full-text search over reports"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database with searchable reports"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        db.add_report("a@example.com", "A", "student", "Leaking ceiling near the stairs", "Building C", "Facilities")
+        db.add_report("b@example.com", "B", "student", "Broken projector", "Building A", "IT")
+        db.add_report("c@example.com", "C", "student", "Ceiling fan is noisy", "Library", "Facilities")
+        for i in range(5):
+            db.add_report("d@example.com", "D", "student", f"Water leak number {i}", "Gym", "Facilities")
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def test_ranked_match_with_snippet(self, test_db):
+        """Test the best match ranks first and the snippet highlights terms"""
+        from app.services.database.database import SNIPPET_START, SNIPPET_END
+        result = test_db.search_reports("leaking ceiling building c")
+        
+        assert [r['location'] for r in result['reports']] == ["Building C"]
+        snippet = result['reports'][0]['snippet']
+        assert f"{SNIPPET_START}Leaking{SNIPPET_END}" in snippet
+    
+    def test_stemming_and_prefix(self, test_db):
+        """Test porter stemming and prefix matching on the last term"""
+        leaks = test_db.search_reports("leaks", limit=50)['reports']
+        assert len(leaks) == 6
+        
+        assert len(test_db.search_reports("proj")['reports']) == 1
+    
+    def test_filters(self, test_db):
+        """Test category and status filters apply to search results"""
+        assert test_db.search_reports("ceiling", filters={"category": "IT"})['reports'] == []
+        assert len(test_db.search_reports("ceiling", filters={"category": "Facilities"})['reports']) == 2
+        assert test_db.search_reports("ceiling", filters={"status": "resolved"})['reports'] == []
+    
+    def test_cursor_pagination(self, test_db):
+        """Test paging through ranked results returns each match once"""
+        seen = []
+        cursor = None
+        while True:
+            page = test_db.search_reports("leak", limit=2, cursor=cursor)
+            seen.extend(r['id'] for r in page['reports'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        
+        assert len(seen) == len(set(seen)) == 6
+    
+    def test_index_follows_updates_and_deletes(self, test_db):
+        """Test triggers keep the index in sync with edits, remarks and deletes"""
+        report_id = test_db.search_reports("projector")['reports'][0]['id']
+        
+        test_db.update_report_status(report_id, "resolved", remarks="Replaced the HDMI cable")
+        assert [r['id'] for r in test_db.search_reports("hdmi")['reports']] == [report_id]
+        
+        test_db.update_report(report_id, "Flickering screen", "Building A")
+        assert test_db.search_reports("projector")['reports'] == []
+        
+        test_db.delete_report(report_id)
+        assert test_db.search_reports("flickering")['reports'] == []
+    
+    def test_punctuation_is_not_query_syntax(self, test_db):
+        """Test user input with FTS operators and quotes does not raise"""
+        assert len(test_db.search_reports('"ceiling" -(stairs')['reports']) == 1
+        assert test_db.search_reports('  ')['reports'] == []
+
+
+class TestReportStatus:
+    """Test canonical report status codes written at write time"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def _raw_status(self, db, report_id, status):
+        conn = db.get_connection()
+        conn.execute('UPDATE reports SET status = ? WHERE id = ?', (status, report_id))
+        conn.commit()
+        conn.close()
+    
+    def _stored(self, db, report_id):
+        conn = db.get_connection()
+        row = conn.execute('SELECT status, status_code FROM reports WHERE id = ?', (report_id,)).fetchone()
+        conn.close()
+        return tuple(row)
+    
+    def test_parse_status(self):
+        """Test legacy spellings map to the same enum member as the SQL expression"""
+        from app.services.database.report_status import ReportStatus, parse_status, status_code_sql
+        cases = {
+            "PENDING": ReportStatus.PENDING, "  pending  ": ReportStatus.PENDING,
+            "ON GOING": ReportStatus.IN_PROGRESS, "in-progress": ReportStatus.IN_PROGRESS,
+            "FIXED": ReportStatus.RESOLVED, "Resolved": ReportStatus.RESOLVED,
+            "REJECT": ReportStatus.REJECTED, "": ReportStatus.PENDING,
+            None: ReportStatus.PENDING, "archived": ReportStatus.PENDING,
+        }
+        conn = sqlite3.connect(':memory:')
+        for value, expected in cases.items():
+            assert parse_status(value) is expected
+            assert conn.execute(f'SELECT {status_code_sql(":v")}', {'v': value}).fetchone()[0] == expected
+        conn.close()
+    
+    def test_writes_store_key_and_code(self, test_db):
+        """Test add and status updates store the canonical key and code"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab")
+        assert self._stored(test_db, report_id) == ('pending', 0)
+        
+        test_db.update_report_status(report_id, "ON GOING")
+        assert self._stored(test_db, report_id) == ('in progress', 1)
+        assert test_db.get_report_by_id(report_id)['status'] == 'In Progress'
+    
+    def test_raw_sql_writes_get_code(self, test_db):
+        """Test writes bypassing the API still get a matching status code"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab")
+        self._raw_status(test_db, report_id, "REJECT")
+        
+        assert self._stored(test_db, report_id) == ('REJECT', 3)
+        assert test_db.get_reports_page(filters={'status': 'Rejected'})['reports'][0]['id'] == report_id
+    
+    def test_check_constraint_rejects_unknown_code(self, test_db):
+        """Test the status_code column only accepts known codes"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab")
+        conn = test_db.get_connection()
+        with pytest.raises(sqlite3.IntegrityError):
+            conn.execute('UPDATE reports SET status_code = 9 WHERE id = ?', (report_id,))
+        conn.close()
+    
+    def test_migrate_is_one_update(self, test_db):
+        """Test canonical migration rewrites legacy rows in a single statement"""
+        ids = [test_db.add_report("u@example.com", "U", "student", f"Issue {i}", "Lab", "IT") for i in range(3)]
+        for report_id, raw in zip(ids, ["FIXED", "  PENDING  ", "On Going"]):
+            self._raw_status(test_db, report_id, raw)
+        
+        statements = []
+        with test_db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                assert test_db.migrate_statuses_to_canonical() == 3
+            finally:
+                conn.set_trace_callback(None)
+        
+        # Trigger programs re-report their parent statement, so count distinct SQL
+        assert len({s.strip() for s in statements if s.lstrip().upper().startswith('UPDATE REPORTS')}) == 1
+        assert [self._stored(test_db, i) for i in ids] == [('resolved', 2), ('pending', 0), ('in progress', 1)]
+        assert test_db.get_status_counts(category="IT") == {'pending': 1, 'in progress': 1, 'resolved': 1, 'rejected': 0}
+        assert test_db.migrate_statuses_to_canonical() == 0
+
+
+class TestReportImportExport:
+    """Test bulk report import and streaming CSV/JSONL export"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def _records(self, n):
+        for i in range(n):
+            yield {
+                'user_email': f"user{i % 3}@example.com", 'user_name': "User", 'user_type': "student",
+                'issue_description': f"Legacy issue {i}", 'location': f"Hall {i % 2}",
+                'category': "IT" if i % 2 else "Facilities",
+                'status': ["FIXED", "ON GOING", "", "reject"][i % 4],
+                'created_at': f"2023-05-{i % 28 + 1:02d} 09:00:00",
+            }
+    
+    def _drift(self, db):
+        from app.services.database.rollups import rollup_drift
+        with db._pool.connection() as conn:
+            return rollup_drift(conn.cursor())
+    
+    def test_import_across_chunks(self, test_db):
+        """Test chunked imports canonicalise status and keep rollups, search and triggers intact"""
+        assert test_db.bulk_import_reports(self._records(25), chunk_size=10) == 25
+        
+        assert test_db.get_status_counts() == {'pending': 6, 'in progress': 6, 'resolved': 7, 'rejected': 6}
+        assert self._drift(test_db) == []
+        assert len(test_db.search_reports("legacy")['reports']) == 20
+        assert test_db.get_reports_page(limit=1)['reports'][0]['issue_description'] == "Legacy issue 24"
+        
+        # Per-row triggers are back in place afterwards.
+        report_id = test_db.add_report("new@example.com", "New", "student", "Fresh leak", "Lab", "IT")
+        assert self._drift(test_db) == []
+        assert [r['id'] for r in test_db.search_reports("fresh")['reports']] == [report_id]
+    
+    def test_import_rejects_incomplete_record(self, test_db):
+        """Test a record missing a required field raises with its position"""
+        records = list(self._records(3))
+        del records[2]['location']
+        
+        with pytest.raises(ValueError, match="record 3: missing location"):
+            test_db.bulk_import_reports(records)
+    
+    @pytest.mark.parametrize("fmt", ["csv", "jsonl"])
+    def test_export_round_trip(self, test_db, fmt):
+        """Test an export can be imported into another database unchanged"""
+        import io
+        from app.services.database.database import Database
+        from app.services.database.report_io import read_reports
+        
+        test_db.bulk_import_reports(self._records(8))
+        test_db.update_report_status(1, "resolved", remarks="Patched", updated_by="admin@example.com")
+        
+        buf = io.StringIO()
+        assert test_db.export_reports(buf, fmt, filters={'category': "Facilities"}) == 4
+        
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            other_path = f.name
+        try:
+            other = Database(db_name=other_path)
+            buf.seek(0)
+            assert other.bulk_import_reports(read_reports(buf, fmt)) == 4
+            
+            def rows(db):
+                keys = ('issue_description', 'status', 'admin_remarks', 'created_at', 'status_updated_by')
+                return [tuple(r[k] for k in keys) for r in db.iter_reports(filters={'category': "Facilities"})]
+            assert rows(other) == rows(test_db)
+        finally:
+            other._pool.close()
+            os.unlink(other_path)
+    
+    def test_export_embeds_images(self, test_db):
+        """Test include_images exports stored photos as data URIs that re-import as blobs"""
+        import io
+        from app.services.database.report_io import read_reports
+        
+        photo = "data:image/png;base64," + base64.b64encode(b"png-bytes").decode()
+        test_db.add_report("u@example.com", "U", "student", "Cracked tile", "Lobby", report_image=photo)
+        
+        plain = io.StringIO()
+        test_db.export_reports(plain, "jsonl")
+        assert '"report_image": null' in plain.getvalue()
+        
+        buf = io.StringIO()
+        test_db.export_reports(buf, "jsonl", include_images=True)
+        buf.seek(0)
+        test_db.bulk_import_reports(read_reports(buf, "jsonl"))
+        
+        assert test_db.blobs.get(test_db.get_report_by_id(2)['image_key'])['refcount'] == 2
+    
+    def test_cli_import_export(self, test_db, tmp_path):
+        """Test the import-reports and export-reports commands"""
+        from app.services.database.cli import main
+        source = tmp_path / "legacy.jsonl"
+        import json
+        source.write_text("\n".join(json.dumps(r) for r in self._records(5)) + "\n", encoding="utf-8")
+        
+        assert main(["--db", test_db.db_name, "import-reports", str(source)]) == 0
+        out = tmp_path / "resolved.csv"
+        assert main(["--db", test_db.db_name, "export-reports", str(out), "--status", "Resolved"]) == 0
+        
+        lines = out.read_text(encoding="utf-8").splitlines()
+        assert lines[0].startswith("id,user_email")
+        assert len(lines) == 3
+        
+        bad = tmp_path / "bad.jsonl"
+        bad.write_text('{"user_email": "x@example.com"}\n', encoding="utf-8")
+        assert main(["--db", test_db.db_name, "import-reports", str(bad)]) == 1
+
+
+class TestBulkStatusUpdate:
+    """Test batch status changes with audit rows in one transaction"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    ADMIN = {'email': "admin@example.com", 'name': "Admin"}
+    
+    def _audit_rows(self, db):
+        conn = db.get_connection()
+        rows = conn.execute('SELECT actor_email, action_type, resource_id, details FROM audit_logs ORDER BY id').fetchall()
+        conn.close()
+        return rows
+    
+    def test_updates_reports_and_audits(self, test_db):
+        """Test every change is applied and audited, unknown ids are skipped"""
+        ids = [test_db.add_report("u@example.com", "U", "student", f"Issue {i}", "Lab", "IT") for i in range(3)]
+        
+        updated = test_db.update_statuses_bulk(
+            [(ids[0], "resolved"), (ids[1], "Rejected", "Duplicate"), (9999, "resolved")], self.ADMIN,
+        )
+        
+        assert updated == ids[:2]
+        assert test_db.get_report_by_id(ids[0])['status'] == 'Resolved'
+        assert test_db.get_report_by_id(ids[1])['admin_remarks'] == 'Duplicate'
+        assert test_db.get_report_by_id(ids[1])['status_updated_by'] == "admin@example.com"
+        assert test_db.get_status_counts(category="IT") == {'pending': 1, 'in progress': 0, 'resolved': 1, 'rejected': 1}
+        assert self._audit_rows(test_db) == [
+            ("admin@example.com", "report_status_change", ids[0], "Changed report status to Resolved"),
+            ("admin@example.com", "report_status_change", ids[1], "Changed report status to Rejected | Remarks: Duplicate"),
+        ]
+    
+    def test_single_commit(self, test_db):
+        """Test a batch of 200 changes runs in one transaction"""
+        ids = [test_db.add_report("u@example.com", "U", "student", f"Issue {i}", "Lab") for i in range(200)]
+        
+        statements = []
+        with test_db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                test_db.update_statuses_bulk([(i, "resolved") for i in ids], self.ADMIN)
+            finally:
+                conn.set_trace_callback(None)
+        
+        assert test_db.get_status_counts()['resolved'] == 200
+        assert len(self._audit_rows(test_db)) == 200
+        assert sum(s.strip().upper().startswith('BEGIN') for s in statements) == 1
+    
+    def test_audit_failure_rolls_back_updates(self, test_db):
+        """Test an audit write failure leaves no status change behind"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab")
+        
+        with patch('app.services.database.database.write_audit_rows', side_effect=sqlite3.OperationalError("disk full")):
+            with pytest.raises(sqlite3.OperationalError):
+                test_db.update_statuses_bulk([(report_id, "resolved")], self.ADMIN)
+        
+        assert test_db.get_report_by_id(report_id)['status'] == 'Pending'
+        assert self._audit_rows(test_db) == []
+    
+    def test_missing_actor_is_rejected(self, test_db):
+        """Test a bulk update without an actor email changes nothing"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab")
+        
+        for actor in (None, {}, {'name': "Admin"}):
+            with pytest.raises(ValueError):
+                test_db.update_statuses_bulk([(report_id, "resolved")], actor)
+        
+        assert test_db.get_report_by_id(report_id)['status'] == 'Pending'
+        assert self._audit_rows(test_db) == []
+    
+    def test_bulk_update_invalidates_cached_audit_counts(self, test_db):
+        """Test audit rows written by the bulk path are seen by cached audit counts"""
+        from app.services.audit.audit_logger import AuditLogger
+        
+        audit = AuditLogger(db_path=test_db.db_name)
+        ids = [test_db.add_report("u@example.com", "U", "student", f"Issue {i}", "Lab") for i in range(2)]
+        test_db.update_statuses_bulk([(ids[0], "resolved")], self.ADMIN)
+        assert audit.get_audit_logs_count(action_type="report_status_change") == 1
+        
+        test_db.update_statuses_bulk([(ids[1], "resolved")], self.ADMIN)
+        
+        assert audit.get_audit_logs_count(action_type="report_status_change") == 2
+        audit.close()
+
+
+class TestAsyncServices:
+    """Test the awaitable facade and its bounded executor"""
+    
+    @pytest.fixture
+    def services(self):
+        """Facade over services on a temporary database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        from app.services.audit.audit_logger import AuditLogger
+        from app.services.activity.activity_monitor import ActivityMonitor
+        from app.services.database.async_services import AsyncServices, ServiceExecutor
+        services = AsyncServices(Database(db_name=db_path), AuditLogger(db_path=db_path),
+                                 ActivityMonitor(db_path=db_path), ServiceExecutor(max_workers=2))
+        yield services
+        
+        services.close()
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def test_methods_are_awaitable_off_loop(self, services):
+        """Test proxied calls return results and run on executor threads"""
+        import asyncio
+        import threading
+        
+        async def scenario():
+            report_id = await services.db.add_report("u@example.com", "U", "student", "Leak", "Lab")
+            log_id = await services.audit.log_action("u@example.com", "U", "report_create", "report", report_id)
+            thread = await services.call(lambda: threading.current_thread().name)
+            return report_id, log_id, thread, await services.db.get_report_by_id(report_id)
+        
+        report_id, log_id, thread, report = asyncio.run(scenario())
+        
+        assert log_id > 0
+        assert report['id'] == report_id
+        assert thread != threading.current_thread().name
+        stats = services.stats()
+        assert stats['completed'] == 4 and stats['failed'] == 0 and stats['queued'] == 0
+    
+    def test_errors_propagate(self, services):
+        """Test exceptions raised in a worker surface at the await"""
+        import asyncio
+        
+        with pytest.raises(ZeroDivisionError):
+            asyncio.run(services.call(lambda: 1 / 0))
+        assert services.stats()['failed'] == 1
+    
+    def test_full_queue_rejects(self):
+        """Test submissions beyond the queue bound fail fast and are counted"""
+        import threading
+        from app.services.database.async_services import ServiceExecutor, ServicesBusyError
+        executor = ServiceExecutor(max_workers=1, max_queue=1)
+        started, release = threading.Event(), threading.Event()
+        
+        def block():
+            started.set()
+            release.wait(5)
+        
+        try:
+            running = executor.submit(block)
+            started.wait(5)
+            queued = executor.submit(lambda: "queued")
+            with pytest.raises(ServicesBusyError):
+                executor.submit(lambda: "rejected")
+            
+            stats = executor.stats()
+            assert (stats['running'], stats['queued'], stats['rejected']) == (1, 1, 1)
+        finally:
+            release.set()
+            executor.close()
+        
+        assert running.result(1) is None
+        assert queued.result(1) == "queued"
+        assert executor.stats()['wait_ms_p95'] > 0
+
+
+class TestGeoIPLookup:
+    """Test the offline IP location table and cached resolution"""
+    
+    @pytest.fixture
+    def ranges_csv(self, tmp_path):
+        path = tmp_path / "ranges.csv"
+        path.write_text(
+            "start_ip,end_ip,country,city,isp\n"
+            "10.0.0.0,10.255.255.255,Local,Private Network,Private\n"
+            "203.0.113.0,203.0.113.127,Philippines,Naga City,Campus ISP\n"
+            "203.0.113.128,203.0.113.255,Philippines,Manila,Metro ISP\n"
+            "2001:db8::,2001:db8::ffff,Philippines,Cebu City,IPv6 ISP\n"
+        )
+        return str(path)
+    
+    def test_bisect_lookup(self, ranges_csv):
+        """Test addresses resolve to the range containing them, including the edges"""
+        from app.services.activity.geoip import load_geoip_csv
+        
+        table = load_geoip_csv(ranges_csv)
+        assert len(table) == 4
+        assert table.lookup("203.0.113.0")['city'] == "Naga City"
+        assert table.lookup("203.0.113.127")['city'] == "Naga City"
+        assert table.lookup("203.0.113.128")['city'] == "Manila"
+        assert table.lookup("10.20.30.40")['isp'] == "Private"
+        assert table.lookup("2001:db8::1")['city'] == "Cebu City"
+        assert table.lookup("::ffff:203.0.113.200")['city'] == "Manila"
+        assert table.lookup("8.8.8.8") is None
+        assert table.lookup("9.255.255.255") is None
+        assert table.lookup("not-an-ip") is None
+    
+    @pytest.mark.parametrize("rows", [
+        "203.0.113.128,203.0.113.255,PH,Manila,ISP\n203.0.113.0,203.0.113.127,PH,Naga City,ISP\n",
+        "203.0.113.0,203.0.113.127,PH,Naga City,ISP\n203.0.113.100,203.0.113.255,PH,Manila,ISP\n",
+        "203.0.113.9,203.0.113.1,PH,Naga City,ISP\n",
+        "",
+    ])
+    def test_rejects_unsorted_overlapping_or_empty_files(self, tmp_path, rows):
+        """Test files whose ranges are out of order, overlap, are inverted or missing are refused"""
+        from app.services.activity.geoip import load_geoip_csv
+        path = tmp_path / "bad.csv"
+        path.write_text("start_ip,end_ip,country,city,isp\n" + rows)
+        
+        with pytest.raises(ValueError, match="bad.csv"):
+            load_geoip_csv(str(path))
+    
+    def test_loads_dbip_lite_downloads(self, tmp_path):
+        """Test the header-less DB-IP country and city lite layouts, gzipped or not"""
+        import gzip
+        from app.services.activity.geoip import load_geoip_csv
+        country = tmp_path / "dbip-country-lite.csv"
+        country.write_text("1.0.0.0,1.0.0.255,AU\n8.8.8.0,8.8.8.255,US\n2001:4860::,2001:4860:ffff::,US\n")
+        city = tmp_path / "dbip-city-lite.csv.gz"
+        with gzip.open(city, "wt") as f:
+            f.write('8.8.8.0,8.8.8.255,NA,US,California,"Mountain View",37.4,-122.1\n')
+        
+        table = load_geoip_csv(str(country))
+        assert table.lookup("8.8.8.8") == {'country': "US", 'city': "Unknown", 'isp': "Unknown"}
+        assert table.lookup("2001:4860::8888")['country'] == "US"
+        assert load_geoip_csv(str(city)).lookup("8.8.8.8")['city'] == "Mountain View"
+    
+    def test_bad_configured_file_falls_back_to_bundled(self, tmp_path):
+        """Test an invalid GEOIP_CSV is reported and the private ranges still resolve"""
+        from app.services.activity import geoip
+        path = tmp_path / "bad.csv"
+        path.write_text("start_ip,end_ip\n10.0.0.9,10.0.0.1\n")
+        
+        with patch.object(geoip.GeoIPConfig, 'DATA_PATH', str(path)), patch.object(geoip, '_table', None):
+            assert geoip.get_geoip_table().lookup("127.0.0.1")['city'] == "Localhost"
+            with pytest.raises(ValueError):
+                geoip.reload_geoip_table()
+            assert geoip.get_geoip_table().lookup("127.0.0.1")['city'] == "Localhost"
+    
+    def test_bundled_table_covers_private_ranges(self):
+        """Test the shipped CSV loads and classifies reserved space"""
+        from app.services.activity.geoip import GeoIPConfig, load_geoip_csv
+        
+        table = load_geoip_csv(GeoIPConfig.DATA_PATH)
+        assert table.lookup("127.0.0.1")['city'] == "Localhost"
+        assert table.lookup("192.168.1.10")['city'] == "Private Network"
+        assert table.lookup("172.20.0.5")['city'] == "Private Network"
+    
+    def test_activity_monitor_uses_table(self, ranges_csv, tmp_path):
+        """Test login logging records the looked-up location for the client IP"""
+        from app.services.activity import geoip
+        from app.services.activity.activity_monitor import ActivityMonitor
+        
+        monitor = ActivityMonitor(db_path=str(tmp_path / "activity.db"))
+        try:
+            geoip.reload_geoip_table(ranges_csv)
+            assert monitor.get_geolocation("8.8.8.8") == geoip.UNKNOWN_LOCATION
+            
+            monitor.log_login_attempt("a@example.com", "A", success=True, ip_address="203.0.113.200")
+            stats = monitor.get_user_stats("a@example.com")
+            assert stats['last_login_ip'] == "203.0.113.200"
+            assert stats['last_login_location'] == "Manila, Philippines"
+        finally:
+            geoip.reload_geoip_table()
+            monitor._pool.close()
+    
+    def test_hostname_resolution_cached(self):
+        """Test the host address is resolved once and then served from cache"""
+        from app.services.activity.geoip import resolve_hostname
+        
+        resolve_hostname.cache_clear()
+        with patch('app.services.activity.geoip.socket.gethostbyname', return_value="10.1.2.3") as resolve:
+            assert resolve_hostname("campus-host") == "10.1.2.3"
+            assert resolve_hostname("campus-host") == "10.1.2.3"
+        assert resolve.call_count == 1
+        resolve_hostname.cache_clear()
+
+
+class TestUserUpserts:
+    """Test race-free user and login-stat writes"""
+    
+    @pytest.fixture
+    def test_db(self):
+        """Create a temporary test database"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+            db_path = f.name
+        
+        from app.services.database.database import Database
+        db = Database(db_name=db_path)
+        yield db
+        
+        db._pool.close()
+        try:
+            os.unlink(db_path)
+        except:
+            pass
+    
+    def _statements(self, db, call):
+        statements = []
+        with db._pool.connection() as conn:
+            conn.set_trace_callback(statements.append)
+            try:
+                call()
+            finally:
+                conn.set_trace_callback(None)
+        return [sql.split()[0].upper() for sql in statements if sql.split()[0].upper() not in ('BEGIN', 'COMMIT')]
+    
+    def test_existing_user_single_update(self, test_db):
+        """Test a returning user costs one UPDATE and keeps the stored picture"""
+        picture = "data:image/png;base64," + base64.b64encode(b"avatar").decode()
+        test_db.create_or_update_user("a@example.com", "A", "student", picture=picture)
+        
+        assert self._statements(test_db, lambda: test_db.create_or_update_user("a@example.com", "Alice", "faculty")) == ['UPDATE']
+        user = test_db.get_user_by_email("a@example.com")
+        assert user['name'] == "Alice"
+        assert user['role'] == "faculty"
+        assert user['picture'] == picture
+    
+    def test_login_stats_single_statement(self, test_db):
+        """Test a returning user's login stats are one UPDATE, created by upsert the first time"""
+        from app.services.activity.activity_monitor import ActivityMonitor
+        monitor = ActivityMonitor(db_path=test_db.db_name)
+        
+        monitor.log_login_attempt("a@example.com", "A", success=True, ip_address="10.0.0.1")
+        statements = self._statements(test_db, lambda: monitor.log_login_attempt(
+            "a@example.com", "A", success=True, ip_address="10.0.0.1"))
+        assert statements == ['INSERT', 'UPDATE']  # user_activity row, user_login_stats update
+        
+        monitor.log_login_attempt("a@example.com", "A", success=False, ip_address="10.0.0.1")
+        stats = monitor.get_user_stats("a@example.com")
+        assert stats['total_logins'] == 2
+        assert stats['total_failed_attempts'] == 1
+    
+    def test_concurrent_first_logins(self, test_db):
+        """Test simultaneous first logins for one email neither fail nor duplicate rows"""
+        import threading
+        from app.services.activity.activity_monitor import ActivityMonitor
+        monitor = ActivityMonitor(db_path=test_db.db_name)
+        errors = []
+        barrier = threading.Barrier(8)
+        
+        def login(i):
+            barrier.wait()
+            try:
+                for n in range(20):
+                    email = f"user{n}@example.com"
+                    test_db.get_or_create_user(email, "User", "student")
+                    test_db.create_or_update_user(email, "User", "student")
+                    monitor.log_login_attempt(email, "User", success=True, ip_address="10.0.0.1")
+            except Exception as e:
+                errors.append(e)
+        
+        threads = [threading.Thread(target=login, args=(i,)) for i in range(8)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        
+        assert errors == []
+        with test_db._pool.connection() as conn:
+            assert conn.execute("SELECT COUNT(*) FROM users").fetchone()[0] == 20
+            assert conn.execute("SELECT SUM(total_logins) FROM user_login_stats").fetchone()[0] == 160
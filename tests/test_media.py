@@ -0,0 +1,227 @@
+"""
+Tests for the report photo / avatar media service
+"""
+import pytest
+import base64
+import os
+import tempfile
+import sys
+
+# Add app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from app.services.database.blob_store import blob_key
+from app.services.media import image_service
+from app.services.media.image_service import (
+    MediaConfig,
+    avatar_url,
+    cache_headers,
+    etag_for,
+    http_date,
+    is_not_modified,
+    report_image_url,
+)
+
+PHOTO_BYTES = b"\xff\xd8not-really-a-jpeg"
+PHOTO_URI = "data:image/jpeg;base64," + base64.b64encode(PHOTO_BYTES).decode()
+
+
+@pytest.fixture
+def test_db():
+    """Create a temporary test database"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+        db_path = f.name
+
+    from app.services.database.database import Database
+    db = Database(db_name=db_path)
+    yield db
+
+    try:
+        os.unlink(db_path)
+    except:
+        pass
+
+
+@pytest.fixture
+def media_urls():
+    """Enable media URLs for the duration of a test"""
+    image_service.enable_media_urls(True)
+    yield
+    image_service.enable_media_urls(False)
+
+
+class TestMediaUrls:
+    """Test view-facing URL helpers"""
+
+    def test_no_urls_without_routes(self):
+        """Test views fall back to inline images when routes are not mounted"""
+        assert report_image_url("a" * 64) is None
+        assert avatar_url(PHOTO_URI) is None
+
+    def test_report_image_url(self, media_urls):
+        """Test report photo URLs are keyed by content hash"""
+        assert report_image_url("a" * 64) == f"{MediaConfig.REPORT_IMAGE_ROUTE}/{'a' * 64}?size=medium"
+        assert report_image_url(None) is None
+
+    def test_avatar_url_only_for_data_uris(self, media_urls):
+        """Test data URI avatars get a content URL; external URLs do not"""
+        url = avatar_url(PHOTO_URI)
+        assert url.startswith(MediaConfig.AVATAR_ROUTE + "/")
+        assert len(url.split("/")[-1].split("?")[0]) == 64
+        assert avatar_url("https://example.com/me.png") is None
+
+
+class TestCachingHeaders:
+    """Test ETag / Last-Modified handling"""
+
+    def test_headers(self):
+        """Test responses are immutable and carry validators"""
+        headers = cache_headers(etag_for("b" * 64, "thumb"), "Wed, 01 Jan 2025 00:00:00 GMT")
+
+        assert headers["ETag"] == f'"{"b" * 32}-thumb"'
+        assert "immutable" in headers["Cache-Control"]
+        assert headers["Last-Modified"] == "Wed, 01 Jan 2025 00:00:00 GMT"
+
+    def test_http_date_from_sqlite_timestamp(self):
+        """Test SQLite UTC timestamps are formatted as HTTP dates"""
+        assert http_date("2025-01-01 00:00:00") == "Wed, 01 Jan 2025 00:00:00 GMT"
+        assert http_date(None) is None
+
+    def test_if_none_match(self):
+        """Test matching and non-matching ETags"""
+        etag = etag_for("c" * 64, "medium")
+
+        assert is_not_modified(etag, None, if_none_match=etag)
+        assert is_not_modified(etag, None, if_none_match=f'"other", {etag}')
+        assert not is_not_modified(etag, None, if_none_match='"other"')
+
+    def test_if_modified_since(self):
+        """Test date validators when no ETag is sent"""
+        last_modified = "Wed, 01 Jan 2025 00:00:00 GMT"
+
+        assert is_not_modified('"x"', last_modified, if_modified_since=last_modified)
+        assert not is_not_modified('"x"', last_modified, if_modified_since="Tue, 31 Dec 2024 00:00:00 GMT")
+
+
+class TestImageLookup:
+    """Test serving photos and avatars from the database"""
+
+    def test_full_report_image(self, test_db):
+        """Test the original photo is served for size=full"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+
+        image = image_service.get_report_image(test_db, key, "full")
+        assert image['data'] == PHOTO_BYTES
+        assert image['mime_type'] == "image/jpeg"
+
+    def test_unknown_report_image(self, test_db):
+        """Test a missing key yields None (404)"""
+        assert image_service.get_report_image(test_db, "d" * 64, "thumb") is None
+
+    def test_thumbnails_dropped_with_blob(self, test_db):
+        """Test stored thumbnails are removed with their source blob"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+        image_service.pregenerate_report_thumbnails(test_db, key)
+
+        test_db.delete_report(report_id)
+        with test_db._pool.connection() as conn:
+            count = conn.execute('SELECT COUNT(*) FROM image_thumbnails WHERE source_key = ?', (key,)).fetchone()[0]
+        assert count == 0
+
+    def test_add_report_returns_image_key(self, test_db):
+        """Test add_report can return the stored photo key with the id"""
+        report_id, key = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab",
+                                            report_image=PHOTO_URI, with_image_key=True)
+        assert key == blob_key(PHOTO_BYTES)
+        assert test_db.get_report_by_id(report_id)['image_key'] == key
+
+        _, key = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", with_image_key=True)
+        assert key is None
+
+    def test_thumbnails_resized_outside_write_transaction(self, test_db, monkeypatch):
+        """Test no write lock is held while thumbnails are generated"""
+        import sqlite3
+
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+
+        def fake_thumbnail(data, size):
+            other = sqlite3.connect(test_db.db_name, timeout=0)
+            try:
+                other.execute("UPDATE reports SET location = location WHERE id = ?", (report_id,))
+                other.commit()
+            finally:
+                other.close()
+            return b"thumb-" + size.encode(), "image/jpeg"
+
+        monkeypatch.setattr(image_service, "_try_thumbnail", fake_thumbnail)
+        assert image_service.pregenerate_report_thumbnails(test_db, key) == len(MediaConfig.SIZES)
+        assert image_service.get_report_image(test_db, key, "thumb")['data'] == b"thumb-thumb"
+
+    def test_avatar_lookup_by_content_key(self, test_db):
+        """Test avatars are found by the hash of their bytes"""
+        test_db.create_or_update_user("u@example.com", "U", "student", PHOTO_URI)
+        key = blob_key(PHOTO_BYTES)
+
+        image = image_service.get_avatar_image(test_db, key, "full")
+        assert image['data'] == PHOTO_BYTES
+
+    def test_card_source_is_inline_thumbnail_without_routes(self, test_db, monkeypatch):
+        """Test cards get the stored thumbnail, not the original, when media URLs are off"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+        monkeypatch.setattr(image_service, "_try_thumbnail", lambda data, size: (b"thumb-" + size.encode(), "image/jpeg"))
+        image_service.pregenerate_report_thumbnails(test_db, key)
+
+        monkeypatch.setattr(test_db.blobs, "get", lambda key: pytest.fail("original loaded"))
+        src = image_service.report_image_src(test_db, key)
+        assert src == "data:image/jpeg;base64," + base64.b64encode(b"thumb-medium").decode()
+
+    def test_card_source_is_url_with_routes(self, test_db, media_urls):
+        """Test cards reference the media route when it is mounted"""
+        assert image_service.report_image_src(test_db, "a" * 64) == report_image_url("a" * 64)
+        assert image_service.report_image_src(test_db, None) is None
+
+    def test_undecodable_photo_is_not_retried(self, test_db, monkeypatch):
+        """Test a photo Pillow cannot read is stored as its own thumbnail after one attempt"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+        attempts = []
+        monkeypatch.setattr(image_service, "_pillow_available", lambda: True)
+        monkeypatch.setattr(image_service, "_try_thumbnail", lambda data, size: attempts.append(size))
+
+        for _ in range(3):
+            assert image_service.get_report_image(test_db, key, "thumb")['data'] == PHOTO_BYTES
+        assert sorted(attempts) == sorted(MediaConfig.SIZES)
+
+    def test_missing_pillow_is_not_cached(self, test_db, monkeypatch):
+        """Test nothing is stored while Pillow is unavailable, so thumbnails appear once it is installed"""
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=PHOTO_URI)
+        key = test_db.get_report_by_id(report_id)['image_key']
+        monkeypatch.setattr(image_service, "_pillow_available", lambda: False)
+
+        assert image_service.get_report_image(test_db, key, "thumb")['data'] == PHOTO_BYTES
+        with test_db._pool.connection() as conn:
+            assert conn.execute('SELECT COUNT(*) FROM image_thumbnails').fetchone()[0] == 0
+
+
+class TestThumbnails:
+    """Test Pillow thumbnail generation"""
+
+    def test_thumbnail_is_downscaled(self, test_db):
+        """Test generated thumbnails fit within the configured size"""
+        pytest.importorskip("PIL")
+        from PIL import Image as PilImage
+        import io
+
+        buf = io.BytesIO()
+        PilImage.new("RGB", (1200, 800), "red").save(buf, format="JPEG")
+        uri = "data:image/jpeg;base64," + base64.b64encode(buf.getvalue()).decode()
+        report_id = test_db.add_report("u@example.com", "U", "student", "Issue", "Lab", report_image=uri)
+        key = test_db.get_report_by_id(report_id)['image_key']
+
+        image = image_service.get_report_image(test_db, key, "thumb")
+        thumb = PilImage.open(io.BytesIO(image['data']))
+        assert max(thumb.size) == MediaConfig.SIZES["thumb"]
@@ -0,0 +1,185 @@
+"""
+EXPLAIN QUERY PLAN checks for the public query methods.
+
+Every SELECT a method issues is captured through the connection trace hook and
+re-run under EXPLAIN QUERY PLAN; the test fails if SQLite plans a full table
+scan instead of an index search or index-ordered scan. Rollup tables are
+exempt: their size is bounded by the number of distinct keys, not reports.
+"""
+import pytest
+import os
+import re
+import sys
+import tempfile
+
+# Add app to path
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+_TABLE_SCAN = re.compile(r'^SCAN (\w+)$')
+_ROLLUP_PREFIX = 'report_counts_by_'
+
+
+@pytest.fixture
+def services():
+    """Database, audit logger and activity monitor on one seeded temp database"""
+    with tempfile.NamedTemporaryFile(delete=False, suffix='.db') as f:
+        db_path = f.name
+
+    from app.services.database.database import Database
+    from app.services.audit.audit_logger import AuditLogger
+    from app.services.activity.activity_monitor import ActivityMonitor
+
+    db = Database(db_name=db_path)
+    audit = AuditLogger(db_path=db_path)
+    activity = ActivityMonitor(db_path=db_path)
+
+    for i in range(20):
+        email = f"user{i % 4}@example.com"
+        db.add_report(email, f"User {i % 4}", "student", f"Issue {i}", f"Building {i % 3}",
+                      category=["IT", "Facilities", "Academic"][i % 3])
+        db.create_or_update_user(email, f"User {i % 4}", "student")
+        audit.log_action(email, f"User {i % 4}", "login", "report", i)
+        activity.log_login_attempt(email, f"User {i % 4}", success=bool(i % 2))
+
+    yield db, audit, activity
+
+    audit.close()
+    db._pool.close()
+    for suffix in ('', '-wal', '-shm'):
+        try:
+            os.unlink(db_path + suffix)
+        except:
+            pass
+
+
+def _plans(pool, call):
+    """Run ``call`` and return ``(sql, plan steps)`` for each SELECT it issued."""
+    statements = []
+    with pool.connection() as conn:
+        conn.set_trace_callback(statements.append)
+        try:
+            call()
+        finally:
+            conn.set_trace_callback(None)
+
+        plans = [
+            (sql.strip(), [row[3] for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}")])
+            for sql in statements if sql.lstrip().upper().startswith('SELECT')
+        ]
+
+    assert statements, "method issued no SQL"
+    return plans
+
+
+def _table_scans(pool, call):
+    """Run ``call`` and return the full table scans planned for its SELECTs."""
+    scans = []
+    for sql, steps in _plans(pool, call):
+        for step in steps:
+            match = _TABLE_SCAN.match(step)
+            if match and not match.group(1).startswith(_ROLLUP_PREFIX):
+                scans.append((match.group(1), sql))
+    return scans
+
+
+class TestReportQueryPlans:
+    """Report lookups must be served by indexes"""
+
+    @pytest.mark.parametrize("method,args", [
+        ("get_reports_by_user", ("user1@example.com",)),
+        ("get_reports_by_category", ("IT",)),
+        ("get_report_by_id", (3,)),
+        ("user_exists", ("user2@example.com",)),
+        ("get_user_by_email", ("user1@example.com",)),
+        ("verify_user_password", ("user1@example.com", "secret")),
+        ("get_reports_page", (10,)),
+        ("get_reports_page", (None, 20, {"user_email": "user1@example.com"})),
+        ("get_reports_page", (None, 20, {"category": "IT"})),
+        ("get_reports_page", (10, 20, {"category": "IT", "status": "pending"})),
+        ("get_reports_page", (None, 20, {"status": "resolved"})),
+        ("get_status_counts", ()),
+        ("get_status_counts", ("IT",)),
+        ("get_reports_per_day", (7,)),
+        ("get_reports_per_category", ()),
+        ("get_reports_per_category", ("resolved",)),
+        ("get_reports_per_location", ()),
+        ("get_resolution_rate", ()),
+        ("get_top_reporters", ()),
+        ("search_reports", ("issue",)),
+        ("search_reports", ("issue", {"category": "IT", "status": "pending"})),
+    ])
+    def test_no_table_scan(self, services, method, args):
+        """Test that the method's queries avoid full table scans"""
+        db, _, _ = services
+        scans = _table_scans(db._pool, lambda: getattr(db, method)(*args))
+        assert scans == []
+
+    def test_top_reporters_need_no_sort(self, services):
+        """Test that top reporters are read in index order without a temp sort"""
+        db, _, _ = services
+        steps = [step for _, plan in _plans(db._pool, db.get_top_reporters) for step in plan]
+        assert not any('TEMP B-TREE' in step for step in steps)
+
+    def test_search_joins_reports_by_rowid(self, services):
+        """Test that search matches come from the FTS index and join reports by primary key"""
+        db, _, _ = services
+        steps = [step for _, plan in _plans(db._pool, lambda: db.search_reports("issue")) for step in plan]
+        assert any(step.startswith('SCAN reports_fts VIRTUAL TABLE') for step in steps)
+        assert any(step.startswith('SEARCH r USING INTEGER PRIMARY KEY') for step in steps)
+
+
+class TestAuditQueryPlans:
+    """Audit log viewer filters must be served by indexes"""
+
+    @pytest.mark.parametrize("filters", [
+        {},
+        {"actor_email": "user1@example.com"},
+        {"action_type": "login"},
+        {"resource_type": "report"},
+        {"start_date": "2000-01-01 00:00:00", "end_date": "2999-01-01 00:00:00"},
+        {"actor_email": "user1@example.com", "action_type": "login"},
+        {"before": ("2999-01-01 00:00:00", 10)},
+        {"action_type": "login", "before": ("2999-01-01 00:00:00", 10)},
+    ])
+    def test_get_audit_logs_no_table_scan(self, services, filters):
+        """Test that filtered audit log pages avoid full table scans"""
+        _, audit, _ = services
+        scans = _table_scans(audit._pool, lambda: audit.get_audit_logs(**filters))
+        assert scans == []
+
+    @pytest.mark.parametrize("filters", [
+        {"actor_email": "user1@example.com"},
+        {"action_type": "login"},
+        {"resource_type": "report"},
+    ])
+    def test_get_audit_logs_count_no_table_scan(self, services, filters):
+        """Test that filtered audit log counts avoid full table scans"""
+        _, audit, _ = services
+        scans = _table_scans(audit._pool, lambda: audit.get_audit_logs_count(**filters))
+        assert scans == []
+
+    def test_keyset_page_needs_no_sort(self, services):
+        """Test that keyset pages are read in index order without a temp sort"""
+        _, audit, _ = services
+        with audit._pool.connection() as conn:
+            plan = [row[3] for row in conn.execute(
+                "EXPLAIN QUERY PLAN SELECT id FROM audit_logs WHERE action_type = ? AND (timestamp, id) < (?, ?) "
+                "ORDER BY timestamp DESC, id DESC LIMIT 50", ("login", "2999-01-01", 10),
+            )]
+        assert not any('TEMP B-TREE' in step for step in plan)
+
+
+class TestActivityQueryPlans:
+    """Activity monitoring lookups must be served by indexes"""
+
+    @pytest.mark.parametrize("method,args", [
+        ("get_user_activity", ("user1@example.com",)),
+        ("get_failed_attempts", ("user1@example.com",)),
+        ("get_user_stats", ("user1@example.com",)),
+        ("get_all_user_stats", ()),
+    ])
+    def test_no_table_scan(self, services, method, args):
+        """Test that the method's queries avoid full table scans"""
+        _, _, activity = services
+        scans = _table_scans(activity._pool, lambda: getattr(activity, method)(*args))
+        assert scans == []
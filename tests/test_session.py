@@ -1002,3 +1002,336 @@ class TestSessionValidation:
         assert result is False
 
 
+
+
+class TestSessionDeadlineScheduler:
+    """Test the deadline heap that drives session expiry"""
+    
+    def test_monitor_expires_session_at_deadline(self):
+        """Test the monitor times a session out when its deadline arrives, not on a fixed poll"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        timeouts = []
+        manager.register_timeout_callback(lambda email, reason: timeouts.append((email, reason, time.monotonic())))
+        manager.start_monitoring()
+        try:
+            session = manager.create_session("test@example.com", "Test User", "student")
+            due = time.monotonic() + 0.2
+            session.expires_at = datetime.now() + timedelta(seconds=0.2)
+            
+            deadline = time.monotonic() + 2
+            while not timeouts and time.monotonic() < deadline:
+                time.sleep(0.01)
+        finally:
+            manager.stop_monitoring()
+        
+        assert [t[:2] for t in timeouts] == [("test@example.com", "timeout")]
+        assert timeouts[0][2] - due < 0.5
+        assert not session.is_active
+    
+    def test_activity_pushes_back_inactivity_deadline(self):
+        """Test an entry made stale by activity is rescheduled instead of timing out"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        session = manager.create_session("test@example.com", "Test User", "student")
+        session.last_activity = datetime.now() - timedelta(minutes=89, seconds=59.9)
+        time.sleep(0.15)
+        session.update_activity()
+        
+        manager._check_sessions()
+        
+        assert session.is_active
+        assert session._scheduled == session.deadline()
+        assert any(entry[0] == session._scheduled for entry in manager._deadlines)
+    
+    def test_replaced_session_entry_is_skipped(self):
+        """Test a heap entry for a replaced session does not fire callbacks"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        callback = Mock()
+        manager.register_timeout_callback(callback)
+        old = manager.create_session("test@example.com", "Test User", "student")
+        old.expires_at = datetime.now() - timedelta(minutes=1)
+        manager.create_session("test@example.com", "Test User", "student")
+        
+        manager._check_sessions()
+        
+        callback.assert_not_called()
+        assert manager.validate_session("test@example.com")
+    
+    def test_check_only_pops_due_entries(self):
+        """Test a check leaves sessions that are not yet due in the heap"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        for i in range(100):
+            manager.create_session(f"user{i}@example.com", "User", "student")
+        manager.get_session("user7@example.com").expires_at = datetime.now() - timedelta(seconds=1)
+        
+        manager._check_sessions()
+        
+        assert not manager.get_session("user7@example.com").is_active
+        assert len(manager._deadlines) == 100
+        assert len(manager.get_all_active_sessions()) == 99
+
+
+class TestSharedSessionStore:
+    """Test sessions shared between processes through the SQLite store"""
+    
+    @pytest.fixture
+    def workers(self, tmp_path):
+        """Two managers on one database, standing in for two web workers"""
+        from app.services.session.session_manager import SessionManager
+        from app.services.session.session_store import SQLiteSessionStore
+        
+        db_path = str(tmp_path / "sessions.db")
+        return SessionManager(SQLiteSessionStore(db_path)), SessionManager(SQLiteSessionStore(db_path))
+    
+    def test_backend_selection(self, tmp_path):
+        """Test sessions stay in memory unless the SQLite store is chosen"""
+        from app.services.session.session_manager import SessionConfig, create_session_store
+        from app.services.session.session_store import MemorySessionStore, SQLiteSessionStore
+        
+        assert type(create_session_store("memory")) is MemorySessionStore
+        with patch.object(SessionConfig, 'DB_PATH', str(tmp_path / "sessions.db")):
+            assert isinstance(create_session_store("sqlite"), SQLiteSessionStore)
+        with pytest.raises(ValueError):
+            create_session_store("redis")
+    
+    def test_login_visible_in_other_worker(self, workers):
+        """Test a session created in one worker validates in another"""
+        a, b = workers
+        session = a.create_session("test@example.com", "Test User", "student")
+        
+        other = b.get_session("test@example.com")
+        
+        assert other is not None
+        assert other.session_id == session.session_id
+        assert b.validate_session("test@example.com")
+        assert abs((other.expires_at - session.expires_at).total_seconds()) < 0.01
+    
+    def test_session_survives_restart(self, workers, tmp_path):
+        """Test a new manager on the same database still sees the session"""
+        from app.services.session.session_manager import SessionManager
+        from app.services.session.session_store import SQLiteSessionStore
+        
+        a, _ = workers
+        a.create_session("test@example.com", "Test User", "admin")
+        
+        restarted = SessionManager(SQLiteSessionStore(str(tmp_path / "sessions.db")))
+        
+        assert restarted.validate_session("test@example.com")
+        assert restarted.get_session("test@example.com").user_type == "admin"
+    
+    def test_logout_revokes_in_other_worker(self, workers):
+        """Test invalidating in one worker ends the cached session in another"""
+        from app.services.session.session_manager import SessionConfig
+        
+        a, b = workers
+        a.create_session("test@example.com", "Test User", "student")
+        cached = b.get_session("test@example.com")
+        
+        a.invalidate_session("test@example.com")
+        
+        assert b.validate_session("test@example.com")  # still within CACHE_TTL
+        with patch.object(SessionConfig, 'CACHE_TTL', 0):
+            assert not b.validate_session("test@example.com")
+        assert not cached.is_active
+    
+    def test_relogin_replaces_cached_session(self, workers):
+        """Test logging in again in one worker replaces the other worker's copy"""
+        from app.services.session.session_manager import SessionConfig
+        
+        a, b = workers
+        a.create_session("test@example.com", "Test User", "student")
+        old = b.get_session("test@example.com")
+        new = a.create_session("test@example.com", "Test User", "student")
+        
+        with patch.object(SessionConfig, 'CACHE_TTL', 0):
+            current = b.get_session("test@example.com")
+        
+        assert current.session_id == new.session_id
+        assert not old.is_active
+    
+    def test_activity_writes_are_debounced(self, workers):
+        """Test update_activity writes to the store at most once per interval"""
+        from app.services.session.session_manager import SessionConfig
+        
+        a, b = workers
+        session = a.create_session("test@example.com", "Test User", "student")
+        with patch.object(a._store, 'touch', wraps=a._store.touch) as touch:
+            for _ in range(50):
+                a.update_activity("test@example.com")
+            assert touch.call_count == 0
+            
+            a._shard("test@example.com").sync["test@example.com"][1] -= SessionConfig.ACTIVITY_WRITE_INTERVAL
+            session._last_activity -= SessionConfig.ACTIVITY_DEBOUNCE
+            a.update_activity("test@example.com")
+            assert touch.call_count == 1
+        
+        stored = b._store.load("test@example.com")
+        assert abs(stored['last_activity'] - session.last_activity.timestamp()) < 0.01
+    
+    def test_timeout_in_one_worker_revokes_everywhere(self, workers):
+        """Test a timed-out session is removed from the store"""
+        from app.services.session.session_manager import SessionConfig
+        
+        a, b = workers
+        session = a.create_session("test@example.com", "Test User", "student")
+        b.get_session("test@example.com")
+        callback = Mock()
+        a.register_timeout_callback(callback)
+        
+        session.expires_at = datetime.now() - timedelta(seconds=1)
+        a._store.save(session.to_record())
+        a._check_sessions()
+        
+        callback.assert_called_once_with("test@example.com", "timeout")
+        assert b._store.load("test@example.com") is None
+        with patch.object(SessionConfig, 'CACHE_TTL', 0):
+            assert b.get_session("test@example.com") is None
+    
+    def test_purge_uses_deadline_index(self, workers):
+        """Test expired rows are purged through the deadline index"""
+        a, _ = workers
+        a.create_session("old@example.com", "Old", "student")
+        a.create_session("new@example.com", "New", "student")
+        record = a._store.load("old@example.com")
+        record['expires_at'] = time.time() - 1
+        a._store.save(record)
+        
+        with a._store._pool.connection() as conn:
+            plan = conn.execute('EXPLAIN QUERY PLAN DELETE FROM sessions WHERE deadline <= ?', (time.time(),)).fetchall()
+        
+        assert any('idx_sessions_deadline' in row[-1] for row in plan)
+        assert a._store.purge(time.time()) == 1
+        assert list(a.get_all_active_sessions()) == ["new@example.com"]
+
+
+class TestPerUserTimeoutCallbacks:
+    """Test timeout callbacks registered for one user"""
+    
+    def test_only_that_users_callbacks_run(self):
+        """Test a timeout dispatches only the timed-out user's callbacks"""
+        from app.services.session.session_manager import SessionManager
+        import threading
+        
+        manager = SessionManager()
+        session = manager.create_session("a@example.com", "A", "student")
+        manager.create_session("b@example.com", "B", "student")
+        fired = threading.Event()
+        calls = []
+        
+        def on_timeout(email, reason):
+            calls.append((email, reason, threading.current_thread().name))
+            fired.set()
+        
+        manager.register_timeout_callback(on_timeout, user_email="a@example.com")
+        other = Mock()
+        manager.register_timeout_callback(other, user_email="b@example.com")
+        
+        manager._handle_timeout("a@example.com", session, "inactivity")
+        
+        assert fired.wait(2)
+        assert calls[0][:2] == ("a@example.com", "inactivity")
+        assert calls[0][2].startswith("session-timeout")
+        other.assert_not_called()
+        assert "a@example.com" not in manager._user_callbacks
+        assert "b@example.com" in manager._user_callbacks
+    
+    def test_same_key_replaces_callback(self):
+        """Test re-registering with the same key keeps a single callback"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        for _ in range(100):
+            manager.register_timeout_callback(Mock(), user_email="a@example.com", key="page-1")
+        
+        assert len(manager._user_callbacks["a@example.com"]) == 1
+    
+    def test_callbacks_per_user_are_bounded(self):
+        """Test the oldest callbacks are dropped past the per-user limit"""
+        from app.services.session.session_manager import SessionManager, SessionConfig
+        
+        manager = SessionManager()
+        callbacks = [Mock() for _ in range(SessionConfig.MAX_CALLBACKS_PER_USER + 5)]
+        for callback in callbacks:
+            manager.register_timeout_callback(callback, user_email="a@example.com")
+        
+        kept = list(manager._user_callbacks["a@example.com"].values())
+        assert kept == callbacks[-SessionConfig.MAX_CALLBACKS_PER_USER:]
+    
+    def test_unsubscribe(self):
+        """Test the returned handle removes the callback"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        unsubscribe = manager.register_timeout_callback(Mock(), user_email="a@example.com")
+        unsubscribe_all = manager.register_timeout_callback(Mock())
+        
+        unsubscribe()
+        unsubscribe_all()
+        unsubscribe()
+        
+        assert manager._user_callbacks == {}
+        assert manager._timeout_callbacks == []
+    
+    def test_logout_drops_callbacks(self):
+        """Test invalidating a session releases its callbacks without running them"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        manager.create_session("a@example.com", "A", "student")
+        callback = Mock()
+        manager.register_timeout_callback(callback, user_email="a@example.com")
+        
+        manager.invalidate_session("a@example.com")
+        
+        assert "a@example.com" not in manager._user_callbacks
+        callback.assert_not_called()
+
+
+class TestShardedSessionMap:
+    """Test the lock-striped session map and compact session objects"""
+    
+    def test_session_info_uses_slots(self):
+        """Test SessionInfo carries no per-instance __dict__"""
+        from app.services.session.session_manager import SessionInfo
+        
+        session = SessionInfo("test@example.com", "Test User", "student")
+        
+        assert not hasattr(session, '__dict__')
+        session.warned = True
+        with pytest.raises(AttributeError):
+            session.unexpected = 1
+    
+    def test_sessions_spread_over_shards(self):
+        """Test sessions land in more than one shard and are all found again"""
+        from app.services.session.session_manager import SessionManager
+        
+        manager = SessionManager()
+        emails = [f"user{i}@example.com" for i in range(200)]
+        for email in emails:
+            manager.create_session(email, "User", "student")
+        
+        assert sum(1 for shard in manager._shards if shard.sessions) > 1
+        assert all(manager.validate_session(email) for email in emails)
+        assert len(manager.get_all_active_sessions()) == 200
+    
+    def test_update_activity_is_debounced(self):
+        """Test activity inside the debounce window is not re-recorded"""
+        from app.services.session.session_manager import SessionManager, SessionConfig
+        
+        manager = SessionManager()
+        session = manager.create_session("test@example.com", "Test User", "student")
+        first = session._last_activity
+        
+        assert manager.update_activity("test@example.com")
+        assert session._last_activity == first
+        
+        session._last_activity -= SessionConfig.ACTIVITY_DEBOUNCE
+        assert manager.update_activity("test@example.com")
+        assert session._last_activity > first